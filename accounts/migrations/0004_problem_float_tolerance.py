@@ -0,0 +1,18 @@
+# Generated by Django 4.2.13 on 2026-10-18 07:33
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0003_alter_problem_id_alter_testcase_id'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='problem',
+            name='float_tolerance',
+            field=models.FloatField(blank=True, null=True),
+        ),
+    ]
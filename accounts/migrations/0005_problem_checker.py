@@ -0,0 +1,23 @@
+# Generated by Django 4.2.13 on 2026-10-18 07:34
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0004_problem_float_tolerance'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='problem',
+            name='checker_code',
+            field=models.TextField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='problem',
+            name='checker_language',
+            field=models.CharField(blank=True, choices=[('cpp', 'C++'), ('py', 'Python')], max_length=10, null=True),
+        ),
+    ]
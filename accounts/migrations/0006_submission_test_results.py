@@ -0,0 +1,23 @@
+# Generated by Django 4.2.13 on 2026-10-18 07:48
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0005_problem_checker'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='submission',
+            name='judged_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='submission',
+            name='test_results',
+            field=models.JSONField(blank=True, default=list),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.13 on 2026-10-18 07:49
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0006_submission_test_results'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='problem',
+            name='deterministic_checker',
+            field=models.BooleanField(default=True),
+        ),
+    ]
@@ -0,0 +1,60 @@
+# Generated by Django 4.2.13 on 2026-10-18 07:55
+
+from django.db import migrations, models
+
+EXCERPT_CHARS = 100
+
+
+def fill_excerpts_and_tags(apps, schema_editor):
+    # Historical models have no save() override, so repeat what it does
+    Problem = apps.get_model('accounts', 'Problem')
+    Tag = apps.get_model('accounts', 'Tag')
+    for problem in Problem.objects.all():
+        excerpt = (problem.description or '')[:EXCERPT_CHARS]
+        if problem.problem_file:
+            try:
+                with open(problem.problem_file, 'r', encoding='utf-8') as f:
+                    excerpt = f.read(EXCERPT_CHARS)
+            except Exception:
+                excerpt = ''
+        Problem.objects.filter(pk=problem.pk).update(excerpt=excerpt)
+        names = (name.strip().lower() for name in (problem.tags or '').split(','))
+        names = list(dict.fromkeys(name for name in names if name))
+        Tag.objects.bulk_create([Tag(name=name) for name in names], ignore_conflicts=True)
+        problem.tag_set.set(Tag.objects.filter(name__in=names))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0007_problem_deterministic_checker'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Tag',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=64, unique=True)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='problem',
+            name='excerpt',
+            field=models.CharField(blank=True, default='', editable=False, max_length=100),
+        ),
+        migrations.AddIndex(
+            model_name='problem',
+            index=models.Index(fields=['created_at', 'id'], name='problem_list_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='problem',
+            index=models.Index(fields=['difficulty', 'created_at', 'id'], name='problem_difficulty_list_idx'),
+        ),
+        migrations.AddField(
+            model_name='problem',
+            name='tag_set',
+            field=models.ManyToManyField(blank=True, editable=False, related_name='problems', to='accounts.tag'),
+        ),
+        migrations.RunPython(fill_excerpts_and_tags, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,73 @@
+# Generated by Django 4.2.13 on 2026-10-18 07:57
+
+import math
+import re
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+# Frozen copy of accounts.search.tokenize/term_weights as of this migration
+TERM_RE = re.compile(r'\w+')
+MAX_TERM_CHARS = 64
+FIELD_WEIGHTS = {'title': 3.0, 'tags': 2.0, 'statement': 1.0}
+STOPWORDS = frozenset(
+    'a an and are as at be by for from in is it of on or that the this to with you your'.split()
+)
+
+
+def tokenize(text):
+    return [
+        word[:MAX_TERM_CHARS]
+        for word in TERM_RE.findall((text or '').lower())
+        if word not in STOPWORDS and (len(word) > 1 or word.isdigit())
+    ]
+
+
+def term_weights(title, statement, tags):
+    counts = {}
+    for field, text in (('title', title), ('statement', statement), ('tags', ' '.join(tags))):
+        for term in tokenize(text):
+            counts[term] = counts.get(term, 0) + FIELD_WEIGHTS[field]
+    return {term: round(math.log1p(count), 4) for term, count in counts.items()}
+
+
+def index_problems(apps, schema_editor):
+    Problem = apps.get_model('accounts', 'Problem')
+    ProblemTerm = apps.get_model('accounts', 'ProblemTerm')
+    for problem in Problem.objects.all():
+        statement = ''
+        if problem.problem_file:
+            try:
+                with open(problem.problem_file, 'r', encoding='utf-8') as f:
+                    statement = f.read()
+            except Exception:
+                pass
+        weights = term_weights(problem.title, statement or problem.description or '', [problem.tags or ''])
+        ProblemTerm.objects.bulk_create(
+            [ProblemTerm(term=term, problem=problem, weight=weight) for term, weight in weights.items()]
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0008_problem_excerpt_tag_set'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProblemTerm',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('term', models.CharField(max_length=64)),
+                ('weight', models.FloatField()),
+                ('problem', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='search_terms', to='accounts.problem')),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='problemterm',
+            constraint=models.UniqueConstraint(fields=('term', 'problem'), name='problem_term_unique'),
+        ),
+        migrations.RunPython(index_problems, migrations.RunPython.noop),
+    ]
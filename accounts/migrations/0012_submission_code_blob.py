@@ -0,0 +1,68 @@
+# Generated by Django 4.2.13 on 2026-10-18 08:22
+
+import hashlib
+import zlib
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def move_to_blobs(apps, schema_editor):
+    # Frozen copy of submit.blobs.put: the digests and codec choice must match
+    Blob = apps.get_model('submit', 'Blob')
+    Submission = apps.get_model('accounts', 'Submission')
+    stored = set(Blob.objects.values_list('digest', flat=True))
+    for submission in Submission.objects.only('id', 'code').iterator():
+        if not submission.code:
+            continue
+        data = submission.code.encode('utf-8')
+        key = hashlib.sha256(data).hexdigest()
+        if key not in stored:
+            codec, payload = 'raw', data
+            if len(data) >= 64:
+                compressed = zlib.compress(data, 6)
+                if len(compressed) < len(data):
+                    codec, payload = 'zlib', compressed
+            Blob.objects.create(digest=key, size=len(data), codec=codec, data=payload)
+            stored.add(key)
+        submission.code_blob_id = key
+        submission.save(update_fields=['code_blob'])
+
+
+def move_from_blobs(apps, schema_editor):
+    Blob = apps.get_model('submit', 'Blob')
+    Submission = apps.get_model('accounts', 'Submission')
+    for submission in Submission.objects.exclude(code_blob=None).iterator():
+        blob = Blob.objects.get(digest=submission.code_blob_id)
+        data = bytes(blob.data)
+        if blob.codec == 'zlib':
+            data = zlib.decompress(data)
+        submission.code = data.decode('utf-8', 'replace')
+        submission.save(update_fields=['code'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('submit', '0007_blob_storage'),
+        ('accounts', '0011_judge_stats'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='submission',
+            name='code_blob',
+            field=models.ForeignKey(blank=True, editable=False, null=True, on_delete=django.db.models.deletion.PROTECT, related_name='+', to='submit.blob'),
+        ),
+        migrations.RunPython(move_to_blobs, move_from_blobs),
+        # A default lets the text column be re-added on rows that exist when unapplying
+        migrations.AlterField(
+            model_name='submission',
+            name='code',
+            field=models.TextField(default=''),
+        ),
+        migrations.RemoveField(
+            model_name='submission',
+            name='code',
+        ),
+    ]
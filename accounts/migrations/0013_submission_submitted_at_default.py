@@ -0,0 +1,19 @@
+# Generated by Django 4.2.13 on 2026-10-18 08:34
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0012_submission_code_blob'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='submission',
+            name='submitted_at',
+            field=models.DateTimeField(default=django.utils.timezone.now, editable=False),
+        ),
+    ]
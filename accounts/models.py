@@ -1,23 +1,94 @@
 import uuid
-from django.db import models
+from django.db import models, transaction
 from django.contrib.auth.models import User
+from django.utils import timezone
+
+from submit.blobs import blob_text, save_pending
+
+from . import search
 
 # Create your models here.
 
+# Characters of the problem statement shown in the problem list
+EXCERPT_CHARS = 100
+
+
+def parse_tags(text):
+    """Normalized tag names from a comma-separated `Problem.tags` string."""
+    names = (name.strip().lower() for name in (text or '').split(','))
+    return list(dict.fromkeys(name for name in names if name))
+
+
+class Tag(models.Model):
+    name = models.CharField(max_length=64, unique=True)
+
+    def __str__(self):
+        return self.name
+
 class Problem(models.Model):
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
     title = models.CharField(max_length=255)
     description = models.TextField()  # Or store file path if using files
     difficulty = models.CharField(max_length=50, choices=[('Easy', 'Easy'), ('Medium', 'Medium'), ('Hard', 'Hard')], default='Easy')
-    tags = models.CharField(max_length=255, blank=True, null=True) # Comma-separated tags
+    tags = models.CharField(max_length=255, blank=True, null=True) # Comma-separated tags, indexed in tag_set on save
     created_by = models.ForeignKey(User, on_delete=models.CASCADE)
     created_at = models.DateTimeField(auto_now_add=True)
     admin_verified_code = models.TextField(blank=True, null=True)
     problem_file = models.CharField(max_length=255, blank=True, null=True)  # Path to problem file
+    float_tolerance = models.FloatField(blank=True, null=True)  # Allowed abs/rel error for numeric output tokens
+    # Optional special judge: called as `checker <input> <expected> <output>`, exit 0 = AC, 1/2 = WA
+    checker_code = models.TextField(blank=True, null=True)
+    checker_language = models.CharField(max_length=10, choices=[('cpp', 'C++'), ('py', 'Python')], blank=True, null=True)
+    # Untick for checkers with randomness so identical submissions are always judged afresh
+    deterministic_checker = models.BooleanField(default=True)
+    # Maintained by save() so the problem list needs no file reads or tag parsing
+    excerpt = models.CharField(max_length=EXCERPT_CHARS, blank=True, default='', editable=False)
+    tag_set = models.ManyToManyField(Tag, related_name='problems', blank=True, editable=False)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['created_at', 'id'], name='problem_list_idx'),
+            models.Index(fields=['difficulty', 'created_at', 'id'], name='problem_difficulty_list_idx'),
+        ]
 
     def __str__(self):
         return self.title
 
+    def read_excerpt(self):
+        """Start of the statement: the problem file if readable, else the description."""
+        if self.problem_file:
+            try:
+                with open(self.problem_file, 'r', encoding='utf-8') as f:
+                    return f.read(EXCERPT_CHARS)
+            except Exception:
+                return ''
+        return (self.description or '')[:EXCERPT_CHARS]
+
+    def read_statement(self):
+        """Full statement text, as shown on the problem page."""
+        if self.problem_file:
+            try:
+                with open(self.problem_file, 'r', encoding='utf-8') as f:
+                    text = f.read()
+                if text:
+                    return text
+            except Exception:
+                pass
+        return self.description or ''
+
+    def save(self, *args, **kwargs):
+        self.excerpt = self.read_excerpt()
+        if kwargs.get('update_fields') is not None:
+            kwargs['update_fields'] = {*kwargs['update_fields'], 'excerpt'}
+        super().save(*args, **kwargs)
+        self.sync_tags()
+        search.index_problem(self)
+
+    def sync_tags(self):
+        names = parse_tags(self.tags)
+        Tag.objects.bulk_create([Tag(name=name) for name in names], ignore_conflicts=True)
+        self.tag_set.set(Tag.objects.filter(name__in=names))
+
 class TestCase(models.Model):
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
     problem = models.ForeignKey(Problem, on_delete=models.CASCADE)
@@ -27,13 +98,85 @@ class TestCase(models.Model):
     def __str__(self):
         return f"TestCase for {self.problem.title}"
 
+class ProblemTerm(models.Model):
+    """One posting of the problem search index (see accounts.search)."""
+    term = models.CharField(max_length=64)
+    problem = models.ForeignKey(Problem, on_delete=models.CASCADE, related_name='search_terms')
+    weight = models.FloatField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['term', 'problem'], name='problem_term_unique'),
+        ]
+
+    def __str__(self):
+        return f"{self.term} in {self.problem_id}"
+
 class Submission(models.Model):
     user = models.ForeignKey(User, on_delete=models.CASCADE)
     problem = models.ForeignKey(Problem, on_delete=models.CASCADE)
-    code = models.TextField()
+    # The code lives in the submit blob store, shared with the judged CodeSubmission
+    code_blob = models.ForeignKey('submit.Blob', on_delete=models.PROTECT, blank=True, null=True,
+                                  related_name='+', editable=False)
     language = models.CharField(max_length=50)
-    submitted_at = models.DateTimeField(auto_now_add=True)
+    submitted_at = models.DateTimeField(default=timezone.now, editable=False)
     verdict = models.CharField(max_length=50)
+    # Per-test results of the last (re)judgement, see submit.judge.run_tests
+    test_results = models.JSONField(default=list, blank=True)
+    judged_at = models.DateTimeField(blank=True, null=True)
+
+    class Meta:
+        indexes = [
+            # Submission history: per user, per user and problem, and per problem by verdict
+            models.Index(fields=['user', 'submitted_at'], name='submission_user_idx'),
+            models.Index(fields=['user', 'problem', 'submitted_at'], name='submission_user_problem_idx'),
+            models.Index(fields=['problem', 'verdict'], name='submission_problem_verdict_idx'),
+        ]
+
+    code = blob_text('code_blob')
+
+    def save(self, *args, **kwargs):
+        with transaction.atomic():
+            save_pending(self)
+            super().save(*args, **kwargs)
 
     def __str__(self):
         return f"Submission by {self.user.username} for {self.problem.title}"
+
+
+# Judge statistics, maintained by accounts.stats with every verdict change
+
+class ProblemStats(models.Model):
+    problem = models.OneToOneField(Problem, on_delete=models.CASCADE, primary_key=True, related_name='stats')
+    attempts = models.PositiveIntegerField(default=0)
+    accepted = models.PositiveIntegerField(default=0)
+    # Distinct users with at least one accepted submission
+    solvers = models.PositiveIntegerField(default=0)
+
+    def __str__(self):
+        return f"Stats for {self.problem_id}"
+
+class UserStats(models.Model):
+    user = models.OneToOneField(User, on_delete=models.CASCADE, primary_key=True, related_name='judge_stats')
+    attempts = models.PositiveIntegerField(default=0)
+    accepted = models.PositiveIntegerField(default=0)
+    # Distinct problems solved
+    solved = models.PositiveIntegerField(default=0)
+
+    def __str__(self):
+        return f"Stats for {self.user_id}"
+
+class UserProblemStats(models.Model):
+    """One user's record on one problem; ``accepted > 0`` puts it in the user's solved set."""
+    user = models.ForeignKey(User, on_delete=models.CASCADE)
+    problem = models.ForeignKey(Problem, on_delete=models.CASCADE)
+    attempts = models.PositiveIntegerField(default=0)
+    accepted = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'problem'], name='user_problem_stats_unique'),
+        ]
+
+    def __str__(self):
+        return f"Stats for {self.user_id} on {self.problem_id}"
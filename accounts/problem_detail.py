@@ -0,0 +1,113 @@
+"""Problem detail payloads, built once and kept in the shared 'problems' cache.
+
+A payload records every file it was built from with its mtime and size
+(``None`` for files that were missing), so an entry is used only while
+those files are unchanged; checking costs a few stat() calls and no
+queries. Saves and deletes of `Problem` and `TestCase` rows call `invalidate`
+(see accounts.signals). The
+judge counters change with every verdict, so they are not part of the payload
+or its ETag; get_problem adds them to each response.
+"""
+import hashlib
+import json
+import os
+import time
+from pathlib import Path
+
+from django.conf import settings
+from django.core.cache import caches
+
+CACHE_ALIAS = 'problems'
+
+
+def _key(problem_id):
+    return f'problem-detail:{problem_id}'
+
+
+def _stat(path):
+    try:
+        stat = os.stat(path)
+    except (OSError, ValueError):
+        return None
+    return [stat.st_mtime_ns, stat.st_size]
+
+
+def _read(path, sources):
+    """Contents of `path`, noting its state in `sources` first so a failed read is tracked too."""
+    sources[str(path)] = _stat(path)
+    with open(path, 'r', encoding='utf-8') as f:
+        return f.read()
+
+
+def build(problem):
+    """Build the cache entry for `problem`: ``{'payload', 'etag', 'last_modified', 'sources'}``."""
+    from .models import TestCase
+
+    sources = {}
+    testcase = TestCase.objects.filter(problem=problem).first()
+    # Prefer file description; fallback to DB field
+    description = ""
+    try:
+        if problem.problem_file:
+            description = _read(problem.problem_file, sources)
+    except Exception:
+        description = ""
+    if not description:
+        description = problem.description or ""
+    # Prefer TestCase files; fallback to filesystem testcases/<uuid>/<uuid>.in|.out
+    sample_input = ""
+    sample_output = ""
+    try:
+        if testcase and testcase.input_file:
+            sample_input = _read(testcase.input_file, sources)
+        if testcase and testcase.output_file:
+            sample_output = _read(testcase.output_file, sources)
+    except Exception:
+        pass
+    if not sample_input or not sample_output:
+        tc_dir = Path(settings.BASE_DIR) / 'testcases' / str(problem.id)
+        in_path = tc_dir / f"{problem.id}.in"
+        out_path = tc_dir / f"{problem.id}.out"
+        sources.setdefault(str(in_path), _stat(in_path))
+        sources.setdefault(str(out_path), _stat(out_path))
+        try:
+            if in_path.exists() and not sample_input:
+                sample_input = _read(in_path, sources)
+            if out_path.exists() and not sample_output:
+                sample_output = _read(out_path, sources)
+        except Exception:
+            pass
+    payload = {
+        'id': str(problem.id),
+        'title': problem.title,
+        'description': description,
+        'sample_input': sample_input,
+        'sample_output': sample_output,
+        'difficulty': problem.difficulty,
+        'tags': problem.tags.split(',') if problem.tags else [],
+    }
+    digest = hashlib.sha256(json.dumps(payload, sort_keys=True).encode()).hexdigest()
+    return {
+        'payload': payload,
+        'etag': f'"{digest[:32]}"',
+        'last_modified': int(time.time()),
+        'sources': sources,
+    }
+
+
+def get(problem_id):
+    """The cached entry for `problem_id`, or None if missing or its files changed."""
+    entry = caches[CACHE_ALIAS].get(_key(problem_id))
+    if entry is None:
+        return None
+    if any(_stat(path) != state for path, state in entry['sources'].items()):
+        return None
+    return entry
+
+
+def put(problem_id, entry):
+    caches[CACHE_ALIAS].set(_key(problem_id), entry)
+
+
+def invalidate(problem_id):
+    caches[CACHE_ALIAS].delete(_key(problem_id))
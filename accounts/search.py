@@ -0,0 +1,129 @@
+"""Inverted index over problem titles, statements and tags.
+
+Every problem's text is split into lower-cased terms, and one `ProblemTerm`
+row per (term, problem) holds the term's weight in that problem: title
+occurrences count three times, tags twice and statement occurrences once,
+dampened with log(1 + n). `Problem.save()` rewrites a problem's rows.
+
+`search` looks every query word up as an exact term and, from
+PREFIX_MIN_CHARS characters on, as a prefix (its MAX_EXPANSIONS most common
+completions), via range scans of the (term, problem) index. Problems must
+match every word. They are ranked by the sum of weight x idf, with
+prefix-only matches at half weight. Only postings of problems containing
+the rarest query word are read, so the cost follows that word's document
+frequency rather than the catalog size.
+"""
+import math
+import re
+
+from django.db.models import Count, Q
+
+TERM_RE = re.compile(r'\w+')
+MAX_TERM_CHARS = 64
+MAX_QUERY_WORDS = 8
+PREFIX_MIN_CHARS = 2
+# Most frequent completions kept per prefix
+MAX_EXPANSIONS = 16
+PREFIX_WEIGHT = 0.5
+FIELD_WEIGHTS = {'title': 3.0, 'tags': 2.0, 'statement': 1.0}
+STOPWORDS = frozenset(
+    'a an and are as at be by for from in is it of on or that the this to with you your'.split()
+)
+
+
+def tokenize(text):
+    """Index terms of `text`, in order, repeats included."""
+    return [
+        word[:MAX_TERM_CHARS]
+        for word in TERM_RE.findall((text or '').lower())
+        if word not in STOPWORDS and (len(word) > 1 or word.isdigit())
+    ]
+
+
+def term_weights(title, statement, tags):
+    """``{term: weight}`` for one problem."""
+    counts = {}
+    for field, text in (('title', title), ('statement', statement), ('tags', ' '.join(tags))):
+        for term in tokenize(text):
+            counts[term] = counts.get(term, 0) + FIELD_WEIGHTS[field]
+    return {term: round(math.log1p(count), 4) for term, count in counts.items()}
+
+
+def index_problem(problem):
+    """Replace the index rows of `problem` (a saved `Problem`)."""
+    from .models import ProblemTerm, parse_tags
+
+    weights = term_weights(problem.title, problem.read_statement(), parse_tags(problem.tags))
+    ProblemTerm.objects.filter(problem=problem).delete()
+    ProblemTerm.objects.bulk_create(
+        [ProblemTerm(term=term, problem=problem, weight=weight) for term, weight in weights.items()]
+    )
+
+
+def _range(prefix):
+    return Q(term__gte=prefix, term__lt=prefix + '\U0010ffff')
+
+
+def search(query, limit=20):
+    """Best matches for `query`: a list of ``(Problem, score)``, best first."""
+    from .models import Problem, ProblemTerm
+
+    words = list(dict.fromkeys(tokenize(query)))[:MAX_QUERY_WORDS]
+    if not words:
+        return []
+
+    # 1. Candidate terms of every word and their document frequencies
+    # One range scan per word: ORed ranges would make SQLite scan the whole index
+    lookups = [
+        ProblemTerm.objects.filter(_range(word) if len(word) >= PREFIX_MIN_CHARS else Q(term=word))
+        .values('term').annotate(df=Count('problem_id')).values_list('term', 'df')
+        for word in words
+    ]
+    frequencies = dict(lookups[0].union(*lookups[1:], all=True))
+    total = Problem.objects.count() or 1
+    # word -> {term: query weight}
+    expansions = {}
+    for word in words:
+        found = {term: df for term, df in frequencies.items() if term == word or term.startswith(word)}
+        kept = sorted(found, key=lambda term: (term != word, -found[term]))[:MAX_EXPANSIONS]
+        if not kept:
+            return []
+        expansions[word] = {
+            term: math.log(1 + total / found[term]) * (1.0 if term == word else PREFIX_WEIGHT)
+            for term in kept
+        }
+
+    # 2. Problems must contain the rarest word, so only its postings are
+    # scanned in full; the other words are looked up for those problems alone
+    rarest = min(words, key=lambda word: sum(frequencies[term] for term in expansions[word]))
+    postings = list(
+        ProblemTerm.objects.filter(term__in=list(expansions[rarest])).values_list('problem_id', 'term', 'weight')
+    )
+    others = {term for word in words if word != rarest for term in expansions[word]}
+    if others:
+        candidates = ProblemTerm.objects.filter(term__in=list(expansions[rarest])).values('problem_id')
+        postings += ProblemTerm.objects.filter(
+            term__in=list(others), problem_id__in=candidates,
+        ).values_list('problem_id', 'term', 'weight')
+
+    # term -> [(word, query weight)]; a term can complete several words
+    term_words = {}
+    for word, weights in expansions.items():
+        for term, weight in weights.items():
+            term_words.setdefault(term, []).append((word, weight))
+    scores = {}
+    matched = {}
+    for problem_id, term, weight in postings:
+        for word, query_weight in term_words[term]:
+            scores[problem_id] = scores.get(problem_id, 0.0) + query_weight * weight
+            matched.setdefault(problem_id, set()).add(word)
+    ranked = sorted(
+        ((problem_id, score) for problem_id, score in scores.items() if len(matched[problem_id]) == len(words)),
+        key=lambda item: (-item[1], item[0]),
+    )[:limit]
+
+    # 3. The problems themselves
+    problems = Problem.objects.only('id', 'title', 'excerpt', 'difficulty', 'tags').in_bulk(
+        [problem_id for problem_id, _ in ranked]
+    )
+    return [(problems[problem_id], round(score, 4)) for problem_id, score in ranked if problem_id in problems]
@@ -1,6 +1,8 @@
 from django.contrib.auth.models import User
 from rest_framework import serializers
 
+from .models import Submission
+
 class UserSerializer(serializers.ModelSerializer):
     class Meta:
         model = User
@@ -16,4 +18,12 @@ class UserSerializer(serializers.ModelSerializer):
             email=validated_data['email'],
             password=validated_data['password']
         )
-        return user 
\ No newline at end of file
+        return user 
+
+class SubmissionListSerializer(serializers.ModelSerializer):
+    """Submission history row; the code itself is left out."""
+    problem_title = serializers.CharField(source='problem.title', read_only=True)
+
+    class Meta:
+        model = Submission
+        fields = ('id', 'user', 'problem', 'problem_title', 'language', 'verdict', 'submitted_at', 'judged_at')
@@ -0,0 +1,29 @@
+"""Invalidate cached problem detail payloads when problems or their tests change.
+
+Signals rather than save()/delete() overrides, so cascades (deleting a
+problem deletes its test cases) and admin bulk deletes are covered too.
+QuerySet.update() sends no signal; entries expire after
+PROBLEM_DETAIL_CACHE_SECONDS for that case.
+"""
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from . import problem_detail
+from .models import Problem, TestCase
+
+
+def _invalidate_on_commit(problem_id):
+    # After commit, so a concurrent request cannot re-cache the old rows
+    transaction.on_commit(lambda: problem_detail.invalidate(problem_id))
+
+
+@receiver([post_save, post_delete], sender=Problem)
+def problem_changed(sender, instance, **kwargs):
+    _invalidate_on_commit(instance.pk)
+
+
+# The first test case supplies the samples of the problem detail payload
+@receiver([post_save, post_delete], sender=TestCase)
+def testcase_changed(sender, instance, **kwargs):
+    _invalidate_on_commit(instance.problem_id)
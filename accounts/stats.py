@@ -0,0 +1,151 @@
+"""Per-problem and per-user judge statistics, kept up to date incrementally.
+
+`record_verdict` applies one verdict change to `ProblemStats`, `UserStats`
+and `UserProblemStats` with F() updates. Callers run it in the transaction
+that stores the verdict, so the counters always agree with `Submission`.
+`rebuild` recomputes every table from `Submission` in one pass
+(``manage.py rebuild_stats``). The counters are not part of the cached
+problem detail payload (see accounts.problem_detail), so verdicts never
+invalidate it; `cached_summary` and `solved` keep them in the same cache
+under their own keys, which `record_verdict` drops once its transaction
+commits.
+"""
+import time
+from functools import partial
+
+from django.core.cache import caches
+from django.db import transaction
+from django.db.models import Count, F, Q, Sum
+
+ACCEPTED = 'AC'
+CACHE_ALIAS = 'problems'
+
+
+def _summary_key(problem_id):
+    return f'problem-stats:{problem_id}'
+
+
+def _solved_key(user_id, problem_id):
+    return f'problem-solved:{problem_id}:{user_id}'
+
+
+def _bump(model, lookup, **deltas):
+    """Add `deltas` to the row of `model` matching `lookup`, creating it if needed."""
+    changes = {field: F(field) + delta for field, delta in deltas.items() if delta}
+    if changes and not model.objects.filter(**lookup).update(**changes):
+        model.objects.get_or_create(**lookup)
+        model.objects.filter(**lookup).update(**changes)
+
+
+def record_verdict(user_id, problem_id, old_verdict, new_verdict):
+    """Count a verdict of `user_id` on `problem_id`.
+
+    `old_verdict` is None for a new submission, or the verdict being replaced
+    when a submission is rejudged.
+    """
+    attempts = 1 if old_verdict is None else 0
+    accepted = (new_verdict == ACCEPTED) - (old_verdict == ACCEPTED)
+    if not attempts and not accepted:
+        return
+    from .models import ProblemStats, UserProblemStats, UserStats
+
+    with transaction.atomic():
+        record, _ = UserProblemStats.objects.select_for_update().get_or_create(user_id=user_id, problem_id=problem_id)
+        was_solved = record.accepted > 0
+        UserProblemStats.objects.filter(pk=record.pk).update(
+            attempts=F('attempts') + attempts, accepted=F('accepted') + accepted,
+        )
+        solved = (record.accepted + accepted > 0) - was_solved
+        _bump(ProblemStats, {'problem_id': problem_id}, attempts=attempts, accepted=accepted, solvers=solved)
+        _bump(UserStats, {'user_id': user_id}, attempts=attempts, accepted=accepted, solved=solved)
+        transaction.on_commit(partial(_forget, user_id, problem_id))
+
+
+def _forget(user_id, problem_id):
+    caches[CACHE_ALIAS].delete_many([_summary_key(problem_id), _solved_key(user_id, problem_id)])
+
+
+def summary(problem):
+    """Counters of `problem` for API responses; select_related('stats') avoids a query."""
+    from .models import ProblemStats
+
+    try:
+        return _counters(problem.stats)
+    except ProblemStats.DoesNotExist:
+        return _counters(None)
+
+
+def problem_summary(problem_id):
+    """`summary` for a problem known only by id, with one primary-key lookup."""
+    from .models import ProblemStats
+
+    return _counters(ProblemStats.objects.filter(problem_id=problem_id).first())
+
+
+def cached_summary(problem_id):
+    """`problem_summary` from the cache: ``{'counters', 'updated'}``, where
+    `updated` is when the counters were read from the database."""
+    cache = caches[CACHE_ALIAS]
+    entry = cache.get(_summary_key(problem_id))
+    if entry is None:
+        entry = {'counters': problem_summary(problem_id), 'updated': int(time.time())}
+        cache.set(_summary_key(problem_id), entry)
+    return entry
+
+
+def solved(user_id, problem_id):
+    """Whether `user_id` has an accepted submission for `problem_id`, cached like `cached_summary`."""
+    from .models import UserProblemStats
+
+    cache = caches[CACHE_ALIAS]
+    result = cache.get(_solved_key(user_id, problem_id))
+    if result is None:
+        result = UserProblemStats.objects.filter(user_id=user_id, problem_id=problem_id, accepted__gt=0).exists()
+        cache.set(_solved_key(user_id, problem_id), result)
+    return result
+
+
+def _counters(stats):
+    attempts, accepted, solvers = (stats.attempts, stats.accepted, stats.solvers) if stats is not None else (0, 0, 0)
+    return {
+        'attempts': attempts,
+        'accepted': accepted,
+        'solvers': solvers,
+        'acceptance_rate': round(accepted / attempts, 4) if attempts else None,
+    }
+
+
+def rebuild():
+    """Recompute all statistics from `Submission`; returns the number of (user, problem) pairs."""
+    from .models import ProblemStats, Submission, UserProblemStats, UserStats
+
+    with transaction.atomic():
+        UserProblemStats.objects.all().delete()
+        ProblemStats.objects.all().delete()
+        UserStats.objects.all().delete()
+        UserProblemStats.objects.bulk_create(
+            UserProblemStats(user_id=row['user_id'], problem_id=row['problem_id'],
+                             attempts=row['attempts'], accepted=row['accepted'])
+            for row in Submission.objects.values('user_id', 'problem_id').annotate(
+                attempts=Count('id'), accepted=Count('id', filter=Q(verdict=ACCEPTED)),
+            ).order_by()
+        )
+        # Annotations may not reuse the field names they sum
+        totals = {'total_attempts': Sum('attempts'), 'total_accepted': Sum('accepted')}
+        ProblemStats.objects.bulk_create(
+            ProblemStats(problem_id=row['problem_id'], attempts=row['total_attempts'], accepted=row['total_accepted'],
+                         solvers=row['solvers'])
+            for row in UserProblemStats.objects.values('problem_id').annotate(
+                **totals, solvers=Count('id', filter=Q(accepted__gt=0)),
+            ).order_by()
+        )
+        UserStats.objects.bulk_create(
+            UserStats(user_id=row['user_id'], attempts=row['total_attempts'], accepted=row['total_accepted'],
+                      solved=row['solved'])
+            for row in UserProblemStats.objects.values('user_id').annotate(
+                **totals, solved=Count('id', filter=Q(accepted__gt=0)),
+            ).order_by()
+        )
+        # Drops the cached problem detail payloads too; they are rebuilt on demand
+        transaction.on_commit(caches[CACHE_ALIAS].clear)
+        return UserProblemStats.objects.count()
@@ -1,3 +1,309 @@
-from django.test import TestCase
+import os
+import shutil
+import tempfile
+from datetime import timedelta
+from pathlib import Path
 
-# Create your tests here.
+from django.contrib.auth.models import User
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework_simplejwt.tokens import AccessToken
+
+from . import search, stats
+from .models import Problem, ProblemStats, Submission, UserProblemStats, UserStats
+from .models import TestCase as ProblemTestCase
+
+LOCMEM_CACHES = {
+    alias: {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': alias}
+    for alias in ('default', 'judge', 'problems')
+}
+
+
+def _snapshot():
+    return (
+        sorted(UserProblemStats.objects.values_list('user_id', 'problem_id', 'attempts', 'accepted')),
+        sorted(ProblemStats.objects.values_list('problem_id', 'attempts', 'accepted', 'solvers')),
+        sorted(UserStats.objects.values_list('user_id', 'attempts', 'accepted', 'solved')),
+    )
+
+
+class StatsTests(TestCase):
+    def setUp(self):
+        self.alice = User.objects.create(username='alice')
+        self.bob = User.objects.create(username='bob')
+        self.sum = Problem.objects.create(title='Sum', description='Add numbers', created_by=self.alice)
+        self.sort = Problem.objects.create(title='Sort', description='Sort numbers', created_by=self.alice)
+
+    def _submit(self, user, problem, verdict):
+        submission = Submission.objects.create(user=user, problem=problem, language='py', verdict=verdict)
+        stats.record_verdict(user.id, problem.id, None, verdict)
+        return submission
+
+    def _rejudge(self, submission, verdict):
+        stats.record_verdict(submission.user_id, submission.problem_id, submission.verdict, verdict)
+        Submission.objects.filter(id=submission.id).update(verdict=verdict)
+
+    def test_incremental_counters_match_rebuild(self):
+        self._submit(self.alice, self.sum, 'WA')
+        self._submit(self.alice, self.sum, 'AC')
+        self._submit(self.alice, self.sum, 'AC')
+        first = self._submit(self.bob, self.sum, 'WA')
+        self._submit(self.bob, self.sort, 'TLE')
+        accepted = self._submit(self.bob, self.sort, 'AC')
+        self._rejudge(first, 'AC')
+        self._rejudge(accepted, 'WA')
+        incremental = _snapshot()
+
+        self.assertEqual(stats.rebuild(), 3)
+        self.assertEqual(_snapshot(), incremental)
+
+    def test_summary(self):
+        self.assertEqual(stats.problem_summary(self.sum.id)['acceptance_rate'], None)
+        self._submit(self.alice, self.sum, 'WA')
+        self._submit(self.alice, self.sum, 'AC')
+        self._submit(self.bob, self.sum, 'WA')
+        summary = stats.problem_summary(self.sum.id)
+        self.assertEqual(
+            (summary['attempts'], summary['accepted'], summary['solvers'], summary['acceptance_rate']),
+            (3, 1, 1, round(1 / 3, 4)),
+        )
+        self.assertEqual(stats.summary(Problem.objects.select_related('stats').get(id=self.sum.id)), summary)
+
+
+class SearchTests(TestCase):
+    def setUp(self):
+        author = User.objects.create(username='author')
+        self.path = Problem.objects.create(
+            title='Shortest path', description='Find the shortest path in a weighted graph.',
+            tags='graphs,dijkstra', created_by=author,
+        )
+        self.tree = Problem.objects.create(
+            title='Tree diameter', description='Longest path in a tree, which is also a graph.',
+            tags='trees', created_by=author,
+        )
+        self.sum = Problem.objects.create(title='Sum', description='Add two numbers.', created_by=author)
+
+    def _titles(self, query):
+        return [problem.title for problem, _ in search.search(query)]
+
+    def test_title_matches_rank_first(self):
+        self.assertEqual(self._titles('path'), ['Shortest path', 'Tree diameter'])
+
+    def test_every_word_must_match(self):
+        self.assertEqual(self._titles('path tree'), ['Tree diameter'])
+        self.assertEqual(self._titles('path numbers'), [])
+
+    def test_prefix_matching(self):
+        self.assertEqual(self._titles('dijk'), ['Shortest path'])
+        self.assertEqual(set(self._titles('gra')), {'Shortest path', 'Tree diameter'})
+
+    def test_exact_match_outranks_prefix_match(self):
+        Problem.objects.create(
+            title='Graphs', description='Count graphs.', created_by=self.sum.created_by,
+        )
+        Problem.objects.create(
+            title='Gra', description='A gra problem.', created_by=self.sum.created_by,
+        )
+        self.assertEqual(self._titles('gra')[0], 'Gra')
+
+    def test_stopwords_and_unknown_words(self):
+        self.assertEqual(search.search('the of'), [])
+        self.assertEqual(search.search('nonexistent'), [])
+
+    def test_index_follows_edits(self):
+        self.sum.title = 'Sum of a graph'
+        self.sum.save()
+        self.assertIn('Sum of a graph', self._titles('graph'))
+
+
+@override_settings(CACHES=LOCMEM_CACHES, ALLOWED_HOSTS=['testserver'])
+class ProblemDetailTests(TestCase):
+    def setUp(self):
+        self.dir = Path(tempfile.mkdtemp())
+        self.addCleanup(shutil.rmtree, self.dir)
+        self.statement = self.dir / 'statement.md'
+        self.statement.write_text('Add two numbers.')
+        (self.dir / '1.in').write_text('1 2\n')
+        (self.dir / '1.out').write_text('3\n')
+        self.author = author = User.objects.create(username='author')
+        self.problem = Problem.objects.create(title='Sum', problem_file=str(self.statement), created_by=author)
+        self.testcase = ProblemTestCase.objects.create(
+            problem=self.problem, input_file=str(self.dir / '1.in'), output_file=str(self.dir / '1.out'),
+        )
+        self.url = reverse('get-problem', args=[self.problem.id])
+
+    def _get(self, **headers):
+        return self.client.get(self.url, **headers)
+
+    def test_matching_etag_gets_304(self):
+        response = self._get()
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['sample_input'], '1 2\n')
+        etag = response['ETag']
+        self.assertEqual(self._get(HTTP_IF_NONE_MATCH=etag).status_code, 304)
+        self.assertEqual(self._get(HTTP_IF_NONE_MATCH='"other"').status_code, 200)
+
+    def test_problem_save_changes_etag(self):
+        etag = self._get()['ETag']
+        with self.captureOnCommitCallbacks(execute=True):
+            self.problem.title = 'Sum of two'
+            self.problem.save()
+        response = self._get(HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['title'], 'Sum of two')
+
+    def test_testcase_save_changes_etag(self):
+        etag = self._get()['ETag']
+        (self.dir / '2.in').write_text('5 5\n')
+        with self.captureOnCommitCallbacks(execute=True):
+            self.testcase.input_file = str(self.dir / '2.in')
+            self.testcase.save()
+        response = self._get(HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['sample_input'], '5 5\n')
+
+    def test_problem_delete_drops_entry(self):
+        self._get()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.problem.delete()
+        self.assertEqual(self._get().status_code, 404)
+
+    def test_touching_a_source_file_rebuilds(self):
+        etag = self._get()['ETag']
+        self.statement.write_text('Add two integers.')
+        stat = self.statement.stat()
+        os.utime(self.statement, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+        response = self._get(HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['description'], 'Add two integers.')
+
+    def test_revalidation_costs_no_queries(self):
+        etag = self._get()['ETag']
+        with self.assertNumQueries(0):
+            self.assertEqual(self._get(HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+    def test_verdicts_change_etag(self):
+        response = self._get()
+        self.assertEqual((response.json()['attempts'], response.json()['solved']), (0, False))
+        with self.captureOnCommitCallbacks(execute=True):
+            stats.record_verdict(self.author.id, self.problem.id, None, 'AC')
+        response = self._get(HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['attempts'], 1)
+
+    def test_solved_flag_is_private(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            stats.record_verdict(self.author.id, self.problem.id, None, 'AC')
+        anonymous = self._get()
+        self.assertFalse(anonymous.json()['solved'])
+        self.assertIn('public', anonymous['Cache-Control'])
+        signed_in = self._get(HTTP_AUTHORIZATION=f'Bearer {AccessToken.for_user(self.author)}')
+        self.assertTrue(signed_in.json()['solved'])
+        self.assertIn('private', signed_in['Cache-Control'])
+        self.assertNotEqual(signed_in['ETag'], anonymous['ETag'])
+
+
+@override_settings(ALLOWED_HOSTS=['testserver'])
+class ProblemListTests(TestCase):
+    def setUp(self):
+        self.author = User.objects.create(username='author')
+        specs = [
+            ('A', 'Easy', 'dp'), ('B', 'Medium', 'dp,graphs'), ('C', 'Hard', 'graphs'),
+            ('D', 'Easy', 'dp,graphs'), ('E', 'Medium', ''),
+        ]
+        for title, difficulty, tags in specs:
+            self._create(title=title, difficulty=difficulty, tags=tags)
+
+    def _create(self, **fields):
+        problem = Problem.objects.create(description=f'{fields["title"]} statement', created_by=self.author, **fields)
+        # Distinct creation times, so the order does not fall back to the random ids
+        Problem.objects.filter(pk=problem.pk).update(
+            created_at=timezone.now() + timedelta(minutes=Problem.objects.count()),
+        )
+
+    def _titles(self, **params):
+        response = self.client.get(reverse('get-problems'), params)
+        self.assertEqual(response.status_code, 200)
+        return [problem['title'] for problem in response.json()['results']]
+
+    def test_cursor_walk_is_stable_under_inserts(self):
+        seen = []
+        url = reverse('get-problems') + '?page_size=2'
+        while url:
+            body = self.client.get(url).json()
+            seen += [problem['title'] for problem in body['results']]
+            if len(seen) == 2:
+                # Rows added mid-walk sort after the cursor instead of shifting pages
+                self._create(title='F')
+            url = body['next']
+        self.assertEqual(seen, ['A', 'B', 'C', 'D', 'E', 'F'])
+
+    def test_filters(self):
+        self.assertEqual(self._titles(difficulty='Easy'), ['A', 'D'])
+        self.assertEqual(self._titles(difficulty=['Easy', 'Hard']), ['A', 'C', 'D'])
+        self.assertEqual(self._titles(tag='graphs'), ['B', 'C', 'D'])
+        self.assertEqual(self._titles(tag=['dp', 'graphs']), ['B', 'D'])
+        self.assertEqual(self._titles(tag='dp', difficulty='Medium'), ['B'])
+        self.assertEqual(self.client.get(reverse('get-problems'), {'difficulty': 'Trivial'}).status_code, 400)
+
+    def test_page_is_one_query(self):
+        with self.assertNumQueries(1):
+            self._titles(tag=['dp', 'graphs'])
+
+    def test_solved_flag_and_counters_in_the_same_query(self):
+        solved = Problem.objects.get(title='B')
+        stats.record_verdict(self.author.id, solved.id, None, 'AC')
+        headers = {'HTTP_AUTHORIZATION': f'Bearer {AccessToken.for_user(self.author)}'}
+        # One query authenticates the token, one fetches the page
+        with self.assertNumQueries(2):
+            response = self.client.get(reverse('get-problems'), **headers)
+        problems = {problem['title']: problem for problem in response.json()['results']}
+        self.assertTrue(problems['B']['solved'])
+        self.assertEqual((problems['B']['attempts'], problems['B']['accepted']), (1, 1))
+        self.assertFalse(problems['A']['solved'])
+
+
+@override_settings(ALLOWED_HOSTS=['testserver'])
+class SubmissionHistoryTests(TestCase):
+    def setUp(self):
+        self.alice = User.objects.create(username='alice')
+        self.bob = User.objects.create(username='bob')
+        self.staff = User.objects.create(username='staff', is_staff=True)
+        self.problem = Problem.objects.create(title='Sum', description='Add numbers', created_by=self.alice)
+        start = timezone.now()
+        self.submissions = [
+            Submission.objects.create(
+                user=self.alice, problem=self.problem, language='py', code=f'print({n})\n', verdict='WA',
+                submitted_at=start + timedelta(seconds=n),
+            )
+            for n in range(5)
+        ]
+        Submission.objects.create(user=self.bob, problem=self.problem, language='py', code='print(0)\n')
+
+    def _get(self, caller, **params):
+        headers = {'HTTP_AUTHORIZATION': f'Bearer {AccessToken.for_user(caller)}'} if caller else {}
+        return self.client.get(reverse('get-submissions'), params, **headers)
+
+    def test_only_own_history_unless_staff(self):
+        self.assertEqual(self._get(None).status_code, 401)
+        self.assertEqual(self._get(self.bob, user=self.alice.id).status_code, 403)
+        self.assertEqual(len(self._get(self.bob).json()['results']), 1)
+        self.assertEqual(len(self._get(self.alice, user=self.alice.id).json()['results']), 5)
+        self.assertEqual(len(self._get(self.staff, user=self.alice.id).json()['results']), 5)
+
+    def test_cursor_pages_newest_first(self):
+        seen = []
+        headers = {'HTTP_AUTHORIZATION': f'Bearer {AccessToken.for_user(self.alice)}'}
+        url = reverse('get-submissions') + '?page_size=2'
+        while url:
+            body = self.client.get(url, **headers).json()
+            seen += [row['id'] for row in body['results']]
+            url = body['next']
+        self.assertEqual(seen, [submission.id for submission in reversed(self.submissions)])
+
+    def test_code_is_not_listed(self):
+        row = self._get(self.alice, problem=str(self.problem.id)).json()['results'][0]
+        self.assertNotIn('code', row)
+        self.assertNotIn('code_blob', row)
+        self.assertEqual(row['problem_title'], 'Sum')
@@ -1,5 +1,5 @@
 from django.urls import path, include
-from accounts.views import register_user, login_user, logout_user, SignUpView, hello_world, get_problem, get_problems
+from accounts.views import register_user, login_user, logout_user, SignUpView, hello_world, get_problem, get_problems, search_problems, get_submissions
 
 urlpatterns = [
     path("hello/", hello_world, name="hello-world"),
@@ -9,4 +9,6 @@ urlpatterns = [
     path('signup/', SignUpView.as_view(), name='signup'),
     path('problem/<uuid:problem_id>/', get_problem, name='get-problem'),
     path('problems/', get_problems, name='get-problems'),
+    path('problems/search/', search_problems, name='search-problems'),
+    path('submissions/', get_submissions, name='get-submissions'),
 ]
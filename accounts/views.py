@@ -2,15 +2,21 @@ from django.contrib.auth.models import User
 from django.contrib.auth import authenticate, login, logout
 from django.http import JsonResponse
 from django.views.decorators.csrf import csrf_exempt
+import hashlib
 import json
+import uuid
 from rest_framework import generics
-from rest_framework.permissions import AllowAny
-from .serializers import UserSerializer
+from rest_framework.permissions import AllowAny, IsAuthenticated
+from .serializers import SubmissionListSerializer, UserSerializer
 from rest_framework.decorators import api_view, permission_classes
+from rest_framework.pagination import CursorPagination
 from rest_framework.response import Response
-from .models import Problem, TestCase
+from .models import Problem, Submission, UserProblemStats, parse_tags
 from django.conf import settings
-from pathlib import Path
+from django.utils.cache import get_conditional_response, patch_cache_control, patch_vary_headers
+from django.utils.http import http_date
+from django.db.models import Exists, OuterRef
+from . import problem_detail, search, stats
 
 # Create your views here.
 
@@ -87,75 +93,146 @@ class SignUpView(generics.CreateAPIView):
     permission_classes = (AllowAny,)
     serializer_class = UserSerializer
 
+class ProblemListPagination(CursorPagination):
+    """Keyset pagination over the (created_at, id) index, newest problems last."""
+    page_size = 50
+    page_size_query_param = 'page_size'
+    max_page_size = 200
+    ordering = ('created_at', 'id')
+
+
 @api_view(['GET'])
 @permission_classes([AllowAny])
 def get_problems(request):
-    problems = Problem.objects.all()
-    problem_list = []
-    for problem in problems:
-        desc = ""
-        if problem.problem_file:
-            try:
-                with open(problem.problem_file, 'r', encoding='utf-8') as f:
-                    desc = f.read(100)
-            except Exception:
-                desc = ""
-        problem_list.append({
+    """Paginated problem list; filter with ?difficulty=Easy and ?tag=dp (repeat either to widen/narrow)."""
+    # Excerpt, tags and counters are stored, so a page is one query and no file reads
+    # Counters come from the joined stats row and the solved flag from an EXISTS in the same query
+    problems = Problem.objects.select_related('stats').only(
+        'id', 'title', 'excerpt', 'difficulty', 'tags', 'created_at',
+        'stats__attempts', 'stats__accepted', 'stats__solvers',
+    )
+    if request.user:
+        problems = problems.annotate(solved=Exists(UserProblemStats.objects.filter(
+            user=request.user, problem=OuterRef('pk'), accepted__gt=0,
+        )))
+    difficulties = request.query_params.getlist('difficulty')
+    if difficulties:
+        valid = {choice for choice, _ in Problem._meta.get_field('difficulty').choices}
+        if not valid.issuperset(difficulties):
+            return Response({'error': f'Unknown difficulty; choose from {", ".join(sorted(valid))}'}, status=400)
+        problems = problems.filter(difficulty__in=difficulties)
+    # Every requested tag must be present
+    for name in parse_tags(','.join(request.query_params.getlist('tag'))):
+        problems = problems.filter(tag_set__name=name)
+
+    paginator = ProblemListPagination()
+    page = paginator.paginate_queryset(problems, request)
+    return paginator.get_paginated_response([
+        {
             'id': problem.id,
             'title': problem.title,
-            'description': desc,
+            'description': problem.excerpt,
             'difficulty': problem.difficulty,
             'tags': problem.tags.split(',') if problem.tags else [],
-        })
-    return Response(problem_list)
+            **stats.summary(problem),
+            'solved': getattr(problem, 'solved', False),
+        }
+        for problem in page
+    ])
+
+class SubmissionHistoryPagination(CursorPagination):
+    """Keyset pagination, newest first, along the (user[, problem], submitted_at) indexes."""
+    page_size = 50
+    page_size_query_param = 'page_size'
+    max_page_size = 200
+    ordering = ('-submitted_at', '-id')
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def get_submissions(request):
+    """Submission history of the caller, optionally for one ?problem=<uuid>; staff may pass ?user=<id>."""
+    user_id = request.query_params.get('user') or request.user.id
+    problem_id = request.query_params.get('problem')
+    try:
+        user_id = int(user_id)
+        if user_id != request.user.id and not request.user.is_staff:
+            return Response({'error': 'You may only list your own submissions'}, status=403)
+        submissions = Submission.objects.filter(user_id=user_id)
+        if problem_id:
+            submissions = submissions.filter(problem_id=uuid.UUID(problem_id))
+    except ValueError:
+        return Response({'error': 'Invalid user or problem id'}, status=400)
+    # Only list columns: the code text stays in the table
+    submissions = submissions.select_related('problem').only(
+        'id', 'user_id', 'problem_id', 'problem__title', 'language', 'verdict', 'submitted_at', 'judged_at',
+    )
+    paginator = SubmissionHistoryPagination()
+    page = paginator.paginate_queryset(submissions, request)
+    return paginator.get_paginated_response(SubmissionListSerializer(page, many=True).data)
+
 
 @api_view(['GET'])
 @permission_classes([AllowAny])
-def get_problem(request, problem_id):
+def search_problems(request):
+    """Ranked search over problem titles, statements and tags: ?q=graph shortest&limit=20."""
+    query = request.query_params.get('q', '').strip()
+    if not query:
+        return Response({'error': 'Query parameter q is required'}, status=400)
     try:
-        problem = Problem.objects.get(id=problem_id)
-        testcase = TestCase.objects.filter(problem=problem).first()
-        # Prefer file description; fallback to DB field
-        description = ""
-        try:
-            if problem.problem_file:
-                with open(problem.problem_file, 'r', encoding='utf-8') as f:
-                    description = f.read()
-        except Exception:
-            description = ""
-        if not description:
-            description = problem.description or ""
-        # Prefer TestCase files; fallback to filesystem testcases/<uuid>/<uuid>.in|.out
-        sample_input = ""
-        sample_output = ""
+        limit = min(max(int(request.query_params.get('limit', 20)), 1), 50)
+    except ValueError:
+        return Response({'error': 'limit must be an integer'}, status=400)
+    return Response({
+        'query': query,
+        'results': [
+            {
+                'id': problem.id,
+                'title': problem.title,
+                'description': problem.excerpt,
+                'difficulty': problem.difficulty,
+                'tags': problem.tags.split(',') if problem.tags else [],
+                'score': score,
+            }
+            for problem, score in search.search(query, limit)
+        ],
+    })
+
+
+@api_view(['GET'])
+@permission_classes([AllowAny])
+def get_problem(request, problem_id):
+    entry = problem_detail.get(problem_id)
+    if entry is None:
         try:
-            if testcase and testcase.input_file:
-                with open(testcase.input_file, 'r', encoding='utf-8') as f:
-                    sample_input = f.read()
-            if testcase and testcase.output_file:
-                with open(testcase.output_file, 'r', encoding='utf-8') as f:
-                    sample_output = f.read()
-        except Exception:
-            pass
-        if not sample_input or not sample_output:
-            tc_dir = Path(settings.BASE_DIR) / 'testcases' / str(problem.id)
-            in_path = tc_dir / f"{problem.id}.in"
-            out_path = tc_dir / f"{problem.id}.out"
-            try:
-                if in_path.exists() and not sample_input:
-                    sample_input = in_path.read_text(encoding='utf-8')
-                if out_path.exists() and not sample_output:
-                    sample_output = out_path.read_text(encoding='utf-8')
-            except Exception:
-                pass
-        return Response({
-            'id': problem.id,
-            'title': problem.title,
-            'description': description,
-            'sample_input': sample_input,
-            'sample_output': sample_output,
-            'difficulty': problem.difficulty,
-            'tags': problem.tags.split(',') if problem.tags else [],
-        })
-    except Problem.DoesNotExist:
-        return Response({'error': 'Problem not found'}, status=404)
\ No newline at end of file
+            problem = Problem.objects.get(id=problem_id)
+        except Problem.DoesNotExist:
+            return Response({'error': 'Problem not found'}, status=404)
+        entry = problem_detail.build(problem)
+        problem_detail.put(problem_id, entry)
+    summary = stats.cached_summary(problem_id)
+    user = request.user
+    solved = bool(user and user.is_authenticated and stats.solved(user.id, problem_id))
+    # The validators cover the counters and the solved flag as well as the statement
+    digest = hashlib.sha256(
+        json.dumps([entry['etag'], summary['counters'], solved], sort_keys=True).encode()
+    ).hexdigest()
+    etag = f'"{digest[:32]}"'
+    last_modified = max(entry['last_modified'], summary['updated'])
+
+    def _headers(response):
+        response['ETag'] = etag
+        response['Last-Modified'] = http_date(last_modified)
+        # The solved flag makes responses to signed-in users per-user
+        if user and user.is_authenticated:
+            patch_cache_control(response, private=True, max_age=settings.PROBLEM_DETAIL_MAX_AGE)
+        else:
+            patch_cache_control(response, public=True, max_age=settings.PROBLEM_DETAIL_MAX_AGE)
+        patch_vary_headers(response, ['Authorization'])
+        return response
+
+    # 304 without a body when the client's If-None-Match / If-Modified-Since still holds
+    not_modified = get_conditional_response(request, etag=etag, last_modified=last_modified)
+    if not_modified is not None:
+        return _headers(not_modified)
+    return _headers(Response({**entry['payload'], **summary['counters'], 'solved': solved}))
@@ -61,6 +61,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    "submit.middleware.RequestMetricsMiddleware",
     "django.middleware.security.SecurityMiddleware",
     "whitenoise.middleware.WhiteNoiseMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
@@ -225,3 +226,83 @@ REST_FRAMEWORK = {
     'UNAUTHENTICATED_USER': None,
     'UNAUTHENTICATED_TOKEN': None,
 }
+
+# Judge worker pool (see `python manage.py judge_worker`)
+JUDGE_WORKERS = int(os.environ.get("JUDGE_WORKERS", "2"))
+JUDGE_POLL_INTERVAL_SECONDS = float(os.environ.get("JUDGE_POLL_INTERVAL_SECONDS", "0.5"))
+# Submissions claimed longer ago than this are assumed orphaned and re-queued
+JUDGE_STALE_JOB_SECONDS = int(os.environ.get("JUDGE_STALE_JOB_SECONDS", "120"))
+# How often the judge_worker parent re-queues stale submissions
+JUDGE_REQUEUE_INTERVAL_SECONDS = float(os.environ.get("JUDGE_REQUEUE_INTERVAL_SECONDS", "30"))
+# Tests of one submission judged concurrently (1 = strictly sequential)
+JUDGE_TEST_WORKERS = int(os.environ.get("JUDGE_TEST_WORKERS", "1"))
+
+# Compiled C++ binaries / Java class directories, shared by all judge processes
+JUDGE_CACHE_DIR = Path(os.environ.get("JUDGE_CACHE_DIR", BASE_DIR / ".judge_cache"))
+JUDGE_COMPILE_CACHE_DIR = JUDGE_CACHE_DIR / "compile"
+# Packed test inputs written out once per content hash, so runs read them as files
+JUDGE_TESTDATA_DIR = JUDGE_CACHE_DIR / "testdata"
+JUDGE_COMPILE_CACHE_MAX_BYTES = int(os.environ.get("JUDGE_COMPILE_CACHE_MAX_BYTES", str(512 * 1024 * 1024)))
+
+# gc_blobs keeps unreferenced blobs this recent; a submission being saved may be about to refer to one
+BLOB_GC_GRACE_SECONDS = int(os.environ.get("BLOB_GC_GRACE_SECONDS", "3600"))
+
+# Java warm path: long-lived javac server and a class-data-sharing archive
+JUDGE_JAVA_WARM = os.environ.get("JUDGE_JAVA_WARM", "true").strip().lower() in ("1", "true", "yes", "on")
+
+# Per-run scratch directories; empty = /dev/shm when available, else the system temp dir
+JUDGE_WORKSPACE_DIR = os.environ.get("JUDGE_WORKSPACE_DIR", "")
+
+# Per-process in-memory cache of expected outputs (larger files are streamed from disk)
+JUDGE_EXPECTED_CACHE_MAX_BYTES = int(os.environ.get("JUDGE_EXPECTED_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+
+# Fork Python submissions from a pre-started interpreter instead of starting one per run
+JUDGE_PY_ZYGOTE = os.environ.get("JUDGE_PY_ZYGOTE", "false").strip().lower() in ("1", "true", "yes", "on")
+
+# Precompile common C++ headers (bits/stdc++.h) once per compiler version
+JUDGE_CPP_PCH = os.environ.get("JUDGE_CPP_PCH", "true").strip().lower() in ("1", "true", "yes", "on")
+
+# Judge slots shared by all processes on the machine: one timed run per listed
+# CPU ("0,2,4-7"), pinned to it, and a separate cap on compiles, which run on
+# their own CPUs. Empty lists reserve the highest CPUs for compiles (one per
+# compile slot, at most half) and give runs the rest (see submit.slots)
+JUDGE_RUN_CPUS = os.environ.get("JUDGE_RUN_CPUS", "")
+JUDGE_COMPILE_CPUS = os.environ.get("JUDGE_COMPILE_CPUS", "")
+JUDGE_PIN_RUNS = os.environ.get("JUDGE_PIN_RUNS", "true").strip().lower() in ("1", "true", "yes", "on")
+JUDGE_COMPILE_SLOTS = int(os.environ.get("JUDGE_COMPILE_SLOTS", "2"))
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    # Memoized verdicts, shared by every judge and web process on the machine
+    'judge': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': JUDGE_CACHE_DIR / 'verdicts',
+        'OPTIONS': {'MAX_ENTRIES': int(os.environ.get("JUDGE_VERDICT_CACHE_MAX_ENTRIES", "20000"))},
+    },
+    # Built problem detail payloads, shared by every web process on the machine.
+    # Saves and deletes invalidate entries; the timeout bounds edits made with QuerySet.update()
+    'problems': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': JUDGE_CACHE_DIR / 'problems',
+        'TIMEOUT': int(os.environ.get("PROBLEM_DETAIL_CACHE_SECONDS", "300")),
+    },
+}
+JUDGE_VERDICT_CACHE = os.environ.get("JUDGE_VERDICT_CACHE", "true").strip().lower() in ("1", "true", "yes", "on")
+JUDGE_VERDICT_CACHE_SECONDS = int(os.environ.get("JUDGE_VERDICT_CACHE_SECONDS", str(7 * 24 * 3600)))
+# Runs slower than this fraction of the time limit are not cached; they may time out under load
+JUDGE_VERDICT_CACHE_TIME_MARGIN = float(os.environ.get("JUDGE_VERDICT_CACHE_TIME_MARGIN", "0.5"))
+
+# Prometheus metrics: each process flushes its samples here and /metrics merges them.
+# METRICS_TOKEN, when set, must be sent as "Authorization: Bearer <token>"; without one
+# /metrics only answers requests from the loopback interface
+JUDGE_METRICS_DIR = os.environ.get("JUDGE_METRICS_DIR", str(JUDGE_CACHE_DIR / 'metrics'))
+JUDGE_METRICS_FLUSH_SECONDS = float(os.environ.get("JUDGE_METRICS_FLUSH_SECONDS", "1"))
+METRICS_TOKEN = os.environ.get("METRICS_TOKEN", "")
+
+# Fraction of queued submissions (0-1) that record a phase trace, shown by the admin trace endpoint
+JUDGE_TRACE_SAMPLE_RATE = float(os.environ.get("JUDGE_TRACE_SAMPLE_RATE", "0.1"))
+
+# Cache-Control max-age of problem detail responses; 0 makes clients and CDNs revalidate (ETag/304) every time
+PROBLEM_DETAIL_MAX_AGE = int(os.environ.get("PROBLEM_DETAIL_MAX_AGE", "0"))
@@ -0,0 +1,162 @@
+"""Content-addressed, compressed storage for submission code, inputs and outputs.
+
+A `Blob` row is keyed by the SHA-256 of its uncompressed bytes, the same
+digest `testcases.content_hash` gives a test file. Identical content is
+stored once however many submissions refer to it, and an input that is a
+problem's test data is referenced by that test's hash. Data is
+zlib-compressed unless that does not make it smaller.
+
+Models refer to blobs with foreign keys and expose the text through
+`blob_text` properties, so ``submission.code`` reads and assigns like a
+text field while the row itself holds only the 64-character digest.
+Assigned text is written when the model saves (`save_pending`), and blobs
+no longer referenced by any row are deleted by `collect_garbage`
+(``manage.py gc_blobs``). `put` marks every blob it returns as touched, and
+collection skips blobs touched within ``BLOB_GC_GRACE_SECONDS``, so a blob
+whose referencing row has not been saved yet is not deleted under it.
+"""
+import hashlib
+import zlib
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Exists, OuterRef
+from django.db.models.deletion import ProtectedError
+from django.utils import timezone
+
+CODEC_RAW = 'raw'
+CODEC_ZLIB = 'zlib'
+# Smaller payloads rarely shrink enough to pay for decompression
+COMPRESS_MIN_BYTES = 64
+COMPRESS_LEVEL = 6
+
+
+def digest(data):
+    return hashlib.sha256(data).hexdigest()
+
+
+def encode(data):
+    """``(codec, stored bytes)`` for `data`."""
+    if len(data) >= COMPRESS_MIN_BYTES:
+        compressed = zlib.compress(data, COMPRESS_LEVEL)
+        if len(compressed) < len(data):
+            return CODEC_ZLIB, compressed
+    return CODEC_RAW, data
+
+
+def decode(codec, stored):
+    stored = bytes(stored)
+    return zlib.decompress(stored) if codec == CODEC_ZLIB else stored
+
+
+def put(data):
+    """Store `data` (str or bytes) unless it is already stored; returns its digest."""
+    from .models import Blob
+
+    if isinstance(data, str):
+        data = data.encode('utf-8')
+    key = digest(data)
+    if not Blob.objects.filter(digest=key).update(touched_at=timezone.now()):
+        codec, stored = encode(data)
+        Blob.objects.bulk_create([Blob(digest=key, size=len(data), codec=codec, data=stored)], ignore_conflicts=True)
+    return key
+
+
+def save_pending(instance):
+    """Store the blobs assigned through `blob_text` properties of `instance` since it was last saved.
+
+    Models call this from save(), in the transaction that writes the row.
+    """
+    pending = instance.__dict__.pop('_pending_blobs', None)
+    for data in (pending or {}).values():
+        put(data)
+
+
+def get(key):
+    """The bytes stored under `key`."""
+    from .models import Blob
+
+    blob = Blob.objects.get(digest=key)
+    return decode(blob.codec, blob.data)
+
+
+def blob_text(field_name):
+    """Property reading and writing text through the blob foreign key `field_name`.
+
+    Empty text is stored as a null reference. Assigning only computes the
+    digest; the blob is written by `save_pending` when the instance is saved
+    (``update_fields`` must name `field_name`). Loaded text is kept on the
+    instance.
+    """
+    attname = f'{field_name}_id'
+
+    def getter(instance):
+        key = getattr(instance, attname)
+        if key is None:
+            return ''
+        cache = instance.__dict__.setdefault('_blob_texts', {})
+        if key not in cache:
+            cache[key] = get(key).decode('utf-8', 'replace')
+        return cache[key]
+
+    def setter(instance, value):
+        if not value:
+            setattr(instance, attname, None)
+            return
+        text, data = (value, value.encode('utf-8')) if isinstance(value, str) else (value.decode('utf-8', 'replace'), value)
+        key = digest(data)
+        setattr(instance, attname, key)
+        instance.__dict__.setdefault('_blob_texts', {})[key] = text
+        instance.__dict__.setdefault('_pending_blobs', {})[key] = data
+
+    return property(getter, setter, doc=f'Text stored in the blob referenced by {field_name}.')
+
+
+def _references():
+    """``(model, attname)`` of every foreign key to `Blob`."""
+    from .models import Blob
+
+    return [
+        (relation.related_model, relation.field.attname)
+        for relation in Blob._meta.get_fields(include_hidden=True)
+        if relation.auto_created and not relation.concrete
+    ]
+
+
+def collect_garbage(batch_size=500, grace_seconds=None):
+    """Delete blobs that no row refers to; returns how many were deleted.
+
+    Blobs touched by `put` in the last `grace_seconds` (default
+    ``BLOB_GC_GRACE_SECONDS``) are kept. Each batch is deleted in its own
+    transaction, after locking its rows and checking their age again. The
+    PROTECT foreign keys are checked again at delete time, so a batch that
+    gained a reference meanwhile is skipped rather than deleted.
+    """
+    from .models import Blob
+
+    if grace_seconds is None:
+        grace_seconds = settings.BLOB_GC_GRACE_SECONDS
+    cutoff = timezone.now() - timedelta(seconds=grace_seconds)
+    unreferenced = Blob.objects.filter(touched_at__lt=cutoff)
+    for model, attname in _references():
+        unreferenced = unreferenced.filter(~Exists(model.objects.filter(**{attname: OuterRef('pk')})))
+    deleted = 0
+    after = ''
+    while True:
+        keys = list(unreferenced.filter(digest__gt=after).order_by('digest').values_list('digest', flat=True)[:batch_size])
+        if not keys:
+            return deleted
+        after = keys[-1]
+        try:
+            with transaction.atomic():
+                # A put() since the batch was listed makes its blob recent again
+                stale = list(
+                    Blob.objects.select_for_update()
+                    .filter(digest__in=keys, touched_at__lt=cutoff)
+                    .values_list('digest', flat=True)
+                )
+                count, _ = Blob.objects.filter(digest__in=stale).only('digest').delete()
+        except ProtectedError:
+            continue
+        deleted += count
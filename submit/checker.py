@@ -0,0 +1,70 @@
+"""Special-judge (checker) support.
+
+Problems that accept more than one correct answer carry a checker program
+(`Problem.checker_code`, C++ or Python). It is called as
+``checker <input> <expected output> <contestant output>`` and follows the
+testlib exit-code convention: 0 accepted, 1 wrong answer, 2 presentation
+error (judged as a wrong answer); anything else is a judge error.
+
+Checkers go through the same content-addressed compile cache as submissions,
+so a checker is compiled once and reused until its source changes.
+"""
+import subprocess
+
+from . import trace
+from .runner import CompileError, compile_program
+
+CHECKER_LANGUAGES = ('cpp', 'py')
+CHECKER_TIME_LIMIT_SECONDS = 10
+MAX_MESSAGE_CHARS = 200
+
+
+class CheckerError(Exception):
+    """The checker could not be compiled or did not produce a verdict."""
+
+
+def compile_checker(problem):
+    """Return the compiled checker `Program` for `problem`, or None if it has none."""
+    if not problem or not problem.checker_code:
+        return None
+    if problem.checker_language not in CHECKER_LANGUAGES:
+        raise CheckerError(f'Unsupported checker language: {problem.checker_language}')
+    try:
+        return compile_program(problem.checker_language, problem.checker_code, role='checker')
+    except CompileError as e:
+        raise CheckerError(f'Checker compilation failed:\n{e}')
+
+
+class OutputFile:
+    """Output sink for `execute` that writes the contestant's stdout to `path`."""
+
+    def __init__(self, path):
+        self._file = open(path, 'wb')
+
+    def feed(self, chunk):
+        self._file.write(chunk)
+        return True
+
+    def close(self):
+        self._file.close()
+
+
+def run_checker(checker, input_file, expected_file, output_file, work_dir):
+    """Run `checker` on one test inside `work_dir`; returns ``(verdict, message)``."""
+    trace.spawn(checker.argv)
+    try:
+        result = subprocess.run(
+            [*checker.argv, str(input_file), str(expected_file), str(output_file)],
+            stdin=subprocess.DEVNULL,
+            capture_output=True,
+            timeout=CHECKER_TIME_LIMIT_SECONDS,
+            cwd=str(work_dir),
+        )
+    except subprocess.TimeoutExpired:
+        raise CheckerError('Checker timed out')
+    message = (result.stderr or result.stdout).decode('utf-8', 'replace').strip()[:MAX_MESSAGE_CHARS]
+    if result.returncode == 0:
+        return 'AC', message
+    if result.returncode in (1, 2):
+        return 'WA', message
+    raise CheckerError(f'Checker exited with code {result.returncode}: {message}')
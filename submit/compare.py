@@ -0,0 +1,123 @@
+"""Streaming, whitespace-insensitive comparison of program output.
+
+`TokenComparator` is fed stdout chunks as the program writes them and pulls
+the expected tokens lazily, so neither side is ever held in memory as a whole
+and judging can stop at the first mismatching token.
+"""
+import math
+import re
+from collections import deque
+
+_TOKEN = re.compile(rb'\S+')
+CONTEXT_TOKENS = 3
+MAX_TOKEN_PREVIEW = 64
+
+
+def _preview(token):
+    if token is None:
+        return None
+    text = token[:MAX_TOKEN_PREVIEW].decode('utf-8', 'replace')
+    return text + '...' if len(token) > MAX_TOKEN_PREVIEW else text
+
+
+class _Tokenizer:
+    """Push tokenizer that keeps a partial token across chunk boundaries."""
+
+    def __init__(self):
+        self._pending = b''
+        self.line = 1
+
+    def _scan(self, data):
+        position = 0
+        for match in _TOKEN.finditer(data):
+            self.line += data.count(b'\n', position, match.start())
+            position = match.end()
+            yield match.group(), self.line
+        self.line += data.count(b'\n', position)
+
+    def feed(self, chunk):
+        data = self._pending + chunk
+        # Everything after the last whitespace byte may continue in the next chunk
+        cut = max(data.rfind(c) for c in (b' ', b'\n', b'\t', b'\r', b'\x0b', b'\x0c')) + 1
+        self._pending = data[cut:]
+        return self._scan(data[:cut])
+
+    def finish(self):
+        data, self._pending = self._pending, b''
+        return self._scan(data)
+
+
+def _iter_tokens(chunks):
+    tokenizer = _Tokenizer()
+    for chunk in chunks:
+        yield from tokenizer.feed(chunk)
+    yield from tokenizer.finish()
+
+
+def tokens_equal(expected, got, float_tolerance=None):
+    """Compare two tokens, allowing an absolute or relative error for numbers."""
+    if expected == got:
+        return True
+    if not float_tolerance:
+        return False
+    try:
+        expected_value, got_value = float(expected), float(got)
+    except ValueError:
+        return False
+    if math.isnan(expected_value) or math.isnan(got_value):
+        return False
+    return math.isclose(expected_value, got_value, rel_tol=float_tolerance, abs_tol=float_tolerance)
+
+
+class TokenComparator:
+    """Compare streamed output with expected output token by token.
+
+    `expected_chunks` is any iterable of bytes, e.g. a file read in blocks.
+    `feed` returns False as soon as a token differs; after that, or after
+    `finish` returns False, `difference` describes the first mismatch.
+    """
+
+    def __init__(self, expected_chunks, float_tolerance=None):
+        self._expected = _iter_tokens(expected_chunks)
+        self._output = _Tokenizer()
+        self._float_tolerance = float_tolerance
+        self._context = deque(maxlen=CONTEXT_TOKENS)
+        self._count = 0
+        self.difference = None
+
+    def _check(self, tokens):
+        for token, line in tokens:
+            self._count += 1
+            expected = next(self._expected, None)
+            if expected is None or not tokens_equal(expected[0], token, self._float_tolerance):
+                self._mismatch(expected[0] if expected else None, token, line)
+                return False
+            self._context.append(token)
+        return True
+
+    def _mismatch(self, expected, got, line):
+        self.difference = {
+            'token': self._count,
+            'line': line,
+            'expected': _preview(expected),
+            'got': _preview(got),
+            'context': ' '.join(_preview(token) for token in self._context),
+        }
+
+    def feed(self, chunk):
+        if self.difference is not None:
+            return False
+        return self._check(self._output.feed(chunk))
+
+    def finish(self):
+        """Flush the output and make sure no expected tokens are left over."""
+        if self.difference is not None:
+            return False
+        if not self._check(self._output.finish()):
+            return False
+        missing = next(self._expected, None)
+        if missing is not None:
+            self._count += 1
+            self._mismatch(missing[0], None, self._output.line)
+            return False
+        return True
@@ -0,0 +1,137 @@
+"""Content-addressed cache of compiled submission artifacts.
+
+Each entry is a directory named after a hash of (language, source, compiler
+version, flags) holding whatever the compiler produced: the ``g++`` binary or
+the ``javac`` class directory. Entries are built in a private staging
+directory and published with an atomic rename, so several worker processes can
+share one cache. Hits refresh the entry's mtime, and the least recently used
+entries are evicted once the cache grows past its size limit. Pinned entries
+(judge tooling that processes keep using, such as the exec helper) are never
+evicted and do not count towards the limit.
+"""
+import fcntl
+import hashlib
+import os
+import shutil
+import tempfile
+from pathlib import Path
+
+from django.conf import settings
+
+COMPLETE_MARKER = '.complete'
+PINNED_MARKER = '.pinned'
+
+
+def cache_dir():
+    path = Path(settings.JUDGE_COMPILE_CACHE_DIR)
+    path.mkdir(parents=True, exist_ok=True)
+    return path
+
+
+def cache_key(language, source, compiler_version, flags):
+    """`compiler_version` comes from the toolchain registry, so upgrades miss the cache."""
+    digest = hashlib.sha256()
+    for part in (language, compiler_version, '\0'.join(flags), source):
+        digest.update(part.encode('utf-8'))
+        digest.update(b'\0')
+    return digest.hexdigest()
+
+
+def lookup(key):
+    """Return the artifact directory for `key`, or None on a miss."""
+    entry = cache_dir() / key
+    if not (entry / COMPLETE_MARKER).exists():
+        return None
+    try:
+        os.utime(entry)  # mark as recently used
+    except OSError:
+        return None
+    return entry
+
+
+def get_or_build(key, build, pinned=False):
+    """Return ``(artifact_dir, error)`` for `key`, calling ``build(staging_dir)`` on a miss.
+
+    `build` must return ``(ok, error_text)``. Failed builds are not cached, so a
+    compile error is reported again on the next call. A `pinned` entry is
+    exempt from eviction.
+    """
+    entry = lookup(key)
+    if entry is not None:
+        if pinned and not (entry / PINNED_MARKER).exists():
+            (entry / PINNED_MARKER).touch()
+        return entry, None
+
+    root = cache_dir()
+    staging = Path(tempfile.mkdtemp(prefix='.staging-', dir=root))
+    try:
+        ok, error = build(staging)
+        if not ok:
+            return None, error
+        size = _tree_size(staging)
+        if pinned:
+            (staging / PINNED_MARKER).touch()
+        (staging / COMPLETE_MARKER).write_text(str(size))
+        entry = root / key
+        try:
+            os.rename(staging, entry)
+        except OSError:
+            # Another process published the same key first; use theirs
+            if lookup(key) is None:
+                raise
+        else:
+            evict()
+        return entry, None
+    finally:
+        shutil.rmtree(staging, ignore_errors=True)
+
+
+def evict(max_bytes=None):
+    """Delete least recently used entries until the cache fits in `max_bytes`.
+
+    Only the oldest entries are removed, so an artifact that was just looked up
+    is never deleted from under the run that is about to use it.
+    """
+    if max_bytes is None:
+        max_bytes = settings.JUDGE_COMPILE_CACHE_MAX_BYTES
+    root = cache_dir()
+    with open(root / '.lock', 'w') as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        entries = []
+        total = 0
+        for entry in root.iterdir():
+            if entry.name.startswith('.'):
+                continue
+            if (entry / PINNED_MARKER).exists():
+                continue
+            marker = entry / COMPLETE_MARKER
+            try:
+                size = int(marker.read_text() or 0)
+                mtime = entry.stat().st_mtime
+            except (OSError, ValueError):
+                continue
+            entries.append((mtime, size, entry))
+            total += size
+        entries.sort()
+        for _, size, entry in entries:
+            if total <= max_bytes:
+                break
+            # Rename first so readers never see a half-deleted entry
+            trash = root / f'.trash-{entry.name}'
+            try:
+                os.rename(entry, trash)
+            except OSError:
+                continue
+            shutil.rmtree(trash, ignore_errors=True)
+            total -= size
+
+
+def _tree_size(path):
+    total = 0
+    for dirpath, _, filenames in os.walk(path):
+        for name in filenames:
+            try:
+                total += os.path.getsize(os.path.join(dirpath, name))
+            except OSError:
+                pass
+    return total
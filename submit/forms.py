@@ -3,11 +3,26 @@ from .models import CodeSubmission
 
 
 class CodeSubmissionForm(forms.ModelForm):
+    # Stored in the blob store rather than in model fields
+    code = forms.CharField(
+        widget=forms.Textarea(attrs={'class': 'form-control', 'rows': 15, 'placeholder': 'Enter your code here...'}),
+    )
+    input_data = forms.CharField(
+        required=False,
+        widget=forms.Textarea(attrs={'class': 'form-control', 'rows': 5, 'placeholder': 'Enter input data (optional)...'}),
+    )
+
     class Meta:
         model = CodeSubmission
-        fields = ['language', 'code', 'input_data']
+        fields = ['language']
         widgets = {
             'language': forms.Select(attrs={'class': 'form-control'}),
-            'code': forms.Textarea(attrs={'class': 'form-control', 'rows': 15, 'placeholder': 'Enter your code here...'}),
-            'input_data': forms.Textarea(attrs={'class': 'form-control', 'rows': 5, 'placeholder': 'Enter input data (optional)...'}),
-        } 
\ No newline at end of file
+        }
+
+    def save(self, commit=True):
+        submission = super().save(commit=False)
+        submission.code = self.cleaned_data['code']
+        submission.input_data = self.cleaned_data['input_data']
+        if commit:
+            submission.save()
+        return submission
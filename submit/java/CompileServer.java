@@ -0,0 +1,43 @@
+import java.io.BufferedReader;
+import java.io.ByteArrayOutputStream;
+import java.io.FileDescriptor;
+import java.io.FileOutputStream;
+import java.io.IOException;
+import java.io.InputStreamReader;
+import java.io.OutputStream;
+import java.nio.charset.StandardCharsets;
+import javax.tools.JavaCompiler;
+import javax.tools.ToolProvider;
+
+/**
+ * Long-lived javac front end used by the judge (see submit/javaserver.py).
+ *
+ * Each request is one line of tab-separated javac arguments on stdin. The
+ * reply is a "<exit code> <byte count>" header line followed by that many
+ * bytes of compiler diagnostics.
+ */
+public class CompileServer {
+    public static void main(String[] args) throws IOException {
+        OutputStream protocol = new FileOutputStream(FileDescriptor.out);
+        // Anything else that prints to stdout must not corrupt the replies
+        System.setOut(System.err);
+
+        JavaCompiler compiler = ToolProvider.getSystemJavaCompiler();
+        BufferedReader in = new BufferedReader(new InputStreamReader(System.in, StandardCharsets.UTF_8));
+        String line;
+        while ((line = in.readLine()) != null) {
+            ByteArrayOutputStream diagnostics = new ByteArrayOutputStream();
+            int exitCode;
+            try {
+                exitCode = compiler.run(null, diagnostics, diagnostics, line.split("\t"));
+            } catch (Throwable t) {
+                exitCode = 2;
+                diagnostics.write(String.valueOf(t).getBytes(StandardCharsets.UTF_8));
+            }
+            byte[] body = diagnostics.toByteArray();
+            protocol.write((exitCode + " " + body.length + "\n").getBytes(StandardCharsets.US_ASCII));
+            protocol.write(body);
+            protocol.flush();
+        }
+    }
+}
@@ -0,0 +1,67 @@
+import java.io.BufferedReader;
+import java.io.BufferedWriter;
+import java.io.IOException;
+import java.io.InputStreamReader;
+import java.io.OutputStreamWriter;
+import java.io.PrintWriter;
+import java.io.StringReader;
+import java.math.BigDecimal;
+import java.math.BigInteger;
+import java.util.*;
+import java.util.stream.Collectors;
+import java.util.stream.IntStream;
+
+/**
+ * Loads the JDK classes typical submissions use, so their list can be dumped
+ * into the judge's class-data-sharing archive (see submit/javaserver.py).
+ * With "noop" it exits at once and is used to measure JVM start-up time.
+ */
+public class Warmup {
+    public static void main(String[] args) throws IOException {
+        if (args.length > 0 && args[0].equals("noop")) {
+            return;
+        }
+        String input = "3 1 2\nhello world\n1.5\n";
+        BufferedReader reader = new BufferedReader(new StringReader(input));
+        StringTokenizer st = new StringTokenizer(reader.readLine());
+        Scanner scanner = new Scanner(new StringReader(input));
+        scanner.nextInt();
+        scanner.nextLine();
+        new InputStreamReader(System.in);
+
+        List<Integer> list = new ArrayList<>();
+        while (st.hasMoreTokens()) {
+            list.add(Integer.parseInt(st.nextToken()));
+        }
+        Collections.sort(list);
+        int[] arr = list.stream().mapToInt(Integer::intValue).toArray();
+        Arrays.sort(arr);
+        long[] longs = new long[4];
+        Arrays.fill(longs, Long.MAX_VALUE);
+
+        Map<String, Integer> map = new HashMap<>();
+        map.merge("a", 1, Integer::sum);
+        TreeMap<Integer, Integer> tree = new TreeMap<>();
+        tree.put(1, 1);
+        tree.floorKey(2);
+        Set<Long> set = new HashSet<>();
+        set.add(1L);
+        TreeSet<Integer> sorted = new TreeSet<>(list);
+        Deque<Integer> deque = new ArrayDeque<>();
+        deque.push(1);
+        PriorityQueue<int[]> heap = new PriorityQueue<>((a, b) -> Integer.compare(a[0], b[0]));
+        heap.add(new int[]{1, 2});
+        LinkedList<Integer> linked = new LinkedList<>(sorted);
+        String joined = IntStream.range(0, 3).mapToObj(String::valueOf).collect(Collectors.joining(" "));
+
+        StringBuilder sb = new StringBuilder();
+        sb.append(joined).append(' ').append(Math.max(1, 2)).append(String.format("%.3f", 1.5));
+        BigInteger big = BigInteger.valueOf(7).pow(20).mod(BigInteger.TEN);
+        BigDecimal dec = new BigDecimal("1.25").setScale(1, java.math.RoundingMode.HALF_UP);
+        sb.append(big).append(dec).append(linked.size()).append(Double.parseDouble("1.5"));
+
+        PrintWriter out = new PrintWriter(new BufferedWriter(new OutputStreamWriter(System.out)));
+        out.print("");
+        out.flush();
+    }
+}
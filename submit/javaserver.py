@@ -0,0 +1,234 @@
+"""Warm-start support for Java submissions.
+
+A cold Java judgement starts two JVMs: one for ``javac`` and one for the
+program. This module keeps a long-lived compile server per judge process
+(``java/CompileServer.java``) so compiles skip JVM start-up, and builds a
+class-data-sharing (CDS) archive of the JDK classes typical submissions load
+so the program JVM starts faster. The remaining start-up cost is measured once
+and handed to the runner as a time allowance, so the Java time limit covers the
+user's code rather than the JVM.
+"""
+import fcntl
+import hashlib
+import os
+import selectors
+import subprocess
+import threading
+import time
+from pathlib import Path
+
+from django.conf import settings
+
+from . import compile_cache, toolchains
+
+HELPER_SOURCES = Path(__file__).resolve().parent / 'java'
+# Serial GC starts fastest and is plenty for a 256 MB heap
+RUNTIME_FLAGS = ['-XX:+UseSerialGC']
+# Restart the compile server now and then so javac's caches cannot grow without bound
+MAX_COMPILES_PER_SERVER = 500
+
+
+def _work_dir():
+    path = Path(settings.JUDGE_CACHE_DIR) / 'java'
+    path.mkdir(parents=True, exist_ok=True)
+    return path
+
+
+def helper_classes():
+    """Return the directory holding the compiled helper classes, building it if needed."""
+    sources = sorted(HELPER_SOURCES.glob('*.java'))
+    source_text = ''.join(path.read_text() for path in sources)
+    javac = toolchains.require('javac')
+    key = compile_cache.cache_key('java-helpers', source_text, javac.version, [])
+
+    def build(out_dir):
+        result = subprocess.run(
+            [javac.command, '-d', str(out_dir), *map(str, sources)],
+            capture_output=True, text=True, timeout=60,
+        )
+        return result.returncode == 0, result.stderr
+
+    class_dir, error = compile_cache.get_or_build(key, build)
+    if class_dir is None:
+        raise RuntimeError(f'Could not compile judge Java helpers: {error}')
+    return class_dir
+
+
+_state_lock = threading.Lock()
+_archive = None
+_archive_probed = False
+_startup_allowance = None
+
+
+def _build_archive(archive_path, class_dir):
+    """Dump the classes `Warmup` loads into a static CDS archive at `archive_path`."""
+    java = toolchains.require('java').command
+    work_dir = archive_path.parent
+    class_list = work_dir / f'{archive_path.stem}.classlist'
+    tmp_archive = work_dir / f'.{archive_path.name}.{os.getpid()}'
+    subprocess.run(
+        [java, *RUNTIME_FLAGS, f'-XX:DumpLoadedClassList={class_list}', '-cp', str(class_dir), 'Warmup'],
+        capture_output=True, timeout=60, check=True,
+    )
+    # Dumped without an application class path, so the archive is valid for any -cp
+    subprocess.run(
+        [java, *RUNTIME_FLAGS, '-Xshare:dump', f'-XX:SharedClassListFile={class_list}',
+         f'-XX:SharedArchiveFile={tmp_archive}'],
+        capture_output=True, timeout=120, check=True,
+    )
+    os.rename(tmp_archive, archive_path)
+
+
+def shared_archive():
+    """Return the CDS archive path for the installed JDK, or None if it cannot be built.
+
+    The archive name includes a hash of ``java -version``, so a JDK upgrade
+    builds a new archive. Built at most once per process and once per machine.
+    """
+    global _archive, _archive_probed
+    with _state_lock:
+        if _archive_probed:
+            return _archive
+        _archive_probed = True
+        try:
+            version = toolchains.require('java').version
+            digest = hashlib.sha256(version.encode('utf-8')).hexdigest()[:16]
+            archive_path = _work_dir() / f'judge-{digest}.jsa'
+            if not archive_path.exists():
+                with open(_work_dir() / '.archive.lock', 'w') as lock:
+                    fcntl.flock(lock, fcntl.LOCK_EX)
+                    if not archive_path.exists():
+                        _build_archive(archive_path, helper_classes())
+            _archive = archive_path
+        except (OSError, RuntimeError, subprocess.SubprocessError, toolchains.ToolchainError):
+            _archive = None
+        return _archive
+
+
+def runtime_flags():
+    """JVM flags for running submissions on the warm path."""
+    flags = list(RUNTIME_FLAGS)
+    archive = shared_archive()
+    if archive is not None:
+        flags += [f'-XX:SharedArchiveFile={archive}', '-Xshare:auto']
+    return flags
+
+
+def startup_allowance():
+    """Seconds a do-nothing program takes to start and exit with `runtime_flags`.
+
+    Measured once per process (best of three) and excluded from the Java time
+    limit and from reported run times.
+    """
+    global _startup_allowance
+    if _startup_allowance is not None:
+        return _startup_allowance
+    best = 0.0
+    try:
+        java = toolchains.require('java').command
+        argv = [java, *runtime_flags(), '-Xms32m', '-Xmx256m', '-cp', str(helper_classes()), 'Warmup', 'noop']
+        timings = []
+        for _ in range(3):
+            started = time.monotonic()
+            subprocess.run(argv, capture_output=True, timeout=30, check=True)
+            timings.append(time.monotonic() - started)
+        best = min(timings)
+    except (OSError, RuntimeError, subprocess.SubprocessError, toolchains.ToolchainError):
+        pass
+    _startup_allowance = best
+    return best
+
+
+class CompileServerError(Exception):
+    """The compile server died or replied with something unexpected."""
+
+
+class CompileServer:
+    """A ``CompileServer`` JVM that compiles requests one at a time over its stdin/stdout."""
+
+    def __init__(self):
+        self._proc = None
+        self._buffer = b''
+        self._compiles = 0
+        self._lock = threading.Lock()
+
+    def _start(self):
+        self._proc = subprocess.Popen(
+            [toolchains.require('java').command, *runtime_flags(), '-cp', str(helper_classes()), 'CompileServer'],
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL,
+        )
+        self._buffer = b''
+        self._compiles = 0
+
+    def stop(self):
+        if self._proc is not None:
+            try:
+                self._proc.kill()
+                self._proc.wait()
+            except OSError:
+                pass
+        self._proc = None
+
+    def _read(self, size_or_line, deadline, timeout):
+        """Read one line (``size_or_line=None``) or exactly that many bytes from the server."""
+        with selectors.DefaultSelector() as selector:
+            selector.register(self._proc.stdout, selectors.EVENT_READ)
+            while True:
+                if size_or_line is None and b'\n' in self._buffer:
+                    line, self._buffer = self._buffer.split(b'\n', 1)
+                    return line
+                if size_or_line is not None and len(self._buffer) >= size_or_line:
+                    data, self._buffer = self._buffer[:size_or_line], self._buffer[size_or_line:]
+                    return data
+                remaining = deadline - time.monotonic()
+                if remaining <= 0 or not selector.select(remaining):
+                    raise subprocess.TimeoutExpired('javac', timeout)
+                chunk = os.read(self._proc.stdout.fileno(), 65536)
+                if not chunk:
+                    raise CompileServerError('compile server exited')
+                self._buffer += chunk
+
+    def compile(self, args, timeout):
+        """Compile with javac `args`; returns ``(ok, diagnostics)``."""
+        if any('\t' in arg or '\n' in arg for arg in args):
+            raise CompileServerError('argument cannot be sent to the compile server')
+        with self._lock:
+            if self._proc is None or self._proc.poll() is not None:
+                self._start()
+            deadline = time.monotonic() + timeout
+            try:
+                self._proc.stdin.write(('\t'.join(args) + '\n').encode('utf-8'))
+                self._proc.stdin.flush()
+                exit_code, size = map(int, self._read(None, deadline, timeout).split())
+                diagnostics = self._read(size, deadline, timeout).decode('utf-8', 'replace')
+            except subprocess.TimeoutExpired:
+                self.stop()
+                raise
+            except (OSError, ValueError, CompileServerError) as e:
+                self.stop()
+                raise CompileServerError(str(e))
+            self._compiles += 1
+            if self._compiles >= MAX_COMPILES_PER_SERVER:
+                self.stop()
+            return exit_code == 0, diagnostics
+
+
+_server = CompileServer()
+
+
+def compile_java(args, timeout):
+    """Compile with javac `args`, through the compile server when warm mode is on.
+
+    Falls back to a cold ``javac`` process if the server cannot be used.
+    Returns ``(ok, diagnostics)``.
+    """
+    if settings.JUDGE_JAVA_WARM:
+        try:
+            return _server.compile(args, timeout)
+        except (CompileServerError, RuntimeError, OSError, toolchains.ToolchainError):
+            pass
+    javac = toolchains.require('javac').command
+    result = subprocess.run([javac, *args], capture_output=True, text=True, timeout=timeout)
+    return result.returncode == 0, result.stderr
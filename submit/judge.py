@@ -0,0 +1,397 @@
+"""Database-backed judge queue.
+
+`api_submit` stores a `CodeSubmission` in the ``queued`` state and returns at
+once; `judge_worker` processes claim queued rows here, compile them once, run
+them against every test of the problem and record the verdict.
+"""
+import contextvars
+import subprocess
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import asdict, dataclass
+from datetime import timedelta
+from pathlib import Path
+from typing import Optional
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from accounts import stats
+from accounts.models import Problem, Submission, TestCase
+from . import metrics, trace, verdicts
+from .checker import CheckerError, OutputFile, compile_checker, run_checker
+from .compare import TokenComparator
+from .models import CodeSubmission
+from .runner import (
+    CompileError, ToolchainError, compile_program, execute, missing_tool_message, parse_verdict,
+)
+from .testcases import as_file, expected_chunks, stdin_data, test_hash
+from .testpack import load_pack
+from .workspace import workspace
+
+
+def get_problem(problem_id):
+    """Return the `Problem` for `problem_id`, or None for legacy numeric ids."""
+    try:
+        return Problem.objects.get(id=uuid.UUID(str(problem_id)))
+    except (ValueError, Problem.DoesNotExist):
+        return None
+
+
+def problem_testcases(problem_id):
+    """Return the ``(input, expected output)`` of every test for `problem_id`.
+
+    A packed store (``testcases/<id>/<id>.pack``) yields `PackedData` views
+    while it matches the test files it was packed from, or when those files
+    are gone; otherwise the paths from `file_testcases`, so tests added or
+    edited after packing are judged until the problem is packed again.
+    """
+    tests = file_testcases(problem_id)
+    if problem_id:
+        pack = load_pack(problem_id)
+        if pack is not None and (not tests or pack.matches(tests)):
+            return [(test_input, test_output) for _, test_input, test_output in pack.tests]
+    return tests
+
+
+def file_testcases(problem_id):
+    """Return the ``(input, expected output)`` paths of every test file for `problem_id`.
+
+    `TestCase` rows are used when the problem has any; otherwise the single
+    ``testcases/<id>/<id>.in|.out`` pair, when it exists.
+    """
+    base_dir = Path(settings.BASE_DIR)
+    try:
+        problem_uuid = uuid.UUID(str(problem_id))
+    except ValueError:
+        problem_uuid = None
+    if problem_uuid is not None:
+        rows = TestCase.objects.filter(problem_id=problem_uuid).order_by('input_file')
+        tests = [(base_dir / row.input_file, base_dir / row.output_file) for row in rows]
+        if tests:
+            return tests
+
+    testcase_dir = base_dir / 'testcases' / problem_id
+    input_file, output_file = testcase_dir / f'{problem_id}.in', testcase_dir / f'{problem_id}.out'
+    if problem_id and input_file.exists() and output_file.exists():
+        return [(input_file, output_file)]
+    return []
+
+
+def claim_next_submission():
+    """Atomically move the oldest queued submission to ``compiling`` and return it.
+
+    The claim is a conditional UPDATE, so concurrent workers never pick the same
+    row, on SQLite as well as on Postgres. Returns None when the queue is empty.
+    """
+    while True:
+        candidate = (
+            CodeSubmission.objects
+            .filter(status=CodeSubmission.STATUS_QUEUED)
+            .order_by('id')
+            .values_list('id', flat=True)
+            .first()
+        )
+        if candidate is None:
+            return None
+        claimed = CodeSubmission.objects.filter(
+            id=candidate, status=CodeSubmission.STATUS_QUEUED
+        ).update(status=CodeSubmission.STATUS_COMPILING, claimed_at=timezone.now())
+        if claimed:
+            return CodeSubmission.objects.get(id=candidate)
+
+
+def requeue_stale_submissions(max_age_seconds):
+    """Put back submissions whose worker died mid-judgement. Returns the row count."""
+    cutoff = timezone.now() - timedelta(seconds=max_age_seconds)
+    return CodeSubmission.objects.filter(
+        status__in=[CodeSubmission.STATUS_COMPILING, CodeSubmission.STATUS_RUNNING],
+        claimed_at__lt=cutoff,
+    ).update(status=CodeSubmission.STATUS_QUEUED, claimed_at=None)
+
+
+def fail_submission(submission, error):
+    """Finish `submission` with a JE verdict after its judgement raised `error`."""
+    submission.output_data = f'[JE] Judge Error: {error}'
+    submission.test_results = []
+    submission.verdict = 'JE'
+    submission.status = CodeSubmission.STATUS_DONE
+    submission.judged_at = timezone.now()
+    submission.save(update_fields=['output_blob', 'test_results', 'verdict', 'status', 'judged_at'])
+
+
+class _TimedSink:
+    """Output sink wrapper adding up the time spent inside the wrapped sink."""
+
+    def __init__(self, sink):
+        self.sink = sink
+        self.seconds = 0.0
+
+    def feed(self, chunk):
+        started = time.perf_counter()
+        try:
+            return self.sink.feed(chunk)
+        finally:
+            self.seconds += time.perf_counter() - started
+
+    def finish(self):
+        started = time.perf_counter()
+        try:
+            return self.sink.finish()
+        finally:
+            self.seconds += time.perf_counter() - started
+
+
+def _run_test(program, input_file, output_file, float_tolerance=None, checker=None):
+    """Judge one test; returns ``(verdict, message, RunResult, difference)``."""
+    if checker is not None:
+        return _run_checked_test(program, input_file, output_file, checker)
+    comparator = _TimedSink(TokenComparator(expected_chunks(output_file), float_tolerance))
+    result = execute(program, stdin_data(input_file), output_sink=comparator)
+    if result.verdict is not None:
+        return result.verdict, result.output, result, None
+    with trace.span('compare'):
+        accepted = not result.stopped_early and comparator.finish()
+    metrics.COMPARE_SECONDS.labels(language=program.language).observe(comparator.seconds)
+    if not accepted:
+        return 'WA', '', result, comparator.sink.difference
+    return 'AC', '', result, None
+
+
+def _run_checked_test(program, input_file, output_file, checker):
+    # The checker gets its own workspace, out of reach of the contestant's program
+    with workspace('check-') as check_dir:
+        contestant_path = check_dir / 'contestant.out'
+        sink = OutputFile(contestant_path)
+        try:
+            result = execute(program, stdin_data(input_file), output_sink=sink)
+        finally:
+            sink.close()
+        if result.verdict is not None:
+            return result.verdict, result.output, result, None
+        with trace.span('write_checker_files'), metrics.IO_SECONDS.labels(language=program.language).time():
+            checker_input = as_file(input_file)
+            checker_expected = as_file(output_file)
+        with trace.span('checker'), metrics.COMPARE_SECONDS.labels(language=program.language).time():
+            verdict, message = run_checker(checker, checker_input, checker_expected, contestant_path, check_dir)
+        difference = {'checker_message': message} if verdict != 'AC' else None
+        return verdict, '', result, difference
+
+
+def _traced_test(number, *args):
+    with trace.span('test', test=number):
+        return _run_test(*args)
+
+
+def run_tests(program, tests, workers=1, float_tolerance=None, checker=None, previous=None):
+    """Run `program` on each ``(input, output)`` pair, stopping at the first non-AC verdict.
+
+    Returns ``(results, message)`` where `results` holds a ``{'test', 'hash',
+    'verdict', 'time', 'wall_time', 'memory_kb'}`` dict per test that was
+    judged, in test order (plus a ``'difference'`` for a wrong answer), and
+    `message` is the error text of a failing run (TLE/RTE/...), if any. With
+    ``workers > 1`` tests run concurrently, but the verdict is still that of
+    the first failing test. When a compiled `checker` is given it decides each
+    verdict instead of the token comparison.
+
+    `previous` maps test content hashes to result entries of an earlier
+    judgement; those tests are not run again and their old entry is reused.
+    """
+    previous = previous or {}
+    results = []
+    message = ''
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+        def submit_next():
+            item = next(pending, None)
+            if item is None:
+                return
+            number, test = item
+            digest = test_hash(*test)
+            if digest in previous:
+                futures.append((number, digest, None))
+            else:
+                # Pool threads record into this context's trace, if any
+                future = pool.submit(
+                    contextvars.copy_context().run, _traced_test, number, program, *test, float_tolerance, checker,
+                )
+                futures.append((number, digest, future))
+
+        futures = []
+        # Submit lazily in sequential mode so nothing runs past a failure
+        pending = iter(enumerate(tests, start=1))
+        for _ in range(max(1, workers)):
+            submit_next()
+        while futures:
+            number, digest, future = futures.pop(0)
+            if future is None:
+                entry = {**previous[digest], 'test': number, 'hash': digest}
+                verdict = entry['verdict']
+            else:
+                verdict, message, run, difference = future.result()
+                entry = {
+                    'test': number,
+                    'hash': digest,
+                    'verdict': verdict,
+                    'time': round(run.time, 3),
+                    'wall_time': round(run.wall_time, 3),
+                    'memory_kb': run.memory_kb,
+                }
+                if difference is not None:
+                    entry['difference'] = difference
+            results.append(entry)
+            if verdict != 'AC':
+                for _, _, other in futures:
+                    if other is not None:
+                        other.cancel()
+                break
+            submit_next()
+    return results, message
+
+
+@dataclass
+class Judgement:
+    """Outcome of `evaluate`: the verdict plus what `judge_submission` stores."""
+    verdict: str
+    output: str
+    test_results: list
+    time_ms: Optional[int] = None
+    memory_kb: Optional[int] = None
+
+
+def evaluate(language, code, problem_id, previous_results=None, on_phase=None, use_cache=True):
+    """Compile `code` once and judge it on every test of `problem_id`.
+
+    Tests whose content hash matches an entry of `previous_results` (the
+    ``test_results`` of an earlier judgement) are not run again. `on_phase`
+    is called with ``'compiling'`` and ``'running'`` as judging progresses.
+    Unless `use_cache` is False, a stored judgement of the same code on the
+    same test data is returned without running anything.
+    """
+    judgement = _evaluate(language, code, problem_id, previous_results, on_phase, use_cache)
+    metrics.VERDICTS.labels(language=language, verdict=judgement.verdict).inc()
+    return judgement
+
+
+def _evaluate(language, code, problem_id, previous_results, on_phase, use_cache):
+    def phase(name):
+        if on_phase is not None:
+            on_phase(name)
+
+    with trace.span('load_tests'):
+        tests = problem_testcases(problem_id)
+        problem = get_problem(problem_id)
+    with trace.span('verdict_cache_lookup'):
+        cache_key = verdicts.judgement_key(language, code, tests, problem) if use_cache else None
+        cached = verdicts.get(cache_key)
+    if cached is not None:
+        metrics.VERDICT_CACHE_HITS.labels(kind='judgement').inc()
+        return Judgement(**cached)
+
+    previous = {entry['hash']: entry for entry in previous_results or () if 'hash' in entry}
+    results = []
+    try:
+        if not tests:
+            raise ToolchainError('Testcase files not found for this problem.')
+        if language != 'py':
+            phase(CodeSubmission.STATUS_COMPILING)
+        program = compile_program(language, code)
+        phase(CodeSubmission.STATUS_RUNNING)
+        with trace.span('checker_compile'):
+            checker = compile_checker(problem)
+        results, message = run_tests(
+            program, tests,
+            workers=settings.JUDGE_TEST_WORKERS,
+            float_tolerance=problem.float_tolerance if problem else None,
+            checker=checker,
+            previous=previous,
+        )
+    except CompileError as e:
+        output = f'[CE] Compilation Error:\n{e}'
+        judgement = Judgement('CE', output, [])
+        verdicts.put(cache_key, asdict(judgement), judgement.verdict)
+        return judgement
+    except CheckerError as e:
+        output = f'[JE] Judge Error: {e}'
+    except ToolchainError as e:
+        output = f'[RTE] Error: {e}'
+    except subprocess.TimeoutExpired:
+        output = '[TLE] Time Limit Exceeded'
+    except FileNotFoundError as e:
+        output = missing_tool_message(e)
+    except Exception as e:
+        output = f'[RTE] Error: {str(e)}'
+    else:
+        # Only error text is kept; outputs are compared as they stream
+        output = message
+    if not results:
+        return Judgement(parse_verdict(output) or 'RTE', output, [])
+    judgement = Judgement(
+        results[-1]['verdict'],
+        output,
+        results,
+        time_ms=round(max(test['time'] for test in results) * 1000),
+        memory_kb=max(test['memory_kb'] for test in results),
+    )
+    verdicts.put(cache_key, asdict(judgement), judgement.verdict, judgement.time_ms / 1000)
+    return judgement
+
+
+def judge_submission(submission):
+    """Compile a claimed submission once, run it on every test and store the verdict."""
+    def set_status(phase):
+        # claimed_at doubles as a heartbeat, so long judgements are not requeued as stale
+        CodeSubmission.objects.filter(id=submission.id).update(status=phase, claimed_at=timezone.now())
+
+    # Only submissions sampled by api_submit carry a trace to continue
+    judge_trace = trace.Trace(submission.trace) if submission.trace is not None else None
+    with trace.activate(judge_trace):
+        in_flight = metrics.JOBS_IN_FLIGHT.labels(source='queue')
+        in_flight.inc()
+        try:
+            with trace.span('judge'):
+                judgement = evaluate(submission.language, submission.code, submission.problem_id, on_phase=set_status)
+        finally:
+            in_flight.dec()
+        with trace.span('save'), transaction.atomic():
+            _save_judgement(submission, judgement)
+            _record_history(submission, judgement)
+    if judge_trace is not None:
+        submission.trace = judge_trace.as_dict()
+        submission.save(update_fields=['trace'])
+    return submission
+
+
+def _save_judgement(submission, judgement):
+    submission.output_data = judgement.output
+    submission.test_results = judgement.test_results
+    submission.verdict = judgement.verdict
+    submission.time_ms = judgement.time_ms
+    submission.memory_kb = judgement.memory_kb
+    submission.status = CodeSubmission.STATUS_DONE
+    submission.judged_at = timezone.now()
+    submission.save(update_fields=[
+        'output_blob', 'test_results', 'verdict', 'time_ms', 'memory_kb', 'status', 'judged_at',
+    ])
+
+
+def _record_history(submission, judgement):
+    """Add a judged submission of a known user to their history and the statistics."""
+    if submission.user_id is None:
+        return
+    problem = get_problem(submission.problem_id)
+    if problem is None:
+        return
+    Submission.objects.create(
+        user_id=submission.user_id,
+        problem=problem,
+        code_blob_id=submission.code_blob_id,
+        language=submission.language,
+        verdict=judgement.verdict,
+        test_results=judgement.test_results,
+        # The submit time, so history follows submit order
+        submitted_at=submission.submitted_at,
+        judged_at=submission.judged_at,
+    )
+    stats.record_verdict(submission.user_id, problem.id, None, judgement.verdict)
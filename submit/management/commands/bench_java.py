@@ -0,0 +1,93 @@
+import statistics
+import subprocess
+import tempfile
+import time
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+
+from submit import javaserver
+
+PROGRAM = """import java.io.*;
+import java.util.*;
+
+public class Main {
+    public static void main(String[] args) throws IOException {
+        BufferedReader in = new BufferedReader(new InputStreamReader(System.in));
+        StringTokenizer st = new StringTokenizer(in.readLine());
+        long a = Long.parseLong(st.nextToken()), b = Long.parseLong(st.nextToken());
+        System.out.println(a + b); // iteration %d
+    }
+}
+"""
+
+
+class Command(BaseCommand):
+    help = "Compare cold and warm (compile server + CDS archive) Java compile and run latency."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--iterations', type=int, default=10)
+
+    def handle(self, *args, **options):
+        iterations = options['iterations']
+        try:
+            subprocess.run(['javac', '-version'], capture_output=True, check=True)
+        except (OSError, subprocess.CalledProcessError):
+            raise CommandError('javac is not available')
+
+        # Build the archive, helpers and compile server outside the timed loop
+        self.stdout.write('Preparing warm path...')
+        warm_flags = javaserver.runtime_flags()
+        with tempfile.TemporaryDirectory() as scratch:
+            javaserver.compile_java(['-d', scratch, self._write_source(Path(scratch), -1)], 60)
+        self.stdout.write(f'  runtime flags: {" ".join(warm_flags)}')
+        self.stdout.write(f'  start-up allowance: {javaserver.startup_allowance() * 1000:.1f} ms')
+
+        timings = {key: [] for key in ('cold compile', 'warm compile', 'cold run', 'warm run')}
+        for i in range(iterations):
+            with tempfile.TemporaryDirectory() as scratch:
+                scratch = Path(scratch)
+                # A fresh source each time so nothing is served from a cache
+                source = self._write_source(scratch, i)
+                cold_dir, warm_dir = scratch / 'cold', scratch / 'warm'
+                cold_dir.mkdir()
+                warm_dir.mkdir()
+
+                started = time.monotonic()
+                subprocess.run(['javac', '-encoding', 'UTF-8', '-d', str(cold_dir), source], check=True)
+                timings['cold compile'].append(time.monotonic() - started)
+
+                started = time.monotonic()
+                ok, diagnostics = javaserver.compile_java(['-encoding', 'UTF-8', '-d', str(warm_dir), source], 30)
+                timings['warm compile'].append(time.monotonic() - started)
+                if not ok:
+                    raise CommandError(diagnostics)
+
+                for key, class_dir, flags in (
+                    ('cold run', cold_dir, []),
+                    ('warm run', warm_dir, warm_flags),
+                ):
+                    started = time.monotonic()
+                    subprocess.run(
+                        ['java', *flags, '-Xms32m', '-Xmx256m', '-cp', str(class_dir), 'Main'],
+                        input=b'2 3\n', capture_output=True, check=True,
+                    )
+                    timings[key].append(time.monotonic() - started)
+
+        self.stdout.write(f'\n{"phase":<14}{"median ms":>12}{"min ms":>10}{"max ms":>10}')
+        for key, values in timings.items():
+            self.stdout.write(
+                f'{key:<14}{statistics.median(values) * 1000:>12.1f}'
+                f'{min(values) * 1000:>10.1f}{max(values) * 1000:>10.1f}'
+            )
+        cold = statistics.median(timings['cold compile']) + statistics.median(timings['cold run'])
+        warm = statistics.median(timings['warm compile']) + statistics.median(timings['warm run'])
+        self.stdout.write(self.style.SUCCESS(
+            f'\ncompile+run: cold {cold * 1000:.1f} ms, warm {warm * 1000:.1f} ms ({cold / warm:.1f}x)'
+        ))
+
+    @staticmethod
+    def _write_source(directory, iteration):
+        path = directory / 'Main.java'
+        path.write_text(PROGRAM % iteration)
+        return str(path)
@@ -0,0 +1,257 @@
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.test import Client
+
+from submit import toolchains
+from submit.models import CodeSubmission
+from submit.runner import parse_verdict, run_code
+
+PROBLEM_ID = '__bench_aplusb__'
+INPUT = '2 3\n'
+OUTPUT = '5\n'
+
+# kind -> expected verdict; every solution reads two numbers and prints their sum
+KINDS = {'fast': 'AC', 'slow': 'AC', 'tle': 'TLE', 'mle': 'MLE', 'ce': 'CE'}
+
+SOLUTIONS = {
+    'cpp': {
+        'fast': '#include <bits/stdc++.h>\nint main(){long long a,b;std::cin>>a>>b;std::cout<<a+b<<"\\n";}\n',
+        'slow': (
+            '#include <bits/stdc++.h>\nint main(){long long a,b;std::cin>>a>>b;volatile long long s=0;'
+            'for(long long i=0;i<300000000;i++)s+=i;std::cout<<a+b<<"\\n";}\n'
+        ),
+        'tle': '#include <bits/stdc++.h>\nint main(){volatile long long s=0;for(;;)s++;}\n',
+        'mle': (
+            '#include <bits/stdc++.h>\nint main(){std::vector<char> v(512u<<20);'
+            'for(size_t i=0;i<v.size();i+=4096)v[i]=1;std::cout<<(int)v[4096]<<"\\n";}\n'
+        ),
+        'ce': '#include <bits/stdc++.h>\nint main(){ return undefined_name; }\n',
+    },
+    'py': {
+        'fast': 'a, b = map(int, input().split())\nprint(a + b)\n',
+        'slow': 'a, b = map(int, input().split())\ns = 0\nfor i in range(3_000_000):\n    s += i\nprint(a + b)\n',
+        'tle': 'while True:\n    pass\n',
+        'mle': 'x = bytearray(512 * 1024 * 1024)\nprint(len(x))\n',
+        'ce': 'print(\n',
+    },
+    'java': {
+        'fast': (
+            'import java.util.*;\npublic class Main { public static void main(String[] a) {'
+            ' Scanner s = new Scanner(System.in); System.out.println(s.nextLong() + s.nextLong()); } }\n'
+        ),
+        'slow': (
+            'import java.util.*;\npublic class Main { public static void main(String[] a) {'
+            ' Scanner s = new Scanner(System.in); long x = s.nextLong() + s.nextLong(); long t = 0;'
+            ' for (long i = 0; i < 1_000_000_000L; i++) t += i ^ x; System.out.println(t == 42 ? 0 : x); } }\n'
+        ),
+        'tle': 'public class Main { public static void main(String[] a) { long t = 0; while (true) t++; } }\n',
+        'mle': (
+            'public class Main { public static void main(String[] a) {'
+            ' long[] x = new long[100_000_000]; System.out.println(x.length); } }\n'
+        ),
+        'ce': 'public class Main { public static void main(String[] a) { int x = "no"; } }\n',
+    },
+}
+COMMENT = {'cpp': '// bench {}\n', 'py': '# bench {}\n', 'java': '// bench {}\n'}
+
+
+def expected_verdict(language, kind):
+    # Without the zygote a Python syntax error only surfaces when the script runs
+    if language == 'py' and kind == 'ce' and not settings.JUDGE_PY_ZYGOTE:
+        return 'RTE'
+    return KINDS[kind]
+
+
+def percentiles(values):
+    """p50/p95/p99 (nearest rank), mean and max of `values` in milliseconds."""
+    if not values:
+        return None
+    ordered = sorted(values)
+
+    def rank(p):
+        return ordered[min(len(ordered) - 1, max(0, round(p / 100 * len(ordered)) - 1))]
+
+    return {
+        'count': len(ordered),
+        'p50_ms': round(rank(50) * 1000, 2),
+        'p95_ms': round(rank(95) * 1000, 2),
+        'p99_ms': round(rank(99) * 1000, 2),
+        'mean_ms': round(statistics.mean(ordered) * 1000, 2),
+        'max_ms': round(ordered[-1] * 1000, 2),
+    }
+
+
+def _git_revision():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', 'HEAD'], cwd=settings.BASE_DIR, capture_output=True, text=True, timeout=5,
+        ).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmark judge throughput and latency with reference solutions (fast/slow/TLE/MLE/CE) "
+        "through run_code or api_submit, printing JSON for comparison between builds."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--mode', choices=['run', 'submit'], nargs='+', default=['run'],
+                            help='run: call run_code in-process; submit: POST api_submit and poll '
+                                 'until a running judge_worker has judged it.')
+        parser.add_argument('--languages', default='cpp,py,java')
+        parser.add_argument('--cases', default=','.join(KINDS), help=f'Subset of {",".join(KINDS)}.')
+        parser.add_argument('--concurrency', default='1,4', help='Comma-separated concurrency levels.')
+        parser.add_argument('--iterations', type=int, default=3, help='Submissions per solution per level.')
+        parser.add_argument('--cached', action='store_true',
+                            help='Send identical code every time so compile and verdict caches are hit. '
+                                 'Without it each submission gets a unique comment, which misses both '
+                                 'caches in this process and in the judge workers alike.')
+        parser.add_argument('--timeout', type=float, default=120, help='Seconds to wait per queued submission.')
+        parser.add_argument('--output', help='Write the JSON report here instead of stdout.')
+
+    def handle(self, *args, **options):
+        registry = toolchains.get_registry()
+        languages = []
+        for language in options['languages'].split(','):
+            if language not in SOLUTIONS:
+                raise CommandError(f'Unknown language: {language}')
+            if all(registry[name].available for name in toolchains.LANGUAGE_TOOLS[language]):
+                languages.append(language)
+            else:
+                self.stderr.write(f'{language}: toolchain unavailable, skipped')
+        kinds = options['cases'].split(',')
+        if not languages or any(kind not in KINDS for kind in kinds):
+            raise CommandError('Nothing to benchmark.')
+        levels = [int(level) for level in options['concurrency'].split(',')]
+
+        cases = [(language, kind) for language in languages for kind in kinds]
+        report = {
+            'meta': {
+                'revision': _git_revision(),
+                'timestamp': time.time(),
+                'python': sys.version.split()[0],
+                'platform': platform.platform(),
+                'cpus': os.cpu_count(),
+                'toolchains': {name: tool.version for name, tool in registry.items() if tool.available},
+                'cached': options['cached'],
+                'iterations': options['iterations'],
+            },
+            'results': [],
+        }
+        testcase_dir = Path(settings.BASE_DIR) / 'testcases' / PROBLEM_ID
+        testcase_dir.mkdir(parents=True, exist_ok=True)
+        try:
+            (testcase_dir / f'{PROBLEM_ID}.in').write_text(INPUT)
+            (testcase_dir / f'{PROBLEM_ID}.out').write_text(OUTPUT)
+            for mode in options['mode']:
+                for level in levels:
+                    report['results'].append(self._bench(mode, level, cases, options))
+        finally:
+            for path in testcase_dir.iterdir():
+                path.unlink()
+            testcase_dir.rmdir()
+            CodeSubmission.objects.filter(problem_id=PROBLEM_ID).delete()
+
+        text = json.dumps(report, indent=2)
+        if options['output']:
+            Path(options['output']).write_text(text + '\n')
+            self.stderr.write(f'Report written to {options["output"]}')
+        else:
+            self.stdout.write(text)
+
+    def _code(self, language, kind, cached):
+        # Salting the source rather than toggling settings also reaches judge_worker processes
+        code = SOLUTIONS[language][kind]
+        return code if cached else code + COMMENT[language].format(uuid.uuid4().hex)
+
+    def _bench(self, mode, level, cases, options):
+        jobs = [case for case in cases for _ in range(options['iterations'])]
+        single = self._run_one if mode == 'run' else self._submit_one
+        started = time.monotonic()
+        with ThreadPoolExecutor(max_workers=level) as pool:
+            samples = list(pool.map(lambda case: single(*case, options), jobs))
+        elapsed = time.monotonic() - started
+
+        phases = {}
+        by_case = {}
+        mismatches = []
+        for (language, kind), sample in zip(jobs, samples):
+            for phase, seconds in sample['phases'].items():
+                phases.setdefault(phase, []).append(seconds)
+            by_case.setdefault(f'{language}/{kind}', []).append(sample['phases']['total'])
+            expected = expected_verdict(language, kind)
+            if sample['verdict'] != expected:
+                mismatches.append({'case': f'{language}/{kind}', 'expected': expected, 'got': sample['verdict']})
+        result = {
+            'mode': mode,
+            'concurrency': level,
+            'submissions': len(jobs),
+            'seconds': round(elapsed, 3),
+            'submissions_per_second': round(len(jobs) / elapsed, 3),
+            'phases': {phase: percentiles(values) for phase, values in phases.items()},
+            'cases': {case: percentiles(values) for case, values in by_case.items()},
+            'verdict_mismatches': mismatches,
+        }
+        self.stderr.write(
+            f'{mode} x{level}: {len(jobs)} submissions in {elapsed:.1f}s '
+            f'({result["submissions_per_second"]:.2f}/s), total p50 {result["phases"]["total"]["p50_ms"]} ms, '
+            f'p99 {result["phases"]["total"]["p99_ms"]} ms, {len(mismatches)} verdict mismatch(es)'
+        )
+        return result
+
+    def _run_one(self, language, kind, options):
+        marks = {}
+        started = time.monotonic()
+        output = run_code(
+            language, self._code(language, kind, options['cached']), INPUT,
+            on_phase=lambda phase: marks.setdefault(phase, time.monotonic()),
+        )
+        finished = time.monotonic()
+        running = marks.get('running', finished)
+        verdict = parse_verdict(output) or ('AC' if output.split() == OUTPUT.split() else 'WA')
+        return {
+            'verdict': verdict,
+            'phases': {'compile': running - started, 'run': finished - running, 'total': finished - started},
+        }
+
+    def _submit_one(self, language, kind, options):
+        client = Client(HTTP_HOST='localhost')
+        started = time.monotonic()
+        response = client.post(
+            '/submit/api/submit/',
+            json.dumps({'language': language, 'code': self._code(language, kind, options['cached']),
+                        'problem_id': PROBLEM_ID}),
+            content_type='application/json',
+        )
+        accepted = time.monotonic()
+        if response.status_code != 202:
+            return {'verdict': f'HTTP {response.status_code}', 'phases': {'total': accepted - started}}
+        submission_id = response.json()['submission_id']
+        deadline = started + options['timeout']
+        while time.monotonic() < deadline:
+            status = client.get(f'/submit/api/status/{submission_id}/').json()
+            if status['status'] == 'done':
+                break
+            time.sleep(0.05)
+        else:
+            return {'verdict': 'TIMEOUT', 'phases': {'total': time.monotonic() - started}}
+        finished = time.monotonic()
+        submission = CodeSubmission.objects.get(id=submission_id)
+        phases = {'submit': accepted - started, 'total': finished - started}
+        if submission.claimed_at and submission.judged_at:
+            phases['queue'] = (submission.claimed_at - submission.submitted_at).total_seconds()
+            phases['judge'] = (submission.judged_at - submission.claimed_at).total_seconds()
+        return {'verdict': status['verdict'], 'phases': phases}
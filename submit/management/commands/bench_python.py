@@ -0,0 +1,58 @@
+import statistics
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from submit import pyzygote, toolchains
+from submit.runner import Program, compile_program, execute
+
+PROGRAM = """import sys
+a, b = map(int, sys.stdin.readline().split())
+print(a + b)
+"""
+
+
+class Command(BaseCommand):
+    help = "Compare per-run overhead of cold Python runs and runs forked from the zygote."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--iterations', type=int, default=50)
+
+    def handle(self, *args, **options):
+        iterations = options['iterations']
+        try:
+            toolchains.require('python')
+        except toolchains.ToolchainError as e:
+            raise CommandError(str(e))
+
+        cold = compile_program('py', PROGRAM)
+        cold.zygote = None
+        warm = Program('py', cold.argv, zygote=pyzygote.get_zygote())
+        # Start the zygote outside the timed loop
+        if warm.zygote.check(cold.argv[-1]) is not None:
+            raise CommandError('benchmark program does not compile')
+
+        timings = {key: [] for key in ('cold wall', 'zygote wall', 'cold cpu', 'zygote cpu')}
+        for _ in range(iterations):
+            for name, program in (('cold', cold), ('zygote', warm)):
+                started = time.monotonic()
+                result = execute(program, '2 3\n')
+                elapsed = time.monotonic() - started
+                if result.verdict is not None or result.output.strip() != '5':
+                    raise CommandError(f'{name} run failed: {result.output}')
+                timings[f'{name} wall'].append(elapsed)
+                timings[f'{name} cpu'].append(result.time)
+
+        self.stdout.write(f'{"measure":<14}{"median ms":>12}{"p95 ms":>10}{"min ms":>10}')
+        for key, values in timings.items():
+            values = sorted(values)
+            p95 = values[min(len(values) - 1, int(len(values) * 0.95))]
+            self.stdout.write(
+                f'{key:<14}{statistics.median(values) * 1000:>12.1f}{p95 * 1000:>10.1f}{values[0] * 1000:>10.1f}'
+            )
+        cold_wall = statistics.median(timings['cold wall'])
+        warm_wall = statistics.median(timings['zygote wall'])
+        self.stdout.write(self.style.SUCCESS(
+            f'\nper-run overhead: cold {cold_wall * 1000:.1f} ms, zygote {warm_wall * 1000:.1f} ms '
+            f'({cold_wall / warm_wall:.1f}x)'
+        ))
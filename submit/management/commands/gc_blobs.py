@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+
+from submit import blobs
+
+
+class Command(BaseCommand):
+    help = "Delete stored blobs (submission code, inputs and outputs) that no submission refers to any more."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500, help='Blobs deleted per transaction.')
+        parser.add_argument('--grace-seconds', type=int, default=None,
+                            help='Keep blobs stored or reused more recently than this '
+                                 '(default: BLOB_GC_GRACE_SECONDS).')
+
+    def handle(self, *args, **options):
+        deleted = blobs.collect_garbage(options['batch_size'], options['grace_seconds'])
+        self.stdout.write(self.style.SUCCESS(f'Deleted {deleted} unreferenced blob(s).'))
@@ -0,0 +1,114 @@
+import multiprocessing
+import signal
+import time
+import traceback
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections, connections
+
+from submit import pch
+from submit.judge import claim_next_submission, fail_submission, judge_submission, requeue_stale_submissions
+from submit.runner import CPP_FLAGS
+from submit.spawn import helper_path
+from submit.toolchains import get_registry
+
+
+def _worker_loop(poll_interval):
+    stopping = False
+
+    def _stop(signum, frame):
+        nonlocal stopping
+        stopping = True
+
+    signal.signal(signal.SIGTERM, _stop)
+    signal.signal(signal.SIGINT, _stop)
+
+    while not stopping:
+        close_old_connections()
+        submission = claim_next_submission()
+        if submission is None:
+            time.sleep(poll_interval)
+            continue
+        try:
+            judge_submission(submission)
+        except Exception as e:
+            traceback.print_exc()
+            try:
+                close_old_connections()
+                fail_submission(submission, e)
+            except Exception:
+                # Left claimed; the parent re-queues it once it is stale
+                traceback.print_exc()
+
+
+class Command(BaseCommand):
+    help = "Run a pool of judge worker processes that drain the submission queue."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--workers', type=int, default=settings.JUDGE_WORKERS,
+            help='Number of judge processes to start.',
+        )
+        parser.add_argument(
+            '--poll-interval', type=float, default=settings.JUDGE_POLL_INTERVAL_SECONDS,
+            help='Seconds to sleep when the queue is empty.',
+        )
+
+    def _requeue(self):
+        requeued = requeue_stale_submissions(settings.JUDGE_STALE_JOB_SECONDS)
+        if requeued:
+            self.stdout.write(f"Re-queued {requeued} stale submission(s)")
+        # Children forked later must open their own database connections
+        connections.close_all()
+
+    def handle(self, *args, **options):
+        # Probe compilers once; forked workers inherit the registry
+        for name, toolchain in get_registry().items():
+            status = toolchain.version if toolchain.available else f'unavailable ({toolchain.error})'
+            self.stdout.write(f"{name}: {status}")
+        if helper_path() is None:
+            self.stdout.write("exec helper unavailable; peak memory will include worker RSS")
+        gxx = get_registry()['g++']
+        if settings.JUDGE_CPP_PCH and gxx.available and pch.include_dir(gxx, CPP_FLAGS) is None:
+            self.stdout.write("precompiled headers unavailable; C++ compiles will parse every header")
+
+        self._requeue()
+
+        def _start():
+            process = multiprocessing.Process(target=_worker_loop, args=(options['poll_interval'],), daemon=True)
+            process.start()
+            return process
+
+        processes = [_start() for _ in range(max(1, options['workers']))]
+        self.stdout.write(self.style.SUCCESS(f"Started {len(processes)} judge worker(s)"))
+
+        stopping = False
+
+        def _shutdown(signum, frame):
+            nonlocal stopping
+            stopping = True
+            for process in processes:
+                if process.is_alive():
+                    process.terminate()
+
+        signal.signal(signal.SIGTERM, _shutdown)
+        signal.signal(signal.SIGINT, _shutdown)
+
+        # Supervise: restart workers that died and re-queue the submissions they held
+        last_requeue = time.monotonic()
+        while not stopping:
+            time.sleep(1)
+            if stopping:
+                break
+            for i, process in enumerate(processes):
+                if process.is_alive():
+                    continue
+                process.join()
+                self.stdout.write(f"Judge worker {process.pid} exited with code {process.exitcode}; restarting")
+                processes[i] = _start()
+            if time.monotonic() - last_requeue >= settings.JUDGE_REQUEUE_INTERVAL_SECONDS:
+                last_requeue = time.monotonic()
+                self._requeue()
+        for process in processes:
+            process.join()
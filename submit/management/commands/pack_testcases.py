@@ -0,0 +1,53 @@
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from accounts.models import TestCase
+from submit.judge import file_testcases
+from submit.testpack import CODECS, Pack, PackError, pack_path, write_pack
+
+
+def _test_names(tests):
+    """Name tests after their input files, falling back to positions on clashes."""
+    names = [Path(input_file).stem for input_file, _ in tests]
+    if len(set(names)) != len(names):
+        names = [f'{i:03d}' for i in range(1, len(tests) + 1)]
+    return names
+
+
+class Command(BaseCommand):
+    help = "Import testcase files (TestCase rows or testcases/<id>/<id>.in|.out) into packed stores."
+
+    def add_arguments(self, parser):
+        parser.add_argument('problem_ids', nargs='*', help='Problems to pack (default: with --all, every problem).')
+        parser.add_argument('--all', action='store_true', help='Pack every problem that has testcase files.')
+        parser.add_argument('--codec', choices=CODECS, default='raw', help='Compression for test data.')
+
+    def handle(self, *args, **options):
+        problem_ids = options['problem_ids']
+        if options['all']:
+            problem_ids = sorted(
+                {str(problem_id) for problem_id in TestCase.objects.values_list('problem_id', flat=True)}
+                | {path.name for path in (Path(settings.BASE_DIR) / 'testcases').iterdir() if path.is_dir()}
+            )
+        if not problem_ids:
+            raise CommandError('Give problem ids or --all.')
+
+        for problem_id in problem_ids:
+            tests = file_testcases(problem_id)
+            if not tests:
+                self.stderr.write(f'{problem_id}: no testcase files, skipped')
+                continue
+            names = _test_names(tests)
+            path = write_pack(
+                pack_path(problem_id),
+                [(name, test_input, test_output) for name, (test_input, test_output) in zip(names, tests)],
+                codec=options['codec'],
+            )
+            try:
+                Pack(path).verify()
+            except PackError as e:
+                path.unlink()
+                raise CommandError(f'{problem_id}: {e}')
+            self.stdout.write(f'{problem_id}: {len(tests)} tests -> {path} ({path.stat().st_size} bytes)')
@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from accounts import stats
+
+
+class Command(BaseCommand):
+    help = "Recompute per-problem and per-user statistics from every stored submission."
+
+    def handle(self, *args, **options):
+        pairs = stats.rebuild()
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt statistics for {pairs} user/problem pair(s).'))
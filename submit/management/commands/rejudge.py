@@ -0,0 +1,112 @@
+import multiprocessing
+import time
+from datetime import datetime, time as day_time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import close_old_connections, connections, transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+
+from accounts import stats
+from accounts.models import Submission
+from submit.judge import evaluate
+from submit.spawn import helper_path
+from submit.toolchains import get_registry
+
+# accounts.Submission.language is free text
+LANGUAGE_ALIASES = {'c++': 'cpp', 'cpp17': 'cpp', 'python': 'py', 'python3': 'py'}
+
+
+def _moment(value, end_of_day=False):
+    moment = parse_datetime(value)
+    if moment is None:
+        day = parse_date(value)
+        if day is None:
+            raise CommandError(f'Not a date or datetime: {value}')
+        moment = datetime.combine(day, day_time.max if end_of_day else day_time.min)
+    if timezone.is_naive(moment):
+        moment = timezone.make_aware(moment)
+    return moment
+
+
+def _rejudge(submission_id, full):
+    close_old_connections()
+    submission = Submission.objects.get(id=submission_id)
+    previous = [] if full else submission.test_results
+    previous_hashes = {entry['hash'] for entry in previous if 'hash' in entry}
+    language = LANGUAGE_ALIASES.get(submission.language.lower(), submission.language.lower())
+    started = time.monotonic()
+    judgement = evaluate(
+        language, submission.code, str(submission.problem_id), previous_results=previous, use_cache=not full,
+    )
+    elapsed = time.monotonic() - started
+    with transaction.atomic():
+        Submission.objects.filter(id=submission_id).update(
+            verdict=judgement.verdict, test_results=judgement.test_results, judged_at=timezone.now(),
+        )
+        stats.record_verdict(submission.user_id, submission.problem_id, submission.verdict, judgement.verdict)
+    reused = sum(entry['hash'] in previous_hashes for entry in judgement.test_results)
+    return submission_id, submission.verdict, judgement.verdict, len(judgement.test_results) - reused, reused, elapsed
+
+
+class Command(BaseCommand):
+    help = "Rejudge stored submissions in parallel, re-running only tests whose content changed."
+
+    def add_arguments(self, parser):
+        parser.add_argument('submission_ids', nargs='*', type=int, help='Submissions to rejudge.')
+        parser.add_argument('--problem', help='Rejudge every submission to this problem.')
+        parser.add_argument('--since', help='Only submissions made at or after this date/datetime.')
+        parser.add_argument('--until', help='Only submissions made at or before this date/datetime.')
+        parser.add_argument('--workers', type=int, default=settings.JUDGE_WORKERS,
+                            help='Number of judge processes.')
+        parser.add_argument('--full', action='store_true',
+                            help='Re-run every test instead of only changed ones (e.g. after a checker change).')
+
+    def handle(self, *args, **options):
+        submissions = Submission.objects.order_by('id')
+        if options['submission_ids']:
+            submissions = submissions.filter(id__in=options['submission_ids'])
+        if options['problem']:
+            submissions = submissions.filter(problem_id=options['problem'])
+        if options['since']:
+            submissions = submissions.filter(submitted_at__gte=_moment(options['since']))
+        if options['until']:
+            submissions = submissions.filter(submitted_at__lte=_moment(options['until'], end_of_day=True))
+        if not any(options[key] for key in ('submission_ids', 'problem', 'since', 'until')):
+            raise CommandError('Select submissions by id, --problem, --since or --until.')
+        ids = list(submissions.values_list('id', flat=True))
+        if not ids:
+            self.stdout.write('No submissions match.')
+            return
+
+        # Probe once in the parent; forked workers inherit the results
+        get_registry()
+        helper_path()
+        connections.close_all()
+
+        workers = max(1, options['workers'])
+        self.stdout.write(f'Rejudging {len(ids)} submission(s) with {workers} worker(s)')
+        started = time.monotonic()
+        changed = ran = reused = 0
+        with multiprocessing.Pool(workers) as pool:
+            jobs = pool.imap_unordered(_rejudge_job, [(submission_id, options['full']) for submission_id in ids])
+            for done, (submission_id, old, new, tests_ran, tests_reused, elapsed) in enumerate(jobs, start=1):
+                changed += old != new
+                ran += tests_ran
+                reused += tests_reused
+                rate = done / (time.monotonic() - started)
+                self.stdout.write(
+                    f'[{done}/{len(ids)}] #{submission_id} {old or "-"} -> {new} '
+                    f'(ran {tests_ran}, reused {tests_reused}, {elapsed:.2f}s) {rate:.1f}/s'
+                )
+
+        total = time.monotonic() - started
+        self.stdout.write(self.style.SUCCESS(
+            f'Rejudged {len(ids)} submission(s) in {total:.1f}s ({len(ids) / total:.1f}/s): '
+            f'{changed} verdict(s) changed, {ran} test run(s), {reused} reused'
+        ))
+
+
+def _rejudge_job(args):
+    return _rejudge(*args)
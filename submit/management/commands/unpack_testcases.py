@@ -0,0 +1,49 @@
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+
+from submit.testpack import PackError, load_pack, pack_path
+
+
+class Command(BaseCommand):
+    help = "Export a packed testcase store back to <name>.in/<name>.out files."
+
+    def add_arguments(self, parser):
+        parser.add_argument('problem_id')
+        parser.add_argument(
+            '--dest', help='Directory to write to (default: the directory holding the pack).',
+        )
+        parser.add_argument(
+            '--overwrite', action='store_true', help='Replace test files that already exist in the destination.',
+        )
+        parser.add_argument('--verify', action='store_true', help='Check content hashes while exporting.')
+
+    def handle(self, *args, **options):
+        problem_id = options['problem_id']
+        try:
+            pack = load_pack(problem_id)
+        except PackError as e:
+            raise CommandError(str(e))
+        if pack is None:
+            raise CommandError(f'No pack found at {pack_path(problem_id)}')
+
+        dest = Path(options['dest']) if options['dest'] else pack_path(problem_id).parent
+        existing = [
+            path for name, _, _ in pack.tests for path in (dest / f'{name}.in', dest / f'{name}.out') if path.exists()
+        ]
+        if existing and not options['overwrite']:
+            raise CommandError(
+                f'{len(existing)} test file(s) already exist in {dest}, e.g. {existing[0].name}; '
+                'pass --dest to export elsewhere or --overwrite to replace them'
+            )
+        dest.mkdir(parents=True, exist_ok=True)
+        for name, test_input, test_output in pack.tests:
+            if options['verify']:
+                try:
+                    test_input.verify()
+                    test_output.verify()
+                except PackError as e:
+                    raise CommandError(f'{name}: {e}')
+            test_input.write_to(dest / f'{name}.in')
+            test_output.write_to(dest / f'{name}.out')
+        self.stdout.write(f'{problem_id}: {len(pack.tests)} tests -> {dest}')
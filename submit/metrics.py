@@ -0,0 +1,346 @@
+"""Prometheus-style metrics that add up across processes.
+
+gunicorn workers and judge workers are separate processes, so each process
+keeps its samples in memory and a background thread writes them to
+``JUDGE_METRICS_DIR/proc-<pid>-<start time>.json`` (atomically, at most every
+``JUDGE_METRICS_FLUSH_SECONDS``). The start time keeps a reused pid from
+overwriting an exited process's file. `render` merges every process's file
+into the text exposition format. Counters and histograms of processes that
+have exited are folded into ``retired.json`` and their files removed, so
+totals never go backwards and the directory does not grow with every
+restart; gauges only count live processes.
+
+Usage mirrors prometheus_client::
+
+    RUN_SECONDS.labels(language='cpp').observe(0.12)
+    VERDICTS.labels(language='py', verdict='AC').inc()
+"""
+import atexit
+import fcntl
+import json
+import math
+import os
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+from django.conf import settings
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+_lock = threading.Lock()
+_registry = {}
+_samples = {}
+_dirty = threading.Event()
+_flusher_pid = None
+
+
+class _Metric:
+    kind = None
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(buckets) if self.kind == 'histogram' else ()
+        _registry[name] = self
+
+    def labels(self, **labels):
+        return _Child(self, tuple(str(labels[name]) for name in self.labelnames))
+
+    # Unlabelled metrics can be used directly
+    def inc(self, amount=1):
+        self.labels().inc(amount)
+
+    def dec(self, amount=1):
+        self.labels().dec(amount)
+
+    def set(self, value):
+        self.labels().set(value)
+
+    def observe(self, value):
+        self.labels().observe(value)
+
+
+class Counter(_Metric):
+    kind = 'counter'
+
+
+class Gauge(_Metric):
+    kind = 'gauge'
+
+
+class Histogram(_Metric):
+    kind = 'histogram'
+
+
+class _Child:
+    def __init__(self, metric, values):
+        self._metric = metric
+        self._key = json.dumps(values)
+
+    def _update(self, update):
+        _ensure_flusher()
+        with _lock:
+            series = _samples.setdefault(self._metric.name, {})
+            series[self._key] = update(series.get(self._key))
+        _dirty.set()
+
+    def inc(self, amount=1):
+        self._update(lambda value: (value or 0) + amount)
+
+    def dec(self, amount=1):
+        self._update(lambda value: (value or 0) - amount)
+
+    def set(self, value):
+        self._update(lambda _: value)
+
+    def observe(self, value):
+        buckets = self._metric.buckets
+
+        def update(state):
+            state = state or [0] * (len(buckets) + 2)
+            for i, bound in enumerate(buckets):
+                if value <= bound:
+                    state[i] += 1
+                    break
+            else:
+                state[len(buckets)] += 1
+            state[-1] += value
+            return state
+
+        self._update(update)
+
+    def time(self):
+        """Context manager observing the duration of its block."""
+        return _Timer(self)
+
+
+class _Timer:
+    def __init__(self, child):
+        self._child = child
+
+    def __enter__(self):
+        self._started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._child.observe(time.perf_counter() - self._started)
+
+
+def _metrics_dir():
+    path = Path(settings.JUDGE_METRICS_DIR)
+    path.mkdir(parents=True, exist_ok=True)
+    return path
+
+
+RETIRED_FILE = 'retired.json'
+
+
+def _start_time(pid):
+    """Start time of `pid` in clock ticks since boot, or None where /proc is unavailable."""
+    try:
+        with open(f'/proc/{pid}/stat') as f:
+            stat = f.read()
+    except OSError:
+        return None
+    # Field 22; the command name before it may contain spaces, so count from its closing parenthesis
+    return int(stat.rpartition(')')[2].split()[19])
+
+
+def _write(path, data):
+    fd, staging = tempfile.mkstemp(prefix='.metrics-', dir=path.parent)
+    with os.fdopen(fd, 'w') as f:
+        f.write(json.dumps(data))
+    os.replace(staging, path)
+
+
+def flush():
+    """Write this process's samples to its file."""
+    pid = os.getpid()
+    start = _start_time(pid)
+    with _lock:
+        data = {'pid': pid, 'start': start, 'samples': json.loads(json.dumps(_samples))}
+        _dirty.clear()
+    _write(_metrics_dir() / f'proc-{pid}-{start}.json', data)
+
+
+def _flush_loop():
+    while True:
+        _dirty.wait()
+        time.sleep(settings.JUDGE_METRICS_FLUSH_SECONDS)
+        try:
+            flush()
+        except OSError:
+            pass
+
+
+def _ensure_flusher():
+    global _flusher_pid, _samples
+    if _flusher_pid == os.getpid():
+        return
+    with _lock:
+        if _flusher_pid != os.getpid():
+            if _flusher_pid is not None:
+                # Forked: the parent's samples are the parent's to report
+                _samples = {}
+            _flusher_pid = os.getpid()
+            threading.Thread(target=_flush_loop, name='metrics-flush', daemon=True).start()
+
+
+@atexit.register
+def _flush_at_exit():
+    if _flusher_pid == os.getpid() and _dirty.is_set():
+        try:
+            flush()
+        except OSError:
+            pass
+
+
+def _alive(pid, start):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    # A different start time means the pid now belongs to another process
+    return start is None or _start_time(pid) in (None, start)
+
+
+def _read(path):
+    try:
+        return json.loads(path.read_text())
+    except (OSError, ValueError):
+        return None
+
+
+def _retire(directory, dead):
+    """Fold the samples of exited processes' files into the retired totals and remove the files.
+
+    The retired file lists the files already folded, so a crash before they
+    are removed does not count them twice.
+    """
+    with open(directory / '.retire.lock', 'w') as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        retired = _read(directory / RETIRED_FILE) or {'samples': {}, 'folded': []}
+        folded = set(retired['folded'])
+        for path in dead:
+            if path.name in folded:
+                continue
+            data = _read(path)
+            if data is not None:
+                _merge(retired['samples'], data['samples'], alive=False)
+            folded.add(path.name)
+        retired['folded'] = sorted(name for name in folded if (directory / name).exists())
+        _write(directory / RETIRED_FILE, retired)
+        for path in dead:
+            try:
+                path.unlink()
+            except OSError:
+                pass
+        retired['folded'] = sorted(name for name in folded if (directory / name).exists())
+        _write(directory / RETIRED_FILE, retired)
+        return retired['samples']
+
+
+def _collect():
+    """Merge the samples of every process: ``{name: {label values: value}}``."""
+    directory = _metrics_dir()
+    merged = {}
+    dead = []
+    for path in directory.glob('proc-*.json'):
+        data = _read(path)
+        if data is None or data['pid'] == os.getpid():
+            continue
+        if _alive(data['pid'], data.get('start')):
+            _merge(merged, data['samples'], alive=True)
+        else:
+            dead.append(path)
+    if dead:
+        retired = _retire(directory, dead)
+    else:
+        retired = (_read(directory / RETIRED_FILE) or {}).get('samples', {})
+    _merge(merged, retired, alive=False)
+    with _lock:
+        _merge(merged, json.loads(json.dumps(_samples)), alive=True)
+    return merged
+
+
+def _merge(merged, samples, alive):
+    for name, series in samples.items():
+        metric = _registry.get(name)
+        if metric is None or (metric.kind == 'gauge' and not alive):
+            continue
+        target = merged.setdefault(name, {})
+        for key, value in series.items():
+            if metric.kind == 'histogram':
+                current = target.get(key) or [0] * len(value)
+                target[key] = [a + b for a, b in zip(current, value)]
+            else:
+                target[key] = target.get(key, 0) + value
+
+
+def _format_value(value):
+    if value == math.inf:
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+def _escape(value):
+    return value.replace('\\', r'\\').replace('\n', r'\n').replace('"', r'\"')
+
+
+def _labels(names, values, extra=()):
+    pairs = [f'{name}="{_escape(value)}"' for name, value in (*zip(names, values), *extra)]
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+def render():
+    """All metrics in the Prometheus text exposition format (version 0.0.4)."""
+    merged = _collect()
+    lines = []
+    for name, metric in sorted(_registry.items()):
+        lines.append(f'# HELP {name} {metric.documentation}')
+        lines.append(f'# TYPE {name} {metric.kind}')
+        for key, value in sorted(merged.get(name, {}).items()):
+            values = json.loads(key)
+            if metric.kind != 'histogram':
+                lines.append(f'{name}{_labels(metric.labelnames, values)} {_format_value(value)}')
+                continue
+            cumulative = 0
+            for bound, count in zip((*metric.buckets, math.inf), value):
+                cumulative += count
+                le = (('le', _format_value(float(bound))),)
+                lines.append(f'{name}_bucket{_labels(metric.labelnames, values, le)} {cumulative}')
+            lines.append(f'{name}_sum{_labels(metric.labelnames, values)} {_format_value(float(value[-1]))}')
+            lines.append(f'{name}_count{_labels(metric.labelnames, values)} {cumulative}')
+    return '\n'.join(lines) + '\n'
+
+
+# Judge
+COMPILE_SECONDS = Histogram(
+    'judge_compile_seconds', 'Time to get a runnable program, including compile cache hits.',
+    ['language', 'role'],
+)
+RUN_SECONDS = Histogram(
+    'judge_run_seconds', 'Wall time of one program run, from spawn to reap.', ['language'],
+)
+IO_SECONDS = Histogram(
+    'judge_io_seconds', 'Time spent writing test data into run workspaces.', ['language'],
+    buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 1.0),
+)
+COMPARE_SECONDS = Histogram(
+    'judge_compare_seconds', 'Time spent comparing output with the expected output, per test.', ['language'],
+    buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 1.0),
+)
+VERDICTS = Counter('judge_verdicts_total', 'Judged submissions by verdict.', ['language', 'verdict'])
+VERDICT_CACHE_HITS = Counter('judge_verdict_cache_hits_total', 'Results served from the verdict cache.', ['kind'])
+JOBS_IN_FLIGHT = Gauge('judge_jobs_in_flight', 'Submissions being judged or run right now.', ['source'])
+
+# HTTP
+REQUEST_SECONDS = Histogram(
+    'http_request_duration_seconds', 'Request latency by route.', ['route', 'method'],
+)
+REQUESTS = Counter('http_requests_total', 'Requests by route and status.', ['route', 'method', 'status'])
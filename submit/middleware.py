@@ -0,0 +1,25 @@
+import time
+
+from . import metrics
+
+
+class RequestMetricsMiddleware:
+    """Record the latency and status of every request, labelled by URL route.
+
+    The route pattern (``api/accounts/problem/<uuid:problem_id>/``) is used
+    rather than the path so the number of series stays bounded.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        started = time.perf_counter()
+        response = self.get_response(request)
+        elapsed = time.perf_counter() - started
+        match = request.resolver_match
+        route = match.route if match is not None else 'unmatched'
+        if route != 'metrics':
+            metrics.REQUEST_SECONDS.labels(route=route, method=request.method).observe(elapsed)
+            metrics.REQUESTS.labels(route=route, method=request.method, status=response.status_code).inc()
+        return response
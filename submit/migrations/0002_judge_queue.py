@@ -0,0 +1,42 @@
+# Generated by Django 4.2.13 on 2026-10-18 07:25
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('submit', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='codesubmission',
+            name='claimed_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='codesubmission',
+            name='judged_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='codesubmission',
+            name='problem_id',
+            field=models.CharField(blank=True, max_length=64),
+        ),
+        migrations.AddField(
+            model_name='codesubmission',
+            name='status',
+            field=models.CharField(choices=[('queued', 'Queued'), ('compiling', 'Compiling'), ('running', 'Running'), ('done', 'Done')], default='done', max_length=10),
+        ),
+        migrations.AddField(
+            model_name='codesubmission',
+            name='verdict',
+            field=models.CharField(blank=True, max_length=10),
+        ),
+        migrations.AddIndex(
+            model_name='codesubmission',
+            index=models.Index(fields=['status', 'id'], name='submit_queue_idx'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.13 on 2026-10-18 07:28
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('submit', '0002_judge_queue'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='codesubmission',
+            name='test_results',
+            field=models.JSONField(blank=True, default=list),
+        ),
+    ]
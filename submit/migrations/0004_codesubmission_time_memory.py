@@ -0,0 +1,23 @@
+# Generated by Django 4.2.13 on 2026-10-18 07:35
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('submit', '0003_codesubmission_test_results'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='codesubmission',
+            name='memory_kb',
+            field=models.PositiveIntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='codesubmission',
+            name='time_ms',
+            field=models.PositiveIntegerField(blank=True, null=True),
+        ),
+    ]
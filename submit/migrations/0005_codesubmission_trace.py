@@ -0,0 +1,18 @@
+# Generated by Django 4.2.13 on 2026-10-18 07:54
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('submit', '0004_codesubmission_time_memory'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='codesubmission',
+            name='trace',
+            field=models.JSONField(blank=True, null=True),
+        ),
+    ]
@@ -0,0 +1,113 @@
+# Generated by Django 4.2.13 on 2026-10-18 08:11
+
+import hashlib
+import zlib
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+TEXT_FIELDS = {'code': 'code_blob', 'input_data': 'input_blob', 'output_data': 'output_blob'}
+
+
+def move_to_blobs(apps, schema_editor):
+    # Frozen copy of submit.blobs.put: the digests and codec choice must match
+    Blob = apps.get_model('submit', 'Blob')
+    CodeSubmission = apps.get_model('submit', 'CodeSubmission')
+    stored = set(Blob.objects.values_list('digest', flat=True))
+    for submission in CodeSubmission.objects.only('id', *TEXT_FIELDS).iterator():
+        for text_field, blob_field in TEXT_FIELDS.items():
+            text = getattr(submission, text_field)
+            if not text:
+                continue
+            data = text.encode('utf-8')
+            key = hashlib.sha256(data).hexdigest()
+            if key not in stored:
+                codec, payload = 'raw', data
+                if len(data) >= 64:
+                    compressed = zlib.compress(data, 6)
+                    if len(compressed) < len(data):
+                        codec, payload = 'zlib', compressed
+                Blob.objects.create(digest=key, size=len(data), codec=codec, data=payload)
+                stored.add(key)
+            setattr(submission, f'{blob_field}_id', key)
+        submission.save(update_fields=list(TEXT_FIELDS.values()))
+
+
+def move_from_blobs(apps, schema_editor):
+    Blob = apps.get_model('submit', 'Blob')
+    CodeSubmission = apps.get_model('submit', 'CodeSubmission')
+    for submission in CodeSubmission.objects.iterator():
+        for text_field, blob_field in TEXT_FIELDS.items():
+            key = getattr(submission, f'{blob_field}_id')
+            if key is None:
+                continue
+            blob = Blob.objects.get(digest=key)
+            data = bytes(blob.data)
+            if blob.codec == 'zlib':
+                data = zlib.decompress(data)
+            setattr(submission, text_field, data.decode('utf-8', 'replace'))
+        submission.save(update_fields=list(TEXT_FIELDS))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('submit', '0006_codesubmission_user'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Blob',
+            fields=[
+                ('digest', models.CharField(max_length=64, primary_key=True, serialize=False)),
+                ('size', models.PositiveBigIntegerField()),
+                ('codec', models.CharField(max_length=8)),
+                ('data', models.BinaryField()),
+            ],
+        ),
+        migrations.AddField(
+            model_name='codesubmission',
+            name='code_blob',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.PROTECT, related_name='+', to='submit.blob'),
+        ),
+        migrations.AddField(
+            model_name='codesubmission',
+            name='input_blob',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.PROTECT, related_name='+', to='submit.blob'),
+        ),
+        migrations.AddField(
+            model_name='codesubmission',
+            name='output_blob',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.PROTECT, related_name='+', to='submit.blob'),
+        ),
+        migrations.RunPython(move_to_blobs, move_from_blobs),
+        # Defaults let the text columns be re-added on rows that exist when unapplying
+        migrations.AlterField(
+            model_name='codesubmission',
+            name='code',
+            field=models.TextField(default=''),
+        ),
+        migrations.AlterField(
+            model_name='codesubmission',
+            name='input_data',
+            field=models.TextField(blank=True, default=''),
+        ),
+        migrations.AlterField(
+            model_name='codesubmission',
+            name='output_data',
+            field=models.TextField(blank=True, default=''),
+        ),
+        migrations.RemoveField(
+            model_name='codesubmission',
+            name='code',
+        ),
+        migrations.RemoveField(
+            model_name='codesubmission',
+            name='input_data',
+        ),
+        migrations.RemoveField(
+            model_name='codesubmission',
+            name='output_data',
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 4.2.13 on 2026-10-18 08:21
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('submit', '0007_blob_storage'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='codesubmission',
+            name='submit_user_problem_idx',
+        ),
+    ]
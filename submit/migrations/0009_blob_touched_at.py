@@ -0,0 +1,19 @@
+# Generated by Django 4.2.13 on 2026-10-18 08:37
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('submit', '0008_drop_user_problem_idx'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='blob',
+            name='touched_at',
+            field=models.DateTimeField(db_index=True, default=django.utils.timezone.now),
+        ),
+    ]
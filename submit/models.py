@@ -1,19 +1,78 @@
-from django.db import models
+from django.contrib.auth.models import User
+from django.db import models, transaction
+from django.utils import timezone
+
+from .blobs import blob_text, save_pending
 
 # Create your models here.
 
 
+class Blob(models.Model):
+    """Deduplicated content, keyed by the SHA-256 of the uncompressed bytes (see submit.blobs)."""
+    digest = models.CharField(max_length=64, primary_key=True)
+    size = models.PositiveBigIntegerField()
+    codec = models.CharField(max_length=8)
+    data = models.BinaryField()
+    # Last time `blobs.put` stored or reused this blob; garbage collection spares recent blobs
+    touched_at = models.DateTimeField(default=timezone.now, db_index=True)
+
+    def __str__(self):
+        return f"{self.digest} ({self.size} bytes, {self.codec})"
+
+
 class CodeSubmission(models.Model):
     LANGUAGE_CHOICES = [
         ('cpp', 'C++'),
         ('py', 'Python'),
     ]
+
+    STATUS_QUEUED = 'queued'
+    STATUS_COMPILING = 'compiling'
+    STATUS_RUNNING = 'running'
+    STATUS_DONE = 'done'
+    STATUS_CHOICES = [
+        (STATUS_QUEUED, 'Queued'),
+        (STATUS_COMPILING, 'Compiling'),
+        (STATUS_RUNNING, 'Running'),
+        (STATUS_DONE, 'Done'),
+    ]
     
     language = models.CharField(max_length=10, choices=LANGUAGE_CHOICES)
-    code = models.TextField()
-    input_data = models.TextField(blank=True)
-    output_data = models.TextField(blank=True)
+    # Code, custom input and program output live in the blob store; rows keep the digests
+    code_blob = models.ForeignKey(Blob, on_delete=models.PROTECT, blank=True, null=True, related_name='+')
+    input_blob = models.ForeignKey(Blob, on_delete=models.PROTECT, blank=True, null=True, related_name='+')
+    output_blob = models.ForeignKey(Blob, on_delete=models.PROTECT, blank=True, null=True, related_name='+')
     submitted_at = models.DateTimeField(auto_now_add=True)
+    # Judge queue state (api_submit enqueues, judge_worker processes)
+    problem_id = models.CharField(max_length=64, blank=True)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=STATUS_DONE)
+    verdict = models.CharField(max_length=10, blank=True)
+    # Per-test {'test', 'verdict', 'time'} entries, up to the first failing test
+    test_results = models.JSONField(default=list, blank=True)
+    # Slowest test's CPU time and largest peak RSS (from wait4 rusage)
+    time_ms = models.PositiveIntegerField(blank=True, null=True)
+    memory_kb = models.PositiveIntegerField(blank=True, null=True)
+    claimed_at = models.DateTimeField(blank=True, null=True)
+    judged_at = models.DateTimeField(blank=True, null=True)
+    # Submitter, when api_submit was called with a session or JWT; the judge adds
+    # the judged submission to their accounts.Submission history
+    user = models.ForeignKey(User, on_delete=models.SET_NULL, blank=True, null=True)
+    # Timed phases and spawned processes (see submit.trace); null when not sampled
+    trace = models.JSONField(blank=True, null=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['status', 'id'], name='submit_queue_idx'),
+        ]
     
+    code = blob_text('code_blob')
+    input_data = blob_text('input_blob')
+    output_data = blob_text('output_blob')
+
+    def save(self, *args, **kwargs):
+        with transaction.atomic():
+            save_pending(self)
+            super().save(*args, **kwargs)
+
     def __str__(self):
         return f"{self.language} submission at {self.submitted_at}"
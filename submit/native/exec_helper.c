@@ -0,0 +1,90 @@
+/*
+ * Runs one submission under resource limits and reports its rusage.
+ *
+ *   exec_helper <cpu seconds> <address space bytes> <file size bytes> <report fd> <core> <program> [args...]
+ *
+ * A limit of 0 means "not limited". The program is pinned to CPU <core>
+ * unless it is -1. stdin/stdout/stderr are passed through.
+ * Once the program has exited, one line "<wait status> <user usec> <sys usec>
+ * <max rss kb>" is written to <report fd>.
+ *
+ * Linux carries a process's peak RSS across exec(), so a program forked
+ * straight from a large Python worker would report the worker's memory as
+ * its own. Forking from this small helper keeps ru_maxrss accurate.
+ */
+#define _GNU_SOURCE
+#include <errno.h>
+#include <sched.h>
+#include <stdio.h>
+#include <stdlib.h>
+#include <string.h>
+#include <sys/resource.h>
+#include <sys/time.h>
+#include <sys/types.h>
+#include <sys/wait.h>
+#include <unistd.h>
+
+static int set_limit(int resource, rlim_t value)
+{
+    struct rlimit limit;
+    limit.rlim_cur = value;
+    limit.rlim_max = value;
+    return setrlimit(resource, &limit);
+}
+
+static long usec(struct timeval tv)
+{
+    return (long)tv.tv_sec * 1000000L + (long)tv.tv_usec;
+}
+
+int main(int argc, char **argv)
+{
+    if (argc < 7) {
+        fprintf(stderr, "usage: %s cpu_seconds as_bytes fsize_bytes report_fd core program [args...]\n", argv[0]);
+        return 2;
+    }
+    rlim_t cpu_seconds = strtoull(argv[1], NULL, 10);
+    rlim_t as_bytes = strtoull(argv[2], NULL, 10);
+    rlim_t fsize_bytes = strtoull(argv[3], NULL, 10);
+    int report_fd = atoi(argv[4]);
+    int core = atoi(argv[5]);
+
+    if (core >= 0) {
+        cpu_set_t cpus;
+        CPU_ZERO(&cpus);
+        CPU_SET(core, &cpus);
+        /* Best effort: an unpinned run is still a valid run */
+        sched_setaffinity(0, sizeof(cpus), &cpus);
+    }
+
+    pid_t pid = fork();
+    if (pid < 0) {
+        perror("fork");
+        return 2;
+    }
+    if (pid == 0) {
+        close(report_fd);
+        if (cpu_seconds)
+            set_limit(RLIMIT_CPU, cpu_seconds);
+        /* Fall back to the data segment limit if AS is not available */
+        if (as_bytes && set_limit(RLIMIT_AS, as_bytes) != 0)
+            set_limit(RLIMIT_DATA, as_bytes);
+        if (fsize_bytes)
+            set_limit(RLIMIT_FSIZE, fsize_bytes);
+        set_limit(RLIMIT_CORE, 0);
+        execvp(argv[6], &argv[6]);
+        fprintf(stderr, "exec %s: %s\n", argv[6], strerror(errno));
+        _exit(127);
+    }
+
+    int status;
+    struct rusage usage;
+    while (wait4(pid, &status, 0, &usage) < 0) {
+        if (errno != EINTR) {
+            perror("wait4");
+            return 2;
+        }
+    }
+    dprintf(report_fd, "%d %ld %ld %ld\n", status, usec(usage.ru_utime), usec(usage.ru_stime), usage.ru_maxrss);
+    return 0;
+}
@@ -0,0 +1,60 @@
+"""Precompiled headers for C++ submissions.
+
+Most submissions start with ``#include <bits/stdc++.h>``, and parsing it is
+most of a compile. The judge precompiles each header in `PCH_HEADERS` once
+per compiler version and flag set, into a directory that is put first on the
+include path. It holds a stub ``bits/stdc++.h`` that ``#include_next``\\s the
+real one, next to ``bits/stdc++.h.gch``; g++ picks the ``.gch`` whenever the
+header is the first thing a submission includes and falls back to the stub
+(and so to the real header) otherwise. The directory is pinned in the compile
+cache: g++ silently ignores a missing ``-I`` directory, so an evicted PCH
+would only show up as slower compiles.
+"""
+import subprocess
+import threading
+
+from . import compile_cache, slots
+
+PCH_HEADERS = ('bits/stdc++.h',)
+BUILD_TIMEOUT_SECONDS = 120
+
+_lock = threading.Lock()
+_include_dirs = {}
+
+
+def _stub(header):
+    return f'#include_next <{header}>\n'
+
+
+def include_dir(gxx, flags):
+    """Return the precompiled-header include directory for `flags`, or None if it cannot be built."""
+    key = (gxx.command, tuple(flags))
+    with _lock:
+        if key in _include_dirs:
+            cached = _include_dirs[key]
+            # Rebuild if the cache directory was cleared under a long-lived worker
+            if cached is None or (cached / compile_cache.COMPLETE_MARKER).exists():
+                return cached
+        source = ''.join(f'{header}\n{_stub(header)}' for header in PCH_HEADERS)
+        cache_key = compile_cache.cache_key('cpp-pch', source, gxx.version, flags)
+
+        def build(out_dir):
+            for header in PCH_HEADERS:
+                stub = out_dir / header
+                stub.parent.mkdir(parents=True, exist_ok=True)
+                stub.write_text(_stub(header))
+                with slots.compile_slot():
+                    result = subprocess.run(
+                        [gxx.command, *flags, '-x', 'c++-header', str(stub), '-o', f'{stub}.gch'],
+                        capture_output=True, text=True, timeout=BUILD_TIMEOUT_SECONDS,
+                    )
+                if result.returncode != 0:
+                    return False, result.stderr
+            return True, ''
+
+        try:
+            artifact_dir, _ = compile_cache.get_or_build(cache_key, build, pinned=True)
+        except (OSError, subprocess.SubprocessError):
+            artifact_dir = None
+        _include_dirs[key] = artifact_dir
+        return artifact_dir
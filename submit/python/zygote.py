@@ -0,0 +1,204 @@
+"""Pre-forked Python runner for judge submissions.
+
+Started once per judge process as ``python zygote.py <socket path>``. It
+imports the modules submissions commonly use, prints ``ready`` and then serves
+one request per connection on the Unix socket until its stdin is closed, which
+happens when the judge process exits. Each request is a JSON line:
+
+* ``{"check": <script>}``: compile the script; the reply is
+  ``{"ok": true}`` or ``{"ok": false, "error": <message>}``.
+* ``{"run": <script>, "cwd", "cpu", "memory", "fsize", "core"}`` with the
+  program's stdin, stdout and stderr passed as file descriptors: fork a
+  child that applies the limits, pins itself to `core` (unless it is null)
+  and runs the script. The zygote replies ``{"pid": ...}``
+  right away and ``{"status", "utime", "stime", "maxrss"}`` from wait4() once
+  the child has exited.
+
+This file runs under the judged Python toolchain, not under Django, and only
+uses the standard library.
+"""
+import json
+import os
+import selectors
+import signal
+import socket
+import sys
+import traceback
+import types
+
+# Imported up front so forked submissions find them in sys.modules
+PRELOAD = (
+    'array', 'bisect', 'collections', 'copy', 'datetime', 'decimal', 'fractions', 'functools',
+    'heapq', 'io', 'itertools', 'math', 'operator', 're', 'random', 'statistics', 'string', 'typing',
+)
+MAX_FD = 1024
+
+
+def _send(conn, message):
+    try:
+        conn.sendall(json.dumps(message).encode() + b'\n')
+    except OSError:
+        pass
+
+
+def _check(script):
+    try:
+        with open(script, 'rb') as f:
+            compile(f.read(), script, 'exec')
+    except SyntaxError:
+        return {'ok': False, 'error': ''.join(traceback.format_exception_only(*sys.exc_info()[:2]))}
+    except (OSError, ValueError) as e:
+        return {'ok': False, 'error': str(e)}
+    return {'ok': True}
+
+
+def _set_limits(request):
+    import resource
+    if request.get('core') is not None:
+        try:
+            os.sched_setaffinity(0, {request['core']})
+        except OSError:
+            pass
+    resource.setrlimit(resource.RLIMIT_CORE, (0, 0))
+    if request['cpu']:
+        resource.setrlimit(resource.RLIMIT_CPU, (request['cpu'], request['cpu']))
+    if request['memory']:
+        try:
+            resource.setrlimit(resource.RLIMIT_AS, (request['memory'], request['memory']))
+        except (ValueError, OSError):
+            resource.setrlimit(resource.RLIMIT_DATA, (request['memory'], request['memory']))
+    if request['fsize']:
+        resource.setrlimit(resource.RLIMIT_FSIZE, (request['fsize'], request['fsize']))
+
+
+def _run_child(request, fds):
+    """Become the submission: never returns."""
+    status = 1
+    try:
+        os.setsid()
+        signal.set_wakeup_fd(-1)
+        signal.signal(signal.SIGCHLD, signal.SIG_DFL)
+        for target, fd in enumerate(fds):
+            os.dup2(fd, target)
+        os.closerange(3, MAX_FD)
+        os.chdir(request['cwd'])
+        _set_limits(request)
+
+        sys.stdin = open(0, 'r', closefd=False)
+        sys.stdout = open(1, 'w', closefd=False)
+        sys.stderr = open(2, 'w', buffering=1, errors='backslashreplace', closefd=False)
+        script = request['run']
+        sys.argv = [script]
+        sys.path[0] = os.path.dirname(script)
+        main = types.ModuleType('__main__')
+        main.__file__ = script
+        sys.modules['__main__'] = main
+        # Every child would otherwise continue the zygote's random stream
+        sys.modules['random'].seed()
+    except BaseException:
+        os._exit(125)
+
+    try:
+        with open(script, 'rb') as f:
+            code = compile(f.read(), script, 'exec')
+        exec(code, main.__dict__)
+        status = 0
+    except SystemExit as e:
+        if e.code is None:
+            status = 0
+        elif isinstance(e.code, int):
+            status = e.code
+        else:
+            print(e.code, file=sys.stderr)
+    except BaseException as e:
+        # Leave this module's frame out, as a plain interpreter would
+        traceback.print_exception(type(e), e, e.__traceback__.tb_next)
+    try:
+        sys.stdout.flush()
+    except BaseException:
+        traceback.print_exc()
+        status = status or 1
+    try:
+        sys.stderr.flush()
+    except BaseException:
+        pass
+    os._exit(status & 0xff)
+
+
+def main(path):
+    for name in PRELOAD:
+        __import__(name)
+
+    listener = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    listener.bind(path)
+    listener.listen(64)
+    wakeup_read, wakeup_write = os.pipe()
+    os.set_blocking(wakeup_write, False)
+    signal.set_wakeup_fd(wakeup_write)
+    # A handler (rather than SIG_DFL) so SIGCHLD writes to the wakeup fd
+    signal.signal(signal.SIGCHLD, lambda signum, frame: None)
+
+    selector = selectors.DefaultSelector()
+    selector.register(listener, selectors.EVENT_READ, 'accept')
+    selector.register(wakeup_read, selectors.EVENT_READ, 'reap')
+    selector.register(sys.stdin, selectors.EVENT_READ, 'parent')
+    running = {}
+    print('ready', flush=True)
+
+    while True:
+        for key, _ in selector.select():
+            if key.data == 'parent':
+                if not os.read(sys.stdin.fileno(), 4096):
+                    os.unlink(path)
+                    os.rmdir(os.path.dirname(path))
+                    return
+            elif key.data == 'accept':
+                conn, _ = listener.accept()
+                selector.register(conn, selectors.EVENT_READ, 'request')
+            elif key.data == 'reap':
+                os.read(wakeup_read, 4096)
+                while True:
+                    try:
+                        pid, status, rusage = os.wait4(-1, os.WNOHANG)
+                    except ChildProcessError:
+                        break
+                    if not pid:
+                        break
+                    conn = running.pop(pid, None)
+                    if conn is not None:
+                        _send(conn, {
+                            'status': status,
+                            'utime': rusage.ru_utime,
+                            'stime': rusage.ru_stime,
+                            'maxrss': rusage.ru_maxrss,
+                        })
+                        conn.close()
+            else:
+                conn = key.fileobj
+                selector.unregister(conn)
+                try:
+                    data, fds, _, _ = socket.recv_fds(conn, 65536, 3)
+                    request = json.loads(data)
+                except (OSError, ValueError):
+                    conn.close()
+                    continue
+                if 'check' in request:
+                    _send(conn, _check(request['check']))
+                    conn.close()
+                    continue
+                if len(fds) != 3:
+                    for fd in fds:
+                        os.close(fd)
+                    conn.close()
+                    continue
+                pid = os.fork()
+                if pid == 0:
+                    _run_child(request, fds)
+                for fd in fds:
+                    os.close(fd)
+                running[pid] = conn
+                _send(conn, {'pid': pid})
+
+
+if __name__ == '__main__':
+    main(sys.argv[1])
@@ -0,0 +1,201 @@
+"""Pre-forked execution of Python submissions (opt-in, ``JUDGE_PY_ZYGOTE``).
+
+A cold Python run pays for interpreter start-up and site imports before any
+user code runs, which is most of the measured time of a short program. With
+the zygote, each judge process keeps one interpreter (``python/zygote.py``)
+that has the common stdlib modules imported already and forks a child per
+run. The child applies the same limits as `runner._posix_limit_preexec` and
+is reaped by the zygote with wait4(), so its CPU time and peak RSS cover the
+submission alone. Scripts are compiled by the zygote first, so syntax errors
+come back as a compile error without a run.
+"""
+import atexit
+import json
+import os
+import shutil
+import signal
+import socket
+import subprocess
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+from . import toolchains
+from .workspace import workspace_root
+
+ZYGOTE_SCRIPT = Path(__file__).resolve().parent / 'python' / 'zygote.py'
+START_TIMEOUT_SECONDS = 10
+CHECK_TIMEOUT_SECONDS = 10
+
+
+class ZygoteError(Exception):
+    """The zygote could not be started or stopped answering."""
+
+
+def _read_message(conn, buffer, deadline=None):
+    """Read one JSON line from `conn`; returns ``(message, rest of buffer)``."""
+    while b'\n' not in buffer:
+        if deadline is not None:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                raise socket.timeout()
+            conn.settimeout(remaining)
+        else:
+            conn.settimeout(None)
+        chunk = conn.recv(4096)
+        if not chunk:
+            raise ZygoteError('zygote closed the connection')
+        buffer += chunk
+    line, buffer = buffer.split(b'\n', 1)
+    return json.loads(line), buffer
+
+
+class ZygoteChild:
+    """A submission forked by the zygote; same interface as `spawn.Child`."""
+
+    def __init__(self, zygote, script, stdin, cwd, cpu_seconds=0, memory_bytes=0, file_bytes=0, core=None):
+        self.returncode = None
+        self.cpu_time = 0.0
+        self.memory_kb = 0
+        self._buffer = b''
+        stdout_read, stdout_write = os.pipe()
+        stderr_read, stderr_write = os.pipe()
+        try:
+            self._conn = zygote.connect()
+            request = {
+                'run': script, 'cwd': cwd, 'cpu': cpu_seconds, 'memory': memory_bytes, 'fsize': file_bytes,
+                'core': core,
+            }
+            socket.send_fds(self._conn, [json.dumps(request).encode() + b'\n'],
+                            [stdin.fileno(), stdout_write, stderr_write])
+            reply, self._buffer = _read_message(self._conn, self._buffer, time.monotonic() + START_TIMEOUT_SECONDS)
+            self.pid = reply['pid']
+        except BaseException:
+            os.close(stdout_read)
+            os.close(stderr_read)
+            raise
+        finally:
+            os.close(stdout_write)
+            os.close(stderr_write)
+        self.stdout = os.fdopen(stdout_read, 'rb')
+        self.stderr = os.fdopen(stderr_read, 'rb')
+
+    def kill(self):
+        try:
+            os.killpg(self.pid, signal.SIGKILL)
+        except (ProcessLookupError, PermissionError):
+            pass
+
+    def reap(self, deadline=None):
+        """Wait for the zygote's wait4() report until `deadline`; returns whether it exited."""
+        try:
+            report, self._buffer = _read_message(self._conn, self._buffer, deadline)
+        except socket.timeout:
+            return False
+        except (OSError, ValueError, ZygoteError):
+            # The zygote died, taking the report with it
+            self.returncode = -signal.SIGKILL
+            self.memory_kb = 0
+            return True
+        self.returncode = os.waitstatus_to_exitcode(report['status'])
+        self.cpu_time = report['utime'] + report['stime']
+        # ru_maxrss is in kilobytes on Linux
+        self.memory_kb = report['maxrss']
+        return True
+
+    def close(self):
+        self.stdout.close()
+        self.stderr.close()
+        self._conn.close()
+
+
+class Zygote:
+    """One zygote interpreter, started on first use and restarted if it dies."""
+
+    def __init__(self, python):
+        self._python = python
+        self._proc = None
+        self._dir = None
+        self._lock = threading.Lock()
+
+    @property
+    def address(self):
+        return str(Path(self._dir) / 'zygote.sock')
+
+    def _start(self):
+        self.stop()
+        self._dir = tempfile.mkdtemp(prefix='zygote-', dir=workspace_root())
+        self._proc = subprocess.Popen(
+            [self._python, str(ZYGOTE_SCRIPT), self.address],
+            # Closed when this process exits, however it exits, and the zygote follows
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL,
+            start_new_session=True,
+        )
+        # Blocks until the zygote has imported its modules and is listening
+        if self._proc.stdout.readline().strip() != b'ready':
+            self.stop()
+            raise ZygoteError('zygote did not start')
+
+    def stop(self):
+        if self._proc is not None:
+            try:
+                self._proc.kill()
+                self._proc.wait()
+                self._proc.stdin.close()
+                self._proc.stdout.close()
+            except OSError:
+                pass
+            self._proc = None
+        if self._dir is not None:
+            shutil.rmtree(self._dir, ignore_errors=True)
+            self._dir = None
+
+    def connect(self):
+        with self._lock:
+            if self._proc is None or self._proc.poll() is not None:
+                self._start()
+            conn = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            try:
+                conn.connect(self.address)
+            except OSError as e:
+                conn.close()
+                raise ZygoteError(str(e))
+            return conn
+
+    def check(self, script):
+        """Compile `script` in the zygote; returns the syntax error text, or None."""
+        conn = self.connect()
+        try:
+            conn.sendall(json.dumps({'check': str(script)}).encode() + b'\n')
+            reply, _ = _read_message(conn, b'', time.monotonic() + CHECK_TIMEOUT_SECONDS)
+        finally:
+            conn.close()
+        return None if reply['ok'] else reply['error']
+
+    def spawn(self, script, stdin, cwd, cpu_seconds=0, memory_bytes=0, file_bytes=0, core=None):
+        return ZygoteChild(self, str(script), stdin, cwd, cpu_seconds, memory_bytes, file_bytes, core)
+
+
+_zygotes_lock = threading.Lock()
+_zygotes = {}
+
+
+def get_zygote():
+    """Return this process's zygote for the Python toolchain."""
+    python = toolchains.require('python').command
+    with _zygotes_lock:
+        # Keyed by pid as well: a forked judge process must start its own
+        key = (os.getpid(), python)
+        if key not in _zygotes:
+            _zygotes[key] = Zygote(python)
+        return _zygotes[key]
+
+
+@atexit.register
+def _stop_all():
+    for (pid, _), zygote in list(_zygotes.items()):
+        if pid == os.getpid():
+            zygote.stop()
@@ -0,0 +1,446 @@
+"""Compile and execute user submissions with resource limits."""
+import os
+import selectors
+import signal
+import time
+import subprocess
+from dataclasses import dataclass
+from typing import Optional
+
+from django.conf import settings
+
+from . import compile_cache, javaserver, metrics, pch, pyzygote, slots, toolchains, trace, verdicts
+from .spawn import Child
+from .workspace import workspace
+from .toolchains import ToolchainError
+
+TIME_LIMIT_SECONDS = 5
+COMPILE_TIME_LIMIT_SECONDS = 10
+MEMORY_LIMIT_MB = 256
+CPP_FLAGS = ["-O2", "-std=c++17"]
+OUTPUT_LIMIT_BYTES = 1_048_576  # 1 MB
+STDERR_LIMIT_BYTES = 65_536
+PIPE_CHUNK_BYTES = 65_536
+# A crash after using this share of the memory limit counts as MLE
+MLE_RSS_FRACTION = 0.9
+
+def _posix_limit_preexec(memory_limit_mb: int = MEMORY_LIMIT_MB):
+    """Return a preexec_fn that sets CPU, address space, and file size limits on POSIX.
+    Returns None on non-POSIX systems.
+    """
+    if os.name != 'posix':
+        return None
+    try:
+        import resource
+    except Exception:
+        return None
+
+    def set_limits():
+        # CPU time
+        resource.setrlimit(resource.RLIMIT_CPU, (TIME_LIMIT_SECONDS, TIME_LIMIT_SECONDS))
+        # Virtual memory/address space (bytes)
+        address_space_bytes = memory_limit_mb * 1024 * 1024
+        try:
+            resource.setrlimit(resource.RLIMIT_AS, (address_space_bytes, address_space_bytes))
+        except (ValueError, OSError):
+            # Fallback to data segment limit if AS not available
+            try:
+                resource.setrlimit(resource.RLIMIT_DATA, (address_space_bytes, address_space_bytes))
+            except Exception:
+                pass
+        # Output file size
+        try:
+            resource.setrlimit(resource.RLIMIT_FSIZE, (OUTPUT_LIMIT_BYTES, OUTPUT_LIMIT_BYTES))
+        except Exception:
+            pass
+        # No core dumps
+        try:
+            resource.setrlimit(resource.RLIMIT_CORE, (0, 0))
+        except Exception:
+            pass
+
+    return set_limits
+
+def _classify_error(returncode, stderr_text, peak_rss_kb=0, memory_limit_kb=None):
+    """Classify a failed run from its exit status, peak memory and stderr.
+
+    A signal alone is not taken as MLE: a SIGSEGV or SIGABRT is only reported
+    as Memory Limit Exceeded when the run really used (nearly) all of its
+    memory or printed an allocation failure.
+    """
+    # Default
+    error_type = 'rte'
+    message = 'Runtime Error'
+
+    if memory_limit_kb and peak_rss_kb >= memory_limit_kb * MLE_RSS_FRACTION:
+        return 'mle', 'Memory Limit Exceeded'
+
+    # RLIMIT_CPU delivers SIGXCPU
+    if os.name == 'posix' and returncode is not None and returncode < 0:
+        if -returncode == signal.SIGXCPU:
+            return 'tle', 'Time Limit Exceeded'
+
+    lower = (stderr_text or '').lower()
+    if 'memoryerror' in lower:
+        return 'mle', 'Memory Limit Exceeded'
+    if 'outofmemoryerror' in lower:
+        return 'mle', 'Memory Limit Exceeded'
+    if 'bad_alloc' in lower:
+        return 'mle', 'Memory Limit Exceeded'
+
+    return error_type, message
+
+
+def parse_verdict(output):
+    """Return the verdict code for a `run_code` marker such as ``[TLE]``, or None."""
+    if isinstance(output, str) and output.startswith('['):
+        for verdict in ('TLE', 'MLE', 'RTE', 'CE', 'OLE', 'JE'):
+            if output.startswith(f'[{verdict}]'):
+                return verdict
+    return None
+
+
+class CompileError(Exception):
+    """Raised by `compile_program` when the submission does not compile."""
+
+
+class Program:
+    """A compiled submission, ready to be run against any number of inputs."""
+
+    def __init__(self, language, argv, limit_memory=True, time_allowance=0.0, zygote=None):
+        self.language = language
+        self.argv = argv
+        # Python programs are forked from this `pyzygote.Zygote` when set
+        self.zygote = zygote
+        # The JVM reserves far more address space than it uses, so RLIMIT_AS
+        # cannot be applied to Java runs
+        self.limit_memory = limit_memory
+        # Interpreter start-up time that is not charged to the submission
+        self.time_allowance = time_allowance
+
+
+@dataclass
+class RunResult:
+    """Outcome of one `execute` call.
+
+    `verdict` is None when the program exited normally, otherwise one of
+    ``TLE``/``MLE``/``RTE``/``OLE`` and `output` holds the ``[VERDICT]`` message.
+    `time` is the child's CPU time (user + sys) from wait4(); for Java, whose
+    JIT and GC threads make CPU time meaningless, it is the wall time minus the
+    JVM start-up allowance. `memory_kb` is the child's peak RSS.
+    """
+    verdict: Optional[str]
+    output: str
+    time: float
+    wall_time: float = 0.0
+    memory_kb: int = 0
+    # The output sink rejected the output and the program was killed
+    stopped_early: bool = False
+
+
+def _java_class_name(code):
+    # For Java, the class name must match the file name
+    class_name = "Main"  # Default class name
+    if "class" in code and "public class" in code:
+        # Try to extract class name from the code
+        for line in code.split('\n'):
+            if line.strip().startswith('public class'):
+                class_name = line.strip().split('public class')[1].split()[0].strip()
+                break
+    return class_name
+
+
+def _run_compiler(argv, timeout):
+    trace.spawn(argv)
+    compile_result = subprocess.run(argv, capture_output=True, text=True, timeout=timeout)
+    return compile_result.returncode == 0, compile_result.stderr
+
+
+def _compile(language, code, version, flags, compile_argv, compiler=_run_compiler):
+    """Build `code` through the compile cache.
+
+    `compile_argv(source, out_dir)` gives the arguments that `compiler(argv,
+    timeout)` is called with; it returns ``(ok, diagnostics)``.
+    """
+    key = compile_cache.cache_key(language, code, version, flags)
+
+    def build(out_dir):
+        if compile_argv is None:
+            # Interpreted: the "artifact" is the source itself
+            (out_dir / f"main.{language}").write_text(code)
+            return True, ""
+        with workspace() as work_dir:
+            if language == "java":
+                source_path = work_dir / f"{_java_class_name(code)}.java"
+            else:
+                source_path = work_dir / f"main.{language}"
+            source_path.write_text(code)
+            with slots.compile_slot():
+                return compiler(compile_argv(source_path, out_dir), COMPILE_TIME_LIMIT_SECONDS)
+
+    artifact_dir, compile_error = compile_cache.get_or_build(key, build)
+    if artifact_dir is None:
+        raise CompileError(compile_error)
+    return artifact_dir
+
+
+def compile_program(language, code, role="submission"):
+    """Compile `code` once and return a `Program` that `execute` can run repeatedly.
+
+    Raises `CompileError` with the compiler output, or `ToolchainError` when the
+    language's toolchain is missing. `role` labels the compile metric, so
+    checker compiles are told apart from contestant ones.
+    """
+    compile_seconds = metrics.COMPILE_SECONDS.labels(language=language, role=role)
+    with trace.span("compile", language=language), compile_seconds.time():
+        return _compile_program(language, code)
+
+
+def _compile_program(language, code):
+    if language == "cpp":
+        gxx = toolchains.require("g++")
+        flags = CPP_FLAGS
+        pch_dir = pch.include_dir(gxx, flags) if settings.JUDGE_CPP_PCH else None
+        include_flags = ["-I", str(pch_dir)] if pch_dir is not None else []
+        artifact_dir = _compile(
+            language, code, gxx.version, flags,
+            lambda source, out_dir: [gxx.command, *include_flags, str(source), *flags, "-o", str(out_dir / "main")],
+        )
+        return Program(language, [str(artifact_dir / "main")])
+
+    if language == "py":
+        python = toolchains.require("python")
+        artifact_dir = _compile(language, code, python.version, [], None)
+        script = artifact_dir / "main.py"
+        zygote = None
+        if settings.JUDGE_PY_ZYGOTE:
+            zygote = pyzygote.get_zygote()
+            try:
+                syntax_error = zygote.check(script)
+            except (pyzygote.ZygoteError, OSError, ValueError):
+                zygote = None
+            else:
+                if syntax_error:
+                    raise CompileError(syntax_error)
+        return Program(language, [python.command, str(script)], zygote=zygote)
+
+    if language == "java":
+        javac = toolchains.require("javac")
+        java = toolchains.require("java")
+        flags = ["-encoding", "UTF-8"]
+        class_dir = _compile(
+            language, code, javac.version, flags,
+            lambda source, out_dir: [*flags, "-d", str(out_dir), str(source)],
+            compiler=javaserver.compile_java,
+        )
+        if settings.JUDGE_JAVA_WARM:
+            runtime_flags = javaserver.runtime_flags()
+            time_allowance = javaserver.startup_allowance()
+        else:
+            runtime_flags, time_allowance = [], 0.0
+        return Program(
+            language,
+            [java.command, *runtime_flags, "-Xms32m", "-Xmx256m", "-cp", str(class_dir), _java_class_name(code)],
+            limit_memory=False,
+            time_allowance=time_allowance,
+        )
+
+    raise ToolchainError(f"Unsupported language: {language}")
+
+
+def _stream_output(child, timeout, output_sink):
+    """Drain the child's stdout/stderr pipes until it exits or a limit is hit.
+
+    Returns ``(status, stdout, stderr)`` where `status` is ``'exited'``,
+    ``'timeout'``, ``'ole'`` or ``'stopped'`` (the sink rejected the output).
+    The child is killed in every case but ``'exited'`` and is always reaped,
+    so its CPU time and peak RSS are available afterwards. stdout is only
+    collected when there is no sink; stderr is kept up to STDERR_LIMIT_BYTES.
+    """
+    deadline = time.monotonic() + timeout
+    stdout_chunks, stderr_chunks = [], []
+    stdout_size = stderr_size = 0
+    status = 'exited'
+    with selectors.DefaultSelector() as selector:
+        selector.register(child.stdout, selectors.EVENT_READ)
+        selector.register(child.stderr, selectors.EVENT_READ)
+        while status == 'exited' and selector.get_map():
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                status = 'timeout'
+                break
+            for key, _ in selector.select(remaining):
+                chunk = os.read(key.fd, PIPE_CHUNK_BYTES)
+                if not chunk:
+                    selector.unregister(key.fileobj)
+                elif key.fileobj is child.stderr:
+                    if stderr_size < STDERR_LIMIT_BYTES:
+                        stderr_chunks.append(chunk)
+                        stderr_size += len(chunk)
+                else:
+                    stdout_size += len(chunk)
+                    if stdout_size > OUTPUT_LIMIT_BYTES:
+                        status = 'ole'
+                        break
+                    if output_sink is None:
+                        stdout_chunks.append(chunk)
+                    elif not output_sink.feed(chunk):
+                        status = 'stopped'
+                        break
+
+    if status == 'exited' and not child.reap(deadline):
+        # Both pipes are closed, but the process kept running
+        status = 'timeout'
+    if child.returncode is None:
+        child.kill()
+        child.reap()
+    child.close()
+    return status, b''.join(stdout_chunks), b''.join(stderr_chunks)[:STDERR_LIMIT_BYTES]
+
+
+def _start_child(program, input_file, work_dir, core):
+    limits = {
+        "cpu_seconds": TIME_LIMIT_SECONDS if program.limit_memory else 0,
+        "memory_bytes": MEMORY_LIMIT_MB * 1024 * 1024 if program.limit_memory else 0,
+        "file_bytes": OUTPUT_LIMIT_BYTES if program.limit_memory else 0,
+        "core": core,
+    }
+    if program.zygote is not None:
+        try:
+            return program.zygote.spawn(program.argv[-1], input_file, str(work_dir), **limits)
+        except (pyzygote.ZygoteError, OSError, ValueError):
+            pass
+    return Child(
+        program.argv,
+        stdin=input_file,
+        cwd=str(work_dir),
+        preexec_fn=_posix_limit_preexec(MEMORY_LIMIT_MB) if program.limit_memory else None,
+        **limits,
+    )
+
+
+def execute(program, input_data, output_sink=None, work_dir=None):
+    """Run `program` once with `input_data` on stdin under the judge limits.
+
+    `input_data` is the input as text or bytes, or the path of an input file;
+    a file is opened and passed to the program as its stdin without copying.
+
+    stdout is read through a pipe and the program is killed as soon as it
+    writes more than OUTPUT_LIMIT_BYTES. When `output_sink` is given, each
+    stdout chunk is passed to ``output_sink.feed(chunk)`` instead of being
+    collected, and the program is killed as soon as `feed` returns False; the
+    result then has `stopped_early` set and no verdict of its own.
+
+    The program runs in `work_dir`, or in a fresh private workspace that is
+    removed afterwards.
+    """
+    if work_dir is None:
+        with workspace() as work_dir:
+            return execute(program, input_data, output_sink, work_dir)
+
+    if isinstance(input_data, os.PathLike):
+        input_file_path = input_data
+    else:
+        input_file_path = work_dir / "input.txt"
+        mode = "w" if isinstance(input_data, str) else "wb"
+        with trace.span("write_input"), metrics.IO_SECONDS.labels(language=program.language).time():
+            with open(input_file_path, mode) as input_file:
+                input_file.write(input_data)
+
+    # Queue for a free core first, so waiting is not charged to the program
+    with slots.run_slot() as slot:
+        with trace.span("run", core=slot.core):
+            started = time.monotonic()
+            with open(input_file_path, "rb") as input_file:
+                child = _start_child(program, input_file, work_dir, slot.core)
+            trace.spawn(program.argv, child.pid)
+            status, stdout, stderr = _stream_output(child, TIME_LIMIT_SECONDS + program.time_allowance, output_sink)
+            elapsed = time.monotonic() - started
+    metrics.RUN_SECONDS.labels(language=program.language).observe(elapsed)
+    wall_time = max(0.0, elapsed - program.time_allowance)
+    cpu_time = child.cpu_time
+    memory_kb = child.memory_kb
+    run_time = cpu_time if program.limit_memory else wall_time
+    memory_limit_kb = MEMORY_LIMIT_MB * 1024 if program.limit_memory else None
+
+    def result(verdict, output, **kwargs):
+        return RunResult(verdict, output, run_time, wall_time, memory_kb, **kwargs)
+
+    if status == 'timeout' or (program.limit_memory and cpu_time > TIME_LIMIT_SECONDS):
+        return result('TLE', "[TLE] Time Limit Exceeded")
+    if status == 'ole':
+        return result('OLE', "[OLE] Output Limit Exceeded")
+    if memory_limit_kb and memory_kb > memory_limit_kb:
+        return result('MLE', "[MLE] Memory Limit Exceeded")
+    if status == 'stopped':
+        return result(None, '', stopped_early=True)
+    if child.returncode != 0:
+        stderr_text = stderr.decode('utf-8', 'replace')
+        err_type, msg = _classify_error(child.returncode, stderr_text, memory_kb, memory_limit_kb)
+        return result(err_type.upper(), f"[{err_type.upper()}] {msg}:\n{stderr_text}")
+    return result(None, stdout.decode('utf-8', 'replace'))
+
+
+def missing_tool_message(error):
+    """Return the ``[RTE]`` message for a FileNotFoundError raised while compiling or running."""
+    if "g++" in str(error):
+        return "[RTE] Error: C++ compiler (g++) not found. Please install MinGW or another C++ compiler."
+    elif "python" in str(error) or "py" in str(error):
+        return "[RTE] Error: Python interpreter not found. Please install Python and ensure it's in your PATH."
+    elif "javac" in str(error) or "java" in str(error):
+        return "[RTE] Error: Java compiler or runtime not found. Please check your JDK installation."
+    else:
+        return f"[RTE] Error: Required program not found - {str(error)}"
+
+
+def run_code(language, code, input_data, on_phase=None):
+    """Compile (if needed) and run `code`, returning its output or a ``[VERDICT]`` message.
+
+    `on_phase`, when given, is called with ``'compiling'`` and ``'running'`` as the
+    submission moves through each step. Repeated calls with the same code and
+    input are answered from the verdict cache without running anything.
+    """
+    def _phase(name):
+        if on_phase is not None:
+            on_phase(name)
+
+    cache_key = verdicts.run_key(language, code, input_data)
+    cached = verdicts.get(cache_key)
+    if cached is not None:
+        metrics.VERDICT_CACHE_HITS.labels(kind="run").inc()
+        return cached
+
+    in_flight = metrics.JOBS_IN_FLIGHT.labels(source="run")
+    in_flight.inc()
+    try:
+        return _run_code(language, code, input_data, _phase, cache_key)
+    finally:
+        in_flight.dec()
+
+
+def _run_code(language, code, input_data, _phase, cache_key):
+    try:
+        if language != "py":
+            _phase("compiling")
+        program = compile_program(language, code)
+        _phase("running")
+        result = execute(program, input_data)
+    except CompileError as e:
+        output = f"[CE] Compilation Error:\n{e}"
+        verdicts.put(cache_key, output, "CE")
+        return output
+    except ToolchainError as e:
+        return f"[RTE] Error: {e}"
+    except subprocess.TimeoutExpired:
+        return "[TLE] Time Limit Exceeded"
+    except FileNotFoundError as e:
+        return missing_tool_message(e)
+    except Exception as e:
+        return f"[RTE] Error: {str(e)}"
+
+    if result.verdict is not None:
+        output = result.output
+    else:
+        output = result.output if result.output else "Program executed successfully (no output)"
+    verdicts.put(cache_key, output, result.verdict, result.time)
+    return output
@@ -0,0 +1,231 @@
+"""Judge slot scheduler shared by every process on the machine.
+
+Timed runs and compiles each draw from their own pool of slots, so a burst
+of compiles cannot steal cores from runs whose time is being measured. Each
+run slot owns one CPU and the run is pinned to it (`JUDGE_RUN_CPUS`).
+Compiles are capped in number (`JUDGE_COMPILE_SLOTS`) and run on their own
+CPUs (`JUDGE_COMPILE_CPUS`). By default, on a machine with two or more
+usable CPUs, compiles get the highest-numbered ones, up to one per compile
+slot and at most half of them, and runs get the rest. `JUDGE_PIN_RUNS`
+turns both kinds of pinning off.
+
+Slots are lock files under ``JUDGE_CACHE_DIR/slots`` held with flock(), so
+judge workers, gunicorn workers and their threads all share the same pools,
+and a crashed holder frees its slot automatically. The holder writes its pid
+and acquisition time into the file; `status` reads them back for the health
+endpoint, together with this process's acquisition and wait counters.
+"""
+import fcntl
+import os
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+from pathlib import Path
+
+from django.conf import settings
+
+POLL_INITIAL_SECONDS = 0.001
+POLL_MAX_SECONDS = 0.01
+_HOLDER_BYTES = 64
+
+
+def parse_cpus(spec):
+    """Parse a CPU list such as ``"0,2,4-7"``; an empty spec means every usable CPU."""
+    if not spec.strip():
+        if hasattr(os, 'sched_getaffinity'):
+            return sorted(os.sched_getaffinity(0))
+        return list(range(os.cpu_count() or 1))
+    cpus = []
+    for part in spec.split(','):
+        first, _, last = part.strip().partition('-')
+        cpus.extend(range(int(first), int(last or first) + 1))
+    return cpus
+
+
+def compile_cpus():
+    """CPUs compiles run on: `JUDGE_COMPILE_CPUS`, or the default reserve described above."""
+    if settings.JUDGE_COMPILE_CPUS.strip():
+        return parse_cpus(settings.JUDGE_COMPILE_CPUS)
+    usable = parse_cpus('')
+    reserved = min(max(1, settings.JUDGE_COMPILE_SLOTS), len(usable) // 2)
+    return usable[-reserved:] if reserved else usable
+
+
+def run_cpus():
+    """CPUs timed runs are pinned to: `JUDGE_RUN_CPUS`, or every usable CPU not reserved for compiles."""
+    if settings.JUDGE_RUN_CPUS.strip():
+        return parse_cpus(settings.JUDGE_RUN_CPUS)
+    usable = parse_cpus('')
+    reserved = set(compile_cpus())
+    return [cpu for cpu in usable if cpu not in reserved] or usable
+
+
+@contextmanager
+def _thread_affinity(cpus):
+    """Run the calling thread, and every process it starts, on `cpus` for the duration of the block."""
+    # sched_setaffinity(0) applies to the calling thread only; children inherit it
+    previous = os.sched_getaffinity(0)
+    try:
+        os.sched_setaffinity(0, cpus)
+    except OSError:
+        yield
+        return
+    try:
+        yield
+    finally:
+        os.sched_setaffinity(0, previous)
+
+
+class Slot:
+    """One held slot; `core` is the CPU to pin to, or None."""
+
+    def __init__(self, pool, index, core):
+        self.pool = pool
+        self.index = index
+        self.core = core
+
+
+class SlotPool:
+    """A fixed number of machine-wide slots, optionally each tied to a CPU or sharing a CPU set."""
+
+    def __init__(self, name, size, cores=None, cpus=None):
+        self.name = name
+        self.size = max(1, size)
+        self.cores = cores
+        self.cpus = cpus
+        self._pid = None
+        self._files = []
+        self._thread_locks = [threading.Lock() for _ in range(self.size)]
+        self._stats_lock = threading.Lock()
+        self.acquired = 0
+        self.waited = 0
+        self.wait_seconds = 0.0
+        self.max_wait_seconds = 0.0
+
+    def _path(self, index):
+        return Path(settings.JUDGE_CACHE_DIR) / 'slots' / f'{self.name}-{index}.lock'
+
+    def _lock_files(self):
+        # flock() locks belong to the open file, which a forked child would
+        # share with its parent, so every process opens its own
+        if self._pid != os.getpid():
+            self._path(0).parent.mkdir(parents=True, exist_ok=True)
+            self._files = [os.open(self._path(i), os.O_RDWR | os.O_CREAT, 0o644) for i in range(self.size)]
+            self._pid = os.getpid()
+        return self._files
+
+    def _try_acquire(self, index):
+        if not self._thread_locks[index].acquire(blocking=False):
+            return False
+        fd = self._lock_files()[index]
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            self._thread_locks[index].release()
+            return False
+        os.pwrite(fd, f'{os.getpid()} {time.time():.3f}'.ljust(_HOLDER_BYTES).encode(), 0)
+        return True
+
+    def _release(self, index):
+        fd = self._lock_files()[index]
+        os.pwrite(fd, b' ' * _HOLDER_BYTES, 0)
+        fcntl.flock(fd, fcntl.LOCK_UN)
+        self._thread_locks[index].release()
+
+    @contextmanager
+    def acquire(self):
+        """Hold a free slot for the duration of the block, waiting for one if needed."""
+        started = time.monotonic()
+        # Start at a different slot in every process so they do not all contend for slot 0
+        offset = os.getpid() % self.size
+        delay = POLL_INITIAL_SECONDS
+        contended = False
+        while True:
+            index = next(
+                (i % self.size for i in range(offset, offset + self.size) if self._try_acquire(i % self.size)),
+                None,
+            )
+            if index is not None:
+                break
+            contended = True
+            time.sleep(delay)
+            delay = min(delay * 2, POLL_MAX_SECONDS)
+
+        waited = time.monotonic() - started
+        with self._stats_lock:
+            self.acquired += 1
+            self.waited += contended
+            self.wait_seconds += waited
+            self.max_wait_seconds = max(self.max_wait_seconds, waited)
+        try:
+            yield Slot(self, index, self.cores[index] if self.cores else None)
+        finally:
+            self._release(index)
+
+    def status(self):
+        """Holders of every slot on the machine plus this process's counters."""
+        slots = []
+        for index in range(self.size):
+            holder = None
+            try:
+                with open(self._path(index), 'rb+') as f:
+                    try:
+                        fcntl.flock(f, fcntl.LOCK_SH | fcntl.LOCK_NB)
+                        fcntl.flock(f, fcntl.LOCK_UN)
+                    except BlockingIOError:
+                        pid, _, since = f.read(_HOLDER_BYTES).decode().strip().partition(' ')
+                        holder = {'pid': int(pid), 'since': float(since)} if pid else {}
+            except (OSError, ValueError):
+                pass
+            slots.append({
+                'index': index,
+                'core': self.cores[index] if self.cores else None,
+                'busy': holder is not None,
+                'holder': holder,
+            })
+        with self._stats_lock:
+            counters = {
+                'acquired': self.acquired,
+                'waited': self.waited,
+                'wait_seconds': round(self.wait_seconds, 6),
+                'max_wait_seconds': round(self.max_wait_seconds, 6),
+            }
+        return {
+            'size': self.size,
+            'cpus': self.cpus,
+            'slots': slots,
+            'process': {'pid': os.getpid(), **counters},
+        }
+
+
+_pools_lock = threading.Lock()
+_pools = {}
+
+
+def _pool(name):
+    with _pools_lock:
+        if name not in _pools:
+            if name == 'run':
+                cores = run_cpus()
+                _pools[name] = SlotPool('run', len(cores), cores if settings.JUDGE_PIN_RUNS else None)
+            else:
+                cpus = compile_cpus() if settings.JUDGE_PIN_RUNS and hasattr(os, 'sched_setaffinity') else None
+                _pools[name] = SlotPool('compile', settings.JUDGE_COMPILE_SLOTS, cpus=cpus)
+        return _pools[name]
+
+
+def run_slot():
+    """Context manager holding a run slot; pin the run to ``slot.core``."""
+    return _pool('run').acquire()
+
+
+@contextmanager
+def compile_slot():
+    """Context manager holding a compile slot; compilers started inside it run on the compile CPUs."""
+    pool = _pool('compile')
+    with pool.acquire() as slot, (_thread_affinity(pool.cpus) if pool.cpus else nullcontext()):
+        yield slot
+
+
+def status():
+    return {name: _pool(name).status() for name in ('run', 'compile')}
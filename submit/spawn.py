@@ -0,0 +1,172 @@
+"""Start submission processes and account for their CPU time and memory.
+
+Programs are launched through ``native/exec_helper.c``, which applies the
+rlimits, waits for the program with wait4() and reports its rusage on a pipe.
+Forking from that small helper rather than from the (large) worker keeps
+``ru_maxrss`` accurate. If the helper cannot be built, programs are started
+directly with a preexec_fn and reaped with os.wait4(); their peak RSS is then
+an upper bound that includes the worker's own resident memory.
+"""
+import os
+import signal
+import subprocess
+import threading
+import time
+from pathlib import Path
+
+from . import compile_cache, toolchains
+
+HELPER_SOURCE = Path(__file__).resolve().parent / 'native' / 'exec_helper.c'
+
+_helper_lock = threading.Lock()
+_helper = None
+_helper_probed = False
+
+
+def helper_path():
+    """Return the compiled exec helper, building it if needed; None if it cannot be built."""
+    global _helper, _helper_probed
+    with _helper_lock:
+        # Rebuild if the cache directory was cleared under a long-lived worker
+        if _helper_probed and (_helper is None or os.path.exists(_helper)):
+            return _helper
+        _helper_probed = True
+        _helper = None
+        if os.name != 'posix':
+            return None
+        try:
+            gxx = toolchains.require('g++')
+        except toolchains.ToolchainError:
+            return None
+        flags = ['-x', 'c', '-O2']
+        key = compile_cache.cache_key('exec-helper', HELPER_SOURCE.read_text(), gxx.version, flags)
+
+        def build(out_dir):
+            result = subprocess.run(
+                [gxx.command, *flags, str(HELPER_SOURCE), '-o', str(out_dir / 'exec_helper')],
+                capture_output=True, text=True, timeout=60,
+            )
+            return result.returncode == 0, result.stderr
+
+        try:
+            # Pinned: every run goes through the helper, so LRU eviction must not remove it
+            artifact_dir, _ = compile_cache.get_or_build(key, build, pinned=True)
+        except (OSError, subprocess.SubprocessError):
+            artifact_dir = None
+        _helper = str(artifact_dir / 'exec_helper') if artifact_dir is not None else None
+        return _helper
+
+
+def _pinned(preexec_fn, core):
+    """Wrap `preexec_fn` so the child is also pinned to CPU `core`."""
+    if core is None:
+        return preexec_fn
+
+    def pin():
+        try:
+            os.sched_setaffinity(0, {core})
+        except OSError:
+            pass
+        if preexec_fn is not None:
+            preexec_fn()
+
+    return pin
+
+
+class Child:
+    """A running submission with piped stdout/stderr.
+
+    After `reap` returns True, `returncode`, `cpu_time` (seconds, user + sys)
+    and `memory_kb` (peak RSS) describe the finished program. `core`, when
+    given, pins the program to that CPU.
+    """
+
+    def __init__(self, argv, stdin, cwd=None, cpu_seconds=0, memory_bytes=0, file_bytes=0, preexec_fn=None,
+                 core=None):
+        self.returncode = None
+        self.cpu_time = 0.0
+        self.memory_kb = 0
+        self._report = None
+        helper = helper_path()
+        if helper is not None:
+            report_read, report_write = os.pipe()
+            try:
+                self.proc = subprocess.Popen(
+                    [helper, str(cpu_seconds), str(memory_bytes), str(file_bytes), str(report_write),
+                     str(-1 if core is None else core), *argv],
+                    stdin=stdin,
+                    stdout=subprocess.PIPE,
+                    stderr=subprocess.PIPE,
+                    cwd=cwd,
+                    pass_fds=(report_write,),
+                    start_new_session=True,
+                )
+            except BaseException:
+                os.close(report_read)
+                raise
+            finally:
+                os.close(report_write)
+            self._report = os.fdopen(report_read, 'rb')
+        else:
+            self.proc = subprocess.Popen(
+                argv,
+                stdin=stdin,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.PIPE,
+                cwd=cwd,
+                preexec_fn=_pinned(preexec_fn, core),
+                start_new_session=True,
+            )
+        self.pid = self.proc.pid
+        self.stdout = self.proc.stdout
+        self.stderr = self.proc.stderr
+
+    def kill(self):
+        """Kill the program and everything it started (they share a session)."""
+        try:
+            os.killpg(self.proc.pid, signal.SIGKILL)
+        except (ProcessLookupError, PermissionError):
+            pass
+
+    def reap(self, deadline=None):
+        """Wait until the program exits or `deadline` passes; returns whether it exited."""
+        delay = 0.001
+        while True:
+            pid, status, rusage = os.wait4(self.proc.pid, 0 if deadline is None else os.WNOHANG)
+            if pid:
+                break
+            if time.monotonic() >= deadline:
+                return False
+            time.sleep(delay)
+            delay = min(delay * 2, 0.01)
+
+        # Popen must not try to reap the process again
+        self.proc.returncode = os.waitstatus_to_exitcode(status)
+        self.returncode = self.proc.returncode
+        self.cpu_time = rusage.ru_utime + rusage.ru_stime
+        # ru_maxrss is in kilobytes on Linux
+        self.memory_kb = rusage.ru_maxrss
+        if self._report is not None:
+            self._read_report()
+        return True
+
+    def _read_report(self):
+        line = self._report.read()
+        self._report.close()
+        self._report = None
+        try:
+            status, user_usec, sys_usec, maxrss = map(int, line.split())
+        except ValueError:
+            # The helper was killed before the program finished; its own
+            # rusage says nothing about the program's memory
+            self.memory_kb = 0
+            return
+        self.returncode = os.waitstatus_to_exitcode(status)
+        self.cpu_time = (user_usec + sys_usec) / 1_000_000
+        self.memory_kb = maxrss
+
+    def close(self):
+        self.stdout.close()
+        self.stderr.close()
+        if self._report is not None:
+            self._report.close()
@@ -0,0 +1,151 @@
+"""Access to testcase files on the judge hot path.
+
+A test input or expected output is either a file path or a `PackedData`
+view into a problem's pack (see `testpack`). Input files are handed to the
+program as an open file (see `runner.execute`), so they are never read into
+the worker; packed inputs are written out once per content hash under
+``JUDGE_TESTDATA_DIR`` (`materialize`) and then handed over the same way. Expected outputs are compared for every
+submission to a problem, so small ones are kept in memory: `ExpectedOutputCache`
+is a per-process LRU bounded by total size and keyed by path, and an entry is
+dropped as soon as the file's mtime or size changes.
+"""
+import hashlib
+import os
+import tempfile
+import threading
+from collections import OrderedDict
+from pathlib import Path
+
+from django.conf import settings
+
+from .testpack import PackedData
+
+CHUNK_BYTES = 65_536
+# Files larger than this fraction of the cache budget are always streamed
+MAX_ENTRY_FRACTION = 8
+
+
+def _file_chunks(path):
+    with open(path, 'rb') as f:
+        yield from iter(lambda: f.read(CHUNK_BYTES), b'')
+
+
+def _memory_chunks(data):
+    view = memoryview(data)
+    for start in range(0, len(data), CHUNK_BYTES):
+        yield bytes(view[start:start + CHUNK_BYTES])
+
+
+class ExpectedOutputCache:
+    """LRU of expected-output file contents, invalidated by mtime and size."""
+
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+
+    def get(self, path):
+        """Return the contents of `path`, or None if it is too large to cache."""
+        stat = os.stat(path)
+        key, stamp = str(path), (stat.st_mtime_ns, stat.st_size)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] == stamp:
+                self._entries.move_to_end(key)
+                return entry[1]
+        if stat.st_size > self.max_bytes // MAX_ENTRY_FRACTION:
+            return None
+        with open(path, 'rb') as f:
+            data = f.read()
+        with self._lock:
+            self._discard(key)
+            self._entries[key] = (stamp, data)
+            self._size += len(data)
+            while self._size > self.max_bytes:
+                self._discard(next(iter(self._entries)))
+        return data
+
+    def _discard(self, key):
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self._size -= len(entry[1])
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._size = 0
+
+
+expected_outputs = ExpectedOutputCache(settings.JUDGE_EXPECTED_CACHE_MAX_BYTES)
+
+
+def expected_chunks(path):
+    """Yield the expected output at `path` in blocks, from memory when cached."""
+    if isinstance(path, PackedData):
+        return path.chunks()
+    data = expected_outputs.get(path)
+    if data is None:
+        return _file_chunks(path)
+    return _memory_chunks(data)
+
+
+def materialize(data):
+    """Path of a read-only file holding packed `data`, written on first use.
+
+    Files are named by content hash, so every run of every worker on the
+    machine shares one copy, and a repacked problem reuses unchanged tests.
+    """
+    # Absolute, since checkers run with their workspace as the current directory
+    directory = Path(settings.JUDGE_TESTDATA_DIR).absolute()
+    path = directory / data.sha256
+    if path.exists():
+        return path
+    directory.mkdir(parents=True, exist_ok=True)
+    fd, staging = tempfile.mkstemp(prefix='.staging-', dir=directory)
+    with os.fdopen(fd, 'wb') as f:
+        for chunk in data.chunks():
+            f.write(chunk)
+    os.chmod(staging, 0o444)
+    # Concurrent writers produce identical files, so the last rename winning is fine
+    os.replace(staging, path)
+    return path
+
+
+def stdin_data(test_input):
+    """Return the path `execute` should get for `test_input`."""
+    return as_file(test_input)
+
+
+def as_file(data):
+    """Return a file path holding `data`: the test file itself, or the materialized packed data."""
+    if isinstance(data, PackedData):
+        return materialize(data)
+    return data
+
+
+_digest_lock = threading.Lock()
+_file_digests = {}
+
+
+def content_hash(data):
+    """sha256 of a test file or packed blob, cached per file by mtime and size."""
+    if isinstance(data, PackedData):
+        return data.sha256
+    stat = os.stat(data)
+    key, stamp = str(data), (stat.st_mtime_ns, stat.st_size)
+    with _digest_lock:
+        cached = _file_digests.get(key)
+        if cached is not None and cached[0] == stamp:
+            return cached[1]
+    digest = hashlib.sha256()
+    for chunk in _file_chunks(data):
+        digest.update(chunk)
+    with _digest_lock:
+        _file_digests[key] = (stamp, digest.hexdigest())
+    return digest.hexdigest()
+
+
+def test_hash(test_input, test_output):
+    """Content hash of one test, stable across packing and file moves."""
+    return hashlib.sha256(f'{content_hash(test_input)}:{content_hash(test_output)}'.encode()).hexdigest()
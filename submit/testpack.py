@@ -0,0 +1,225 @@
+"""Packed testcase store: all tests of a problem in one memory-mapped file.
+
+Layout of ``testcases/<problem_id>/<problem_id>.pack``::
+
+    b'JTPACK1\\n'                      magic
+    <u64 little-endian>               length of the index
+    <index>                           UTF-8 JSON, see below
+    <blobs>                           test inputs and outputs back to back
+
+The index is ``{"tests": [{"name": ..., "input": <blob>, "output": <blob>}]}``
+where each blob is ``{"offset", "length", "size", "codec", "sha256"}``:
+`offset`/`length` locate the stored bytes in the file, `size` and `sha256`
+describe the uncompressed content and `codec` is ``raw`` or ``zlib``. A blob
+also records the file it was packed from as ``"source": [path, mtime_ns,
+size]`` (path relative to BASE_DIR), so `Pack.matches` can tell when tests
+were added, removed or edited after packing and the pack is stale.
+
+Readers map the file once per process and hand out `PackedData` views into
+the mapping, so judging a test never reads a whole file up front. Packs are
+replaced atomically by `write_pack`; a process that still maps the old file
+keeps a valid view of it until it notices the new mtime.
+"""
+import hashlib
+import json
+import mmap
+import os
+import struct
+import tempfile
+import threading
+import zlib
+from pathlib import Path
+
+from django.conf import settings
+
+MAGIC = b'JTPACK1\n'
+_INDEX_LENGTH = struct.Struct('<Q')
+CHUNK_BYTES = 65_536
+CODECS = ('raw', 'zlib')
+
+
+class PackError(Exception):
+    """The pack file is malformed or a test does not match its hash."""
+
+
+def pack_path(problem_id):
+    problem_id = str(problem_id)
+    return Path(settings.BASE_DIR) / 'testcases' / problem_id / f'{problem_id}.pack'
+
+
+class PackedData:
+    """One test input or expected output inside a mapped pack."""
+
+    def __init__(self, buffer, offset, length, size, codec, sha256, source=None):
+        if codec not in CODECS:
+            raise PackError(f'Unknown codec: {codec}')
+        if offset + length > len(buffer):
+            raise PackError('Blob extends past the end of the pack')
+        self._buffer = buffer
+        self._offset = offset
+        self._length = length
+        self.size = size
+        self.codec = codec
+        self.sha256 = sha256
+        # [path, mtime_ns, size] of the packed file; None in packs written before it was recorded
+        self.source = source
+
+    def chunks(self):
+        """Yield the content in blocks; raw blobs are slices of the mapping."""
+        stored = memoryview(self._buffer)[self._offset:self._offset + self._length]
+        if self.codec == 'raw':
+            for start in range(0, len(stored), CHUNK_BYTES):
+                yield stored[start:start + CHUNK_BYTES]
+            return
+        decompressor = zlib.decompressobj()
+        for start in range(0, len(stored), CHUNK_BYTES):
+            data = decompressor.decompress(stored[start:start + CHUNK_BYTES])
+            if data:
+                yield data
+        tail = decompressor.flush()
+        if tail:
+            yield tail
+
+    def read(self):
+        """Return the content; a zero-copy view for raw blobs."""
+        if self.codec == 'raw':
+            return memoryview(self._buffer)[self._offset:self._offset + self._length]
+        return b''.join(self.chunks())
+
+    def write_to(self, path):
+        with open(path, 'wb') as f:
+            for chunk in self.chunks():
+                f.write(chunk)
+        return path
+
+    def verify(self):
+        digest = hashlib.sha256()
+        for chunk in self.chunks():
+            digest.update(chunk)
+        if digest.hexdigest() != self.sha256:
+            raise PackError('Content hash mismatch')
+
+
+class Pack:
+    """A read-only, memory-mapped pack file."""
+
+    def __init__(self, path):
+        with open(path, 'rb') as f:
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        header_size = len(MAGIC) + _INDEX_LENGTH.size
+        if self._map[:len(MAGIC)] != MAGIC:
+            raise PackError(f'{path} is not a testcase pack')
+        (index_length,) = _INDEX_LENGTH.unpack_from(self._map, len(MAGIC))
+        try:
+            index = json.loads(self._map[header_size:header_size + index_length])
+            self.tests = [
+                (test['name'], self._blob(test['input']), self._blob(test['output']))
+                for test in index['tests']
+            ]
+        except (ValueError, KeyError, TypeError) as e:
+            raise PackError(f'{path} has a malformed index: {e}')
+
+    def matches(self, tests):
+        """Whether the pack was built from ``(input path, output path)`` `tests` as they are now.
+
+        Packs that do not record their sources never match.
+        """
+        recorded = [blob.source for _, test_input, test_output in self.tests for blob in (test_input, test_output)]
+        if None in recorded:
+            return False
+        return recorded == [source_stamp(path) for test in tests for path in test]
+
+    def _blob(self, entry):
+        return PackedData(
+            self._map, entry['offset'], entry['length'], entry['size'], entry['codec'], entry['sha256'],
+            entry.get('source'),
+        )
+
+    def verify(self):
+        for _, test_input, test_output in self.tests:
+            test_input.verify()
+            test_output.verify()
+
+
+_lock = threading.Lock()
+_packs = {}
+
+
+def load_pack(problem_id):
+    """Return the mapped `Pack` for `problem_id`, or None if it has no pack file."""
+    path = pack_path(problem_id)
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    stamp = (stat.st_mtime_ns, stat.st_size)
+    with _lock:
+        cached = _packs.get(path)
+        if cached is not None and cached[0] == stamp:
+            return cached[1]
+        pack = Pack(path)
+        # The replaced mapping is closed by the garbage collector once no test uses it
+        _packs[path] = (stamp, pack)
+        return pack
+
+
+def source_stamp(path):
+    """``[path relative to BASE_DIR, mtime_ns, size]`` of a test file, or None if it is missing."""
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return [os.path.relpath(path, settings.BASE_DIR), stat.st_mtime_ns, stat.st_size]
+
+
+def _encode(path, codec):
+    data = Path(path).read_bytes()
+    stored = zlib.compress(data, 6) if codec == 'zlib' else data
+    if len(stored) >= len(data):
+        # Incompressible content is cheaper to keep raw and map directly
+        stored, codec = data, 'raw'
+    return stored, {'size': len(data), 'codec': codec, 'sha256': hashlib.sha256(data).hexdigest()}
+
+
+def write_pack(path, tests, codec='raw'):
+    """Write ``(name, input path, output path)`` tests to a pack at `path` atomically."""
+    if codec not in CODECS:
+        raise PackError(f'Unknown codec: {codec}')
+    blobs, index = [], []
+    for name, input_file, output_file in tests:
+        entry = {'name': name}
+        for key, source in (('input', input_file), ('output', output_file)):
+            stamp = source_stamp(source)
+            stored, entry[key] = _encode(source, codec)
+            entry[key]['source'] = stamp
+            blobs.append((entry[key], stored))
+        index.append(entry)
+
+    # Offsets depend on the index length, which depends on the offsets' digits;
+    # fixed-width offsets would waste space, so iterate until the length settles
+    index_length = 0
+    while True:
+        offset = len(MAGIC) + _INDEX_LENGTH.size + index_length
+        for meta, stored in blobs:
+            meta['offset'], meta['length'] = offset, len(stored)
+            offset += len(stored)
+        encoded = json.dumps({'tests': index}, separators=(',', ':')).encode()
+        if len(encoded) == index_length:
+            break
+        index_length = len(encoded)
+
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, staging = tempfile.mkstemp(prefix='.pack-', dir=path.parent)
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(MAGIC)
+            f.write(_INDEX_LENGTH.pack(index_length))
+            f.write(encoded)
+            for _, stored in blobs:
+                f.write(stored)
+        os.replace(staging, path)
+    except BaseException:
+        os.unlink(staging)
+        raise
+    return path
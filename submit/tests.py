@@ -1,3 +1,1052 @@
-from django.test import TestCase
+import contextvars
+import hashlib
+import json
+import multiprocessing
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from datetime import timedelta
+from io import StringIO
+from pathlib import Path
+from types import SimpleNamespace
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.auth.models import User
+from django.core.management import CommandError, call_command
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework_simplejwt.tokens import AccessToken
+
+from accounts import stats
+from accounts.models import Problem, ProblemStats, Submission
+from accounts.models import TestCase as ProblemTestCase
+from . import (
+    blobs, compile_cache, javaserver, judge, metrics, runner, spawn, testcases, testpack, toolchains, verdicts,
+    pch, pyzygote, slots, trace, workspace,
+)
+from .checker import CheckerError, compile_checker, run_checker
+from .compare import TokenComparator
+from .management.commands import rejudge
+from .models import Blob, CodeSubmission
+
+
+def _compare(expected_chunks, output_chunks, float_tolerance=None):
+    comparator = TokenComparator(expected_chunks, float_tolerance)
+    for chunk in output_chunks:
+        if not comparator.feed(chunk):
+            return False, comparator.difference
+    return comparator.finish(), comparator.difference
+
+
+class TokenComparatorTests(SimpleTestCase):
+    def test_tokens_split_across_chunks(self):
+        ok, _ = _compare([b'12', b'345 6', b'7\n'], [b'1', b'2345', b' 67', b'\n'])
+        self.assertTrue(ok)
+
+    def test_whitespace_differences_are_ignored(self):
+        ok, _ = _compare([b'1 2\n3\n'], [b'1\n\n2   3 \r\n'])
+        self.assertTrue(ok)
+
+    def test_token_joined_across_chunk_boundary_is_not_two_tokens(self):
+        ok, difference = _compare([b'1 2\n'], [b'1', b'2\n'])
+        self.assertFalse(ok)
+        self.assertEqual(difference['expected'], '1')
+        self.assertEqual(difference['got'], '12')
+
+    def test_wrong_token_reports_position(self):
+        ok, difference = _compare([b'a b\nc d\n'], [b'a b\nc x\n'])
+        self.assertFalse(ok)
+        self.assertEqual(difference['token'], 4)
+        self.assertEqual(difference['line'], 2)
+        self.assertEqual((difference['expected'], difference['got']), ('d', 'x'))
+        self.assertEqual(difference['context'], 'a b c')
+
+    def test_extra_output_token(self):
+        ok, difference = _compare([b'1 2\n'], [b'1 2 3\n'])
+        self.assertFalse(ok)
+        self.assertEqual((difference['expected'], difference['got']), (None, '3'))
+
+    def test_missing_output_token(self):
+        ok, difference = _compare([b'1 2 3\n'], [b'1 2\n'])
+        self.assertFalse(ok)
+        self.assertEqual(difference['token'], 3)
+        self.assertEqual((difference['expected'], difference['got']), ('3', None))
+
+    def test_feed_stops_at_first_mismatch(self):
+        comparator = TokenComparator([b'1 2 3\n'])
+        self.assertFalse(comparator.feed(b'9 '))
+        self.assertFalse(comparator.feed(b'2 3\n'))
+        self.assertFalse(comparator.finish())
+        self.assertEqual(comparator.difference['token'], 1)
+
+    def test_float_tolerance(self):
+        self.assertTrue(_compare([b'0.333333\n'], [b'0.3333334\n'], float_tolerance=1e-6)[0])
+        self.assertTrue(_compare([b'1000000\n'], [b'1000000.5\n'], float_tolerance=1e-6)[0])
+        self.assertFalse(_compare([b'0.5\n'], [b'0.6\n'], float_tolerance=1e-6)[0])
+        self.assertFalse(_compare([b'1.0\n'], [b'nan\n'], float_tolerance=1e-6)[0])
+        self.assertFalse(_compare([b'abc\n'], [b'abd\n'], float_tolerance=1e-6)[0])
+
+    def test_numbers_compare_exactly_without_tolerance(self):
+        self.assertFalse(_compare([b'0.5\n'], [b'0.50\n'])[0])
+
+
+class TestPackTests(SimpleTestCase):
+    def setUp(self):
+        self.base_dir = Path(tempfile.mkdtemp())
+        self.addCleanup(shutil.rmtree, self.base_dir)
+        self.tests = []
+        for name, (test_input, test_output) in {'1': (b'1 2\n', b'3\n'), '2': (b'x' * 5000, b'y' * 3)}.items():
+            input_file, output_file = self.base_dir / f'{name}.in', self.base_dir / f'{name}.out'
+            input_file.write_bytes(test_input)
+            output_file.write_bytes(test_output)
+            self.tests.append((name, input_file, output_file))
+
+    def _write(self, codec):
+        with self.settings(BASE_DIR=self.base_dir):
+            return testpack.write_pack(self.base_dir / 'p.pack', self.tests, codec=codec)
+
+    def test_round_trip(self):
+        for codec in testpack.CODECS:
+            with self.subTest(codec=codec):
+                pack = testpack.Pack(self._write(codec))
+                pack.verify()
+                self.assertEqual([name for name, _, _ in pack.tests], ['1', '2'])
+                for (_, input_file, output_file), (_, test_input, test_output) in zip(self.tests, pack.tests):
+                    self.assertEqual(bytes(test_input.read()), input_file.read_bytes())
+                    streamed = b''.join(bytes(chunk) for chunk in test_output.chunks())
+                    self.assertEqual(streamed, output_file.read_bytes())
+
+    def test_incompressible_data_is_stored_raw(self):
+        pack = testpack.Pack(self._write('zlib'))
+        self.assertEqual(pack.tests[0][1].codec, 'raw')
+        self.assertEqual(pack.tests[1][1].codec, 'zlib')
+
+    def test_verify_detects_corruption(self):
+        path = self._write('raw')
+        data = bytearray(path.read_bytes())
+        data[-1] ^= 0xFF
+        path.write_bytes(bytes(data))
+        with self.assertRaises(testpack.PackError):
+            testpack.Pack(path).verify()
+
+    def test_matches_source_files(self):
+        pack = testpack.Pack(self._write('raw'))
+        files = [(input_file, output_file) for _, input_file, output_file in self.tests]
+        with self.settings(BASE_DIR=self.base_dir):
+            self.assertTrue(pack.matches(files))
+            self.assertFalse(pack.matches(files[:1]))
+            files[0][1].write_bytes(b'4\n\n')
+            self.assertFalse(pack.matches(files))
+
+    def test_packed_input_is_materialized_once(self):
+        pack = testpack.Pack(self._write('zlib'))
+        with self.settings(JUDGE_TESTDATA_DIR=self.base_dir / 'testdata'):
+            path = testcases.stdin_data(pack.tests[1][1])
+            self.assertEqual(path.read_bytes(), self.tests[1][1].read_bytes())
+            mtime = path.stat().st_mtime_ns
+            self.assertEqual(testcases.stdin_data(pack.tests[1][1]), path)
+            self.assertEqual(path.stat().st_mtime_ns, mtime)
+        self.assertEqual(testcases.stdin_data(self.tests[0][1]), self.tests[0][1])
+
+    def test_unpack_refuses_to_overwrite(self):
+        pack_dir = self.base_dir / 'testcases' / 'p'
+        pack_dir.mkdir(parents=True)
+        with self.settings(BASE_DIR=self.base_dir):
+            testpack.write_pack(pack_dir / 'p.pack', self.tests)
+            (pack_dir / '1.in').write_bytes(b'keep\n')
+            with self.assertRaises(CommandError):
+                call_command('unpack_testcases', 'p', stdout=StringIO())
+            self.assertEqual((pack_dir / '1.in').read_bytes(), b'keep\n')
+            call_command('unpack_testcases', 'p', '--dest', str(self.base_dir / 'out'), stdout=StringIO())
+            self.assertEqual((self.base_dir / 'out' / '2.in').read_bytes(), b'x' * 5000)
+            call_command('unpack_testcases', 'p', '--overwrite', stdout=StringIO())
+            self.assertEqual((pack_dir / '1.in').read_bytes(), b'1 2\n')
+
+
+class BlobTests(TestCase):
+    def test_round_trip(self):
+        for data in (b'', b'short', b'a' * 1000, bytes(range(256)) * 4):
+            with self.subTest(size=len(data)):
+                key = blobs.put(data)
+                self.assertEqual(key, hashlib.sha256(data).hexdigest())
+                self.assertEqual(blobs.get(key), data)
+
+    def test_codec_choice(self):
+        self.assertEqual(Blob.objects.get(digest=blobs.put(b'short')).codec, blobs.CODEC_RAW)
+        self.assertEqual(Blob.objects.get(digest=blobs.put(b'a' * 1000)).codec, blobs.CODEC_ZLIB)
+
+    def test_identical_content_is_stored_once(self):
+        first = CodeSubmission.objects.create(language='py', code='print(1)\n')
+        second = CodeSubmission.objects.create(language='py', code='print(1)\n')
+        self.assertEqual(first.code_blob_id, second.code_blob_id)
+        self.assertEqual(Blob.objects.count(), 1)
+        self.assertEqual(CodeSubmission.objects.get(id=second.id).code, 'print(1)\n')
+
+    def test_blobs_are_written_on_save(self):
+        submission = CodeSubmission(language='py', code='print(2)\n', input_data='')
+        self.assertEqual(submission.code, 'print(2)\n')
+        self.assertIsNone(submission.input_blob_id)
+        self.assertFalse(Blob.objects.exists())
+        submission.save()
+        self.assertEqual(Blob.objects.get().digest, submission.code_blob_id)
+
+    def _age_blobs(self):
+        Blob.objects.update(touched_at=timezone.now() - timedelta(days=1))
+
+    def test_collect_garbage_keeps_referenced_blobs(self):
+        kept = CodeSubmission.objects.create(language='py', code='kept')
+        dropped = CodeSubmission.objects.create(language='py', code='dropped')
+        orphan = blobs.put(b'orphan')
+        dropped.delete()
+        self._age_blobs()
+        self.assertEqual(blobs.collect_garbage(batch_size=1, grace_seconds=3600), 2)
+        self.assertEqual(list(Blob.objects.values_list('digest', flat=True)), [kept.code_blob_id])
+        self.assertFalse(Blob.objects.filter(digest=orphan).exists())
+
+    def test_collect_garbage_spares_recently_put_blobs(self):
+        reused = blobs.put(b'reused')
+        self._age_blobs()
+        # Both returned by put() for rows that are not saved yet
+        self.assertEqual(blobs.put(b'reused'), reused)
+        fresh = blobs.put(b'fresh')
+        self.assertEqual(blobs.collect_garbage(grace_seconds=3600), 0)
+        self.assertEqual(set(Blob.objects.values_list('digest', flat=True)), {reused, fresh})
+
+
+def _problem_with_tests(directory, tests):
+    """A `Problem` whose `TestCase` rows point at files written under `directory`."""
+    author = User.objects.get_or_create(username='author')[0]
+    problem = Problem.objects.create(title='Sum', description='Add numbers', created_by=author)
+    for number, (test_input, test_output) in enumerate(tests, 1):
+        input_file, output_file = directory / f'{number}.in', directory / f'{number}.out'
+        input_file.write_bytes(test_input)
+        output_file.write_bytes(test_output)
+        ProblemTestCase.objects.create(problem=problem, input_file=str(input_file), output_file=str(output_file))
+    return problem
+
+
+@override_settings(ALLOWED_HOSTS=['testserver'])
+class QueueTests(TestCase):
+    def setUp(self):
+        self.dir = Path(tempfile.mkdtemp())
+        self.addCleanup(shutil.rmtree, self.dir)
+        self.problem = _problem_with_tests(self.dir, [(b'1 2\n', b'3\n')])
+
+    def _queue(self, **fields):
+        fields = {'status': CodeSubmission.STATUS_QUEUED, **fields}
+        return CodeSubmission.objects.create(language='py', code='print(3)\n', problem_id=str(self.problem.id), **fields)
+
+    def test_claim_takes_oldest_queued_row_once(self):
+        first, second = self._queue(), self._queue()
+        claimed = judge.claim_next_submission()
+        self.assertEqual(claimed.id, first.id)
+        self.assertEqual(claimed.status, CodeSubmission.STATUS_COMPILING)
+        self.assertIsNotNone(claimed.claimed_at)
+        self.assertEqual(judge.claim_next_submission().id, second.id)
+        self.assertIsNone(judge.claim_next_submission())
+
+    def test_claim_skips_row_taken_by_another_worker(self):
+        first, second = self._queue(), self._queue()
+        real_filter = judge.CodeSubmission.objects.filter
+
+        # Another worker claims the candidate between the SELECT and the conditional UPDATE
+        def filter(*args, **kwargs):
+            if kwargs.get('id') == first.id and 'status' in kwargs:
+                CodeSubmission.objects.filter(id=first.id).update(status=CodeSubmission.STATUS_COMPILING)
+            return real_filter(*args, **kwargs)
+
+        with mock.patch.object(judge.CodeSubmission.objects, 'filter', side_effect=filter):
+            self.assertEqual(judge.claim_next_submission().id, second.id)
+
+    def test_requeue_stale_submissions(self):
+        stale = self._queue(status=CodeSubmission.STATUS_RUNNING, claimed_at=timezone.now() - timedelta(minutes=10))
+        fresh = self._queue(status=CodeSubmission.STATUS_RUNNING, claimed_at=timezone.now())
+        self.assertEqual(judge.requeue_stale_submissions(60), 1)
+        stale.refresh_from_db()
+        fresh.refresh_from_db()
+        self.assertEqual((stale.status, stale.claimed_at), (CodeSubmission.STATUS_QUEUED, None))
+        self.assertEqual(fresh.status, CodeSubmission.STATUS_RUNNING)
+
+    def test_fail_submission_records_judge_error(self):
+        self._queue()
+        submission = judge.claim_next_submission()
+        judge.fail_submission(submission, RuntimeError('sandbox crashed'))
+        submission = CodeSubmission.objects.get(id=submission.id)
+        self.assertEqual((submission.status, submission.verdict), (CodeSubmission.STATUS_DONE, 'JE'))
+        self.assertEqual(submission.output_data, '[JE] Judge Error: sandbox crashed')
+        self.assertIsNotNone(submission.judged_at)
+
+    def test_submit_returns_202_and_status_polls_to_verdict(self):
+        response = self.client.post(
+            reverse('submit:api_submit'),
+            json.dumps({'language': 'py', 'code': 'print(3)\n', 'problem_id': str(self.problem.id)}),
+            content_type='application/json',
+        )
+        self.assertEqual(response.status_code, 202)
+        body = response.json()
+        self.assertEqual(body['status'], CodeSubmission.STATUS_QUEUED)
+        self.assertEqual(self.client.get(body['status_url']).json()['verdict'], None)
+
+        results = [{'test': 1, 'verdict': 'AC', 'time': 0.01, 'memory_kb': 512}]
+        judgement = judge.Judgement('AC', '', results, time_ms=10, memory_kb=512)
+        with mock.patch.object(judge, 'evaluate', return_value=judgement):
+            judge.judge_submission(judge.claim_next_submission())
+        status = self.client.get(body['status_url']).json()
+        self.assertEqual((status['status'], status['verdict'], status['success']), ('done', 'AC', True))
+        self.assertEqual(status['tests'], results)
+
+    def test_submit_without_tests_is_rejected(self):
+        response = self.client.post(
+            reverse('submit:api_submit'),
+            json.dumps({'language': 'py', 'code': '', 'problem_id': 'missing'}),
+            content_type='application/json',
+        )
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(CodeSubmission.objects.exists())
+
+
+class RunTestsTests(SimpleTestCase):
+    def setUp(self):
+        self.dir = Path(tempfile.mkdtemp())
+        self.addCleanup(shutil.rmtree, self.dir)
+        self.tests = []
+        for number in range(1, 5):
+            input_file, output_file = self.dir / f'{number}.in', self.dir / f'{number}.out'
+            input_file.write_bytes(f'{number}\n'.encode())
+            output_file.write_bytes(f'{number * 2}\n'.encode())
+            self.tests.append((input_file, output_file))
+        self.verdicts = {}
+        self.ran = []
+
+    def _run_test(self, program, input_file, output_file, float_tolerance=None, checker=None):
+        number = int(input_file.stem)
+        self.ran.append(number)
+        verdict, delay = self.verdicts.get(number, ('AC', 0))
+        time.sleep(delay)
+        run = SimpleNamespace(time=number / 100, wall_time=number / 50, memory_kb=number)
+        return verdict, '' if verdict == 'AC' else f'[{verdict}]', run, None
+
+    def _run(self, **kwargs):
+        with mock.patch.object(judge, '_run_test', side_effect=self._run_test):
+            return judge.run_tests(None, self.tests, **kwargs)
+
+    def test_sequential_run_stops_at_first_failure(self):
+        self.verdicts = {2: ('WA', 0)}
+        results, message = self._run()
+        self.assertEqual([(entry['test'], entry['verdict']) for entry in results], [(1, 'AC'), (2, 'WA')])
+        self.assertEqual(message, '[WA]')
+        self.assertEqual(self.ran, [1, 2])
+
+    def test_parallel_verdict_is_first_failing_test(self):
+        # Test 3 fails first in wall-clock time, but test 2 comes first in test order
+        self.verdicts = {2: ('TLE', 0.2), 3: ('WA', 0)}
+        results, message = self._run(workers=3)
+        self.assertEqual([(entry['test'], entry['verdict']) for entry in results], [(1, 'AC'), (2, 'TLE')])
+        self.assertEqual(message, '[TLE]')
+
+    def test_previous_results_are_reused_by_hash(self):
+        first, _ = self._run()
+        self.assertEqual(self.ran, [1, 2, 3, 4])
+        self.ran = []
+        self.tests[2][1].write_bytes(b'changed\n')
+        previous = {entry['hash']: entry for entry in first}
+        results, _ = self._run(previous=previous)
+        self.assertEqual(self.ran, [3])
+        self.assertEqual(results[0], first[0])
+        self.assertNotEqual(results[2]['hash'], first[2]['hash'])
+        self.assertEqual([entry['test'] for entry in results], [1, 2, 3, 4])
+
+
+LOCMEM_CACHES = {
+    alias: {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': alias}
+    for alias in ('default', 'judge', 'problems')
+}
+
+
+@override_settings(CACHES=LOCMEM_CACHES, JUDGE_VERDICT_CACHE=True, JUDGE_VERDICT_CACHE_TIME_MARGIN=0.5)
+class VerdictCacheTests(TestCase):
+    def setUp(self):
+        self.dir = Path(tempfile.mkdtemp())
+        self.addCleanup(shutil.rmtree, self.dir)
+        self.problem = _problem_with_tests(self.dir, [(b'1 2\n', b'3\n')])
+        self.tests = judge.file_testcases(str(self.problem.id))
+
+    def _key(self):
+        return verdicts.judgement_key('py', 'print(3)\n', self.tests, self.problem)
+
+    def test_only_reproducible_verdicts_are_stored(self):
+        for verdict, stored in (('AC', True), ('WA', True), ('CE', True), ('TLE', False), ('RTE', False)):
+            with self.subTest(verdict=verdict):
+                key = f'key-{verdict}'
+                verdicts.put(key, verdict, verdict)
+                self.assertEqual(verdicts.get(key), verdict if stored else None)
+
+    def test_slow_runs_are_not_stored(self):
+        limit = runner.TIME_LIMIT_SECONDS
+        verdicts.put('fast', 'AC', 'AC', limit * 0.4)
+        verdicts.put('slow', 'AC', 'AC', limit * 0.6)
+        self.assertEqual(verdicts.get('fast'), 'AC')
+        self.assertIsNone(verdicts.get('slow'))
+
+    def test_nondeterministic_checker_is_never_cached(self):
+        self.assertIsNotNone(self._key())
+        self.problem.deterministic_checker = False
+        self.assertIsNone(self._key())
+
+    def test_key_follows_testcase_content(self):
+        key = self._key()
+        self.assertEqual(self._key(), key)
+        self.tests[0][1].write_bytes(b'4\n')
+        self.assertNotEqual(self._key(), key)
+
+
+class MetricsTests(SimpleTestCase):
+    def setUp(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        settings = self.settings(JUDGE_METRICS_DIR=directory, ALLOWED_HOSTS=['testserver'])
+        settings.enable()
+        self.addCleanup(settings.disable)
+
+    def _scrape(self, remote_addr, **headers):
+        return self.client.get(reverse('metrics'), REMOTE_ADDR=remote_addr, **headers)
+
+    def test_without_token_only_loopback_may_scrape(self):
+        with self.settings(METRICS_TOKEN=''):
+            self.assertEqual(self._scrape('127.0.0.1').status_code, 200)
+            self.assertEqual(self._scrape('::1').status_code, 200)
+            self.assertEqual(self._scrape('203.0.113.7').status_code, 403)
+
+    def test_token_is_required_when_set(self):
+        with self.settings(METRICS_TOKEN='secret'):
+            self.assertEqual(self._scrape('127.0.0.1').status_code, 401)
+            self.assertEqual(self._scrape('203.0.113.7', HTTP_AUTHORIZATION='Bearer wrong').status_code, 401)
+            response = self._scrape('203.0.113.7', HTTP_AUTHORIZATION='Bearer secret')
+            self.assertEqual(response.status_code, 200)
+            self.assertIn(b'# TYPE judge_compile_seconds histogram', response.content)
+
+    def test_checker_compiles_have_their_own_label(self):
+        checker = SimpleNamespace(checker_code='print("ok")\n', checker_language='py')
+        self.assertIsNotNone(compile_checker(checker))
+        self.assertIn('judge_compile_seconds_count{language="py",role="checker"}', metrics.render())
+
+
+class CompileCacheTests(SimpleTestCase):
+    def setUp(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        settings = self.settings(JUDGE_COMPILE_CACHE_DIR=directory)
+        settings.enable()
+        self.addCleanup(settings.disable)
+        self.builds = []
+
+    def _build(self, size=10, ok=True):
+        def build(out_dir):
+            self.builds.append(out_dir)
+            (out_dir / 'a.out').write_bytes(b'x' * size)
+            return ok, '' if ok else 'error: expected ;'
+        return build
+
+    def test_build_once_then_hit(self):
+        key = compile_cache.cache_key('cpp', 'int main(){}', 'g++ 12', ['-O2'])
+        entry, error = compile_cache.get_or_build(key, self._build())
+        self.assertIsNone(error)
+        self.assertEqual((entry / 'a.out').read_bytes(), b'x' * 10)
+        self.assertEqual(compile_cache.get_or_build(key, self._build()), (entry, None))
+        self.assertEqual(len(self.builds), 1)
+
+    def test_failed_builds_are_not_cached(self):
+        key = compile_cache.cache_key('cpp', 'int main(){', 'g++ 12', ['-O2'])
+        for _ in range(2):
+            self.assertEqual(compile_cache.get_or_build(key, self._build(ok=False)), (None, 'error: expected ;'))
+        self.assertEqual(len(self.builds), 2)
+        self.assertIsNone(compile_cache.lookup(key))
+
+    def test_key_covers_compiler_and_flags(self):
+        keys = {
+            compile_cache.cache_key('cpp', 'int main(){}', 'g++ 12', ['-O2']),
+            compile_cache.cache_key('cpp', 'int main(){}', 'g++ 13', ['-O2']),
+            compile_cache.cache_key('cpp', 'int main(){}', 'g++ 12', ['-O0']),
+            compile_cache.cache_key('java', 'int main(){}', 'g++ 12', ['-O2']),
+        }
+        self.assertEqual(len(keys), 4)
+
+    def test_eviction_drops_least_recently_used(self):
+        with self.settings(JUDGE_COMPILE_CACHE_MAX_BYTES=10**9):
+            entries = [compile_cache.get_or_build(f'key{n}', self._build(size=100))[0] for n in range(3)]
+        for age, entry in zip((300, 100, 200), entries):
+            os.utime(entry, (time.time() - age, time.time() - age))
+        compile_cache.evict(max_bytes=250)
+        self.assertEqual([compile_cache.lookup(f'key{n}') is not None for n in range(3)], [False, True, True])
+
+
+# Speaks the compile server protocol of java/CompileServer.java; sources named Bad*.java fail
+FAKE_COMPILE_SERVER = r"""
+import os, sys
+for line in sys.stdin:
+    args = line.rstrip('\n').split('\t')
+    bad = [arg for arg in args if os.path.basename(arg).startswith('Bad')]
+    body = (f'{bad[0]}:1: error: ; expected' if bad else '').encode()
+    sys.stdout.buffer.write(b'%d %d\n' % (1 if bad else 0, len(body)) + body)
+    sys.stdout.flush()
+"""
+
+
+class _FakeCompileServer(javaserver.CompileServer):
+    starts = 0
+
+    def _start(self):
+        self._proc = subprocess.Popen(
+            [sys.executable, '-c', FAKE_COMPILE_SERVER], stdin=subprocess.PIPE, stdout=subprocess.PIPE,
+        )
+        self._buffer = b''
+        self._compiles = 0
+        self.starts += 1
+
+
+class JavaWarmPathTests(SimpleTestCase):
+    def setUp(self):
+        self.server = _FakeCompileServer()
+        self.addCleanup(self.server.stop)
+
+    def test_compile_server_round_trip(self):
+        self.assertEqual(self.server.compile(['-d', 'out', 'Main.java'], timeout=10), (True, ''))
+        self.assertEqual(
+            self.server.compile(['-d', 'out', 'Bad.java'], timeout=10), (False, 'Bad.java:1: error: ; expected'),
+        )
+        self.assertEqual(self.server.starts, 1)
+
+    def test_server_restarts_after_max_compiles_and_on_exit(self):
+        with mock.patch.object(javaserver, 'MAX_COMPILES_PER_SERVER', 2):
+            for _ in range(3):
+                self.server.compile(['Main.java'], timeout=10)
+        self.assertEqual(self.server.starts, 2)
+        self.server._proc.kill()
+        self.server._proc.wait()
+        self.assertEqual(self.server.compile(['Main.java'], timeout=10), (True, ''))
+        self.assertEqual(self.server.starts, 3)
+
+    def test_unsendable_arguments_are_rejected(self):
+        with self.assertRaises(javaserver.CompileServerError):
+            self.server.compile(['Main.java', 'a\tb'], timeout=10)
+
+    def test_falls_back_to_cold_javac(self):
+        cold = SimpleNamespace(command=sys.executable)
+        broken = mock.Mock(side_effect=javaserver.CompileServerError('compile server exited'))
+        with self.settings(JUDGE_JAVA_WARM=True), mock.patch.object(javaserver._server, 'compile', broken):
+            with mock.patch.object(javaserver.toolchains, 'require', return_value=cold):
+                ok, diagnostics = javaserver.compile_java(['-c', 'import sys; sys.exit("cold javac")'], timeout=10)
+        self.assertEqual((ok, diagnostics.strip()), (False, 'cold javac'))
+        broken.assert_called_once()
+
+
+class ToolchainRegistryTests(SimpleTestCase):
+    def setUp(self):
+        # A private registry; the shared one stays probed for the other tests
+        patcher = mock.patch.object(toolchains, '_registry', None)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_tools_are_probed_once(self):
+        probe = mock.Mock(side_effect=lambda name: toolchains.Toolchain(name, f'/usr/bin/{name}', f'{name} 1.0'))
+        with mock.patch.object(toolchains, '_probe', probe):
+            first = toolchains.get_registry()
+            self.assertIs(toolchains.get_registry(), first)
+            self.assertEqual(toolchains.require('g++').version, 'g++ 1.0')
+            self.assertEqual(probe.call_count, len(toolchains.TOOLS))
+            toolchains.get_registry(refresh=True)
+            self.assertEqual(probe.call_count, 2 * len(toolchains.TOOLS))
+
+    def test_probe_records_version_and_missing_tools(self):
+        python = toolchains._probe('python')
+        self.assertTrue(python.available)
+        self.assertTrue(python.version.startswith('Python 3'))
+        with mock.patch.dict(toolchains.TOOLS, {'g++': (['no-such-compiler-x'], '--version')}):
+            missing = toolchains._probe('g++')
+        self.assertFalse(missing.available)
+        self.assertEqual(missing.error, 'no-such-compiler-x: not on PATH')
+
+    def test_require_and_status_report_missing_tools(self):
+        registry = {name: toolchains.Toolchain(name, error='not on PATH') for name in toolchains.TOOLS}
+        registry['python'] = toolchains.Toolchain('python', '/usr/bin/python3', 'Python 3.11')
+        with mock.patch.object(toolchains, '_registry', registry):
+            with self.assertRaisesMessage(toolchains.ToolchainError, toolchains.MISSING_MESSAGES['g++']):
+                toolchains.require('g++')
+            status = toolchains.registry_status()
+        self.assertEqual(status['languages'], {'cpp': False, 'py': True, 'java': False})
+        self.assertEqual(status['tools']['g++']['error'], 'not on PATH')
+
+
+# Exits with the code given as the contestant's first token, explaining on stderr
+EXIT_CODE_CHECKER = """import sys
+code = int(open(sys.argv[3]).read().split()[0])
+sys.stderr.write(f'checker says {code}')
+sys.exit(code)
+"""
+
+
+class CheckerTests(SimpleTestCase):
+    def setUp(self):
+        self.dir = Path(tempfile.mkdtemp())
+        self.addCleanup(shutil.rmtree, self.dir)
+        settings = self.settings(JUDGE_COMPILE_CACHE_DIR=self.dir / 'cache', JUDGE_PY_ZYGOTE=False, JUDGE_CPP_PCH=False)
+        settings.enable()
+        self.addCleanup(settings.disable)
+        for name in ('input.txt', 'expected.txt'):
+            (self.dir / name).write_text('1\n')
+
+    def _problem(self, code, language='py'):
+        return SimpleNamespace(checker_code=code, checker_language=language)
+
+    def _check(self, checker, contestant_output):
+        (self.dir / 'contestant.out').write_text(contestant_output)
+        return run_checker(
+            checker, self.dir / 'input.txt', self.dir / 'expected.txt', self.dir / 'contestant.out', self.dir,
+        )
+
+    def test_exit_codes_map_to_verdicts(self):
+        checker = compile_checker(self._problem(EXIT_CODE_CHECKER))
+        self.assertEqual(self._check(checker, '0\n'), ('AC', 'checker says 0'))
+        self.assertEqual(self._check(checker, '1\n'), ('WA', 'checker says 1'))
+        # Presentation errors count as wrong answers
+        self.assertEqual(self._check(checker, '2\n'), ('WA', 'checker says 2'))
+        with self.assertRaisesMessage(CheckerError, 'Checker exited with code 3: checker says 3'):
+            self._check(checker, '3\n')
+
+    def test_problems_without_checker(self):
+        self.assertIsNone(compile_checker(None))
+        self.assertIsNone(compile_checker(self._problem('')))
+        with self.assertRaisesMessage(CheckerError, 'Unsupported checker language: java'):
+            compile_checker(self._problem('class Main {}', language='java'))
+
+    def test_checker_is_compiled_once(self):
+        first = compile_checker(self._problem(EXIT_CODE_CHECKER))
+        self.assertEqual(compile_checker(self._problem(EXIT_CODE_CHECKER)).argv, first.argv)
+        self.assertEqual(len([entry for entry in (self.dir / 'cache').iterdir() if not entry.name.startswith('.')]), 1)
+
+    def test_compile_errors_are_judge_errors(self):
+        with self.assertRaisesMessage(CheckerError, 'Checker compilation failed'):
+            compile_checker(self._problem('int main( {', language='cpp'))
+
+
+class RunAccountingTests(SimpleTestCase):
+    def _run(self, code):
+        with open(os.devnull, 'rb') as stdin:
+            child = spawn.Child([sys.executable, '-c', code], stdin)
+        self.assertTrue(child.reap(time.monotonic() + 30))
+        child.close()
+        return child
+
+    def _modes(self):
+        """Run each check through the exec helper and through the direct fallback."""
+        for helper in (spawn.helper_path(), None):
+            with self.subTest(helper=helper is not None), mock.patch.object(spawn, 'helper_path', return_value=helper):
+                yield
+
+    def test_cpu_time(self):
+        for _ in self._modes():
+            child = self._run('import time\nstart = time.process_time()\nwhile time.process_time() - start < 0.3: pass')
+            self.assertGreaterEqual(child.cpu_time, 0.25)
+            self.assertLess(child.cpu_time, 5)
+
+    def test_peak_memory_and_exit_code(self):
+        for _ in self._modes():
+            child = self._run('import sys\nx = b"x" * (96 << 20)\nsys.exit(3)')
+            self.assertEqual(child.returncode, 3)
+            self.assertGreaterEqual(child.memory_kb, 96 * 1024)
+
+    def test_exec_helper_survives_eviction(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        with self.settings(JUDGE_COMPILE_CACHE_DIR=directory):
+            with mock.patch.object(spawn, '_helper', None), mock.patch.object(spawn, '_helper_probed', False):
+                helper = spawn.helper_path()
+                if helper is None:
+                    self.skipTest('exec helper cannot be built here')
+                compile_cache.evict(max_bytes=0)
+                self.assertTrue(os.path.exists(helper))
+
+
+class WorkspaceTests(SimpleTestCase):
+    def setUp(self):
+        self.root = Path(tempfile.mkdtemp())
+        self.addCleanup(shutil.rmtree, self.root)
+        settings = self.settings(
+            JUDGE_WORKSPACE_DIR=str(self.root / 'work'), JUDGE_COMPILE_CACHE_DIR=self.root / 'cache',
+            JUDGE_PY_ZYGOTE=False,
+        )
+        settings.enable()
+        self.addCleanup(settings.disable)
+
+    def test_private_and_removed_even_on_error(self):
+        with self.assertRaises(RuntimeError):
+            with workspace.workspace() as first, workspace.workspace() as second:
+                self.assertNotEqual(first, second)
+                self.assertEqual(first.parent, self.root / 'work')
+                self.assertEqual(first.stat().st_mode & 0o777, 0o700)
+                (first / 'scratch').write_text('x')
+                raise RuntimeError
+        self.assertEqual(list((self.root / 'work').iterdir()), [])
+
+    def test_each_run_gets_its_own_directory(self):
+        program = runner.compile_program('py', 'import os\nopen("out.txt", "w").write("x")\nprint(os.getcwd())\n')
+        first = runner.execute(program, '')
+        second = runner.execute(program, '')
+        self.assertIsNone(first.verdict)
+        self.assertNotEqual(first.output, second.output)
+        self.assertEqual(Path(first.output.strip()).parent, self.root / 'work')
+        self.assertFalse(Path(first.output.strip()).exists())
+
+
+class TestDataFeedTests(SimpleTestCase):
+    def setUp(self):
+        self.dir = Path(tempfile.mkdtemp())
+        self.addCleanup(shutil.rmtree, self.dir)
+        self.cache = testcases.ExpectedOutputCache(max_bytes=800)
+
+    def _file(self, name, data):
+        path = self.dir / name
+        path.write_bytes(data)
+        return path
+
+    def test_cached_until_file_changes(self):
+        path = self._file('1.out', b'3\n')
+        first = self.cache.get(path)
+        self.assertEqual(first, b'3\n')
+        self.assertIs(self.cache.get(path), first)
+        path.write_bytes(b'42\n')
+        self.assertEqual(self.cache.get(path), b'42\n')
+
+    def test_large_files_are_streamed(self):
+        path = self._file('big.out', b'x' * 101)
+        self.assertIsNone(self.cache.get(path))
+        with mock.patch.object(testcases, 'expected_outputs', self.cache):
+            self.assertEqual(b''.join(testcases.expected_chunks(path)), b'x' * 101)
+
+    def test_least_recently_used_entries_are_dropped(self):
+        paths = [self._file(f'{n}.out', bytes([65 + n]) * 100) for n in range(9)]
+        for path in paths[:8]:
+            self.cache.get(path)
+        self.cache.get(paths[0])
+        self.cache.get(paths[8])
+        self.assertEqual(set(self.cache._entries), {str(path) for path in [paths[0], *paths[2:]]})
+        self.assertLessEqual(self.cache._size, 800)
+
+    def test_input_files_are_not_copied_into_the_workspace(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        with self.settings(JUDGE_COMPILE_CACHE_DIR=directory, JUDGE_PY_ZYGOTE=False):
+            program = runner.compile_program('py', 'import os, sys\nprint(sys.stdin.read().strip(), os.listdir("."))\n')
+            result = runner.execute(program, self._file('1.in', b'1 2\n'))
+        self.assertEqual(result.output, '1 2 []\n')
+
+
+class PythonZygoteTests(SimpleTestCase):
+    def setUp(self):
+        self.root = Path(tempfile.mkdtemp())
+        self.addCleanup(shutil.rmtree, self.root)
+        settings = self.settings(
+            JUDGE_WORKSPACE_DIR=str(self.root / 'work'), JUDGE_COMPILE_CACHE_DIR=self.root / 'cache',
+            JUDGE_PY_ZYGOTE=True,
+        )
+        settings.enable()
+        self.addCleanup(settings.disable)
+        self.zygote = pyzygote.Zygote(sys.executable)
+        self.addCleanup(self.zygote.stop)
+        # The shared zygote listens in this test's workspace directory
+        self.addCleanup(pyzygote._stop_all)
+
+    def _script(self, code):
+        path = self.root / 'main.py'
+        path.write_text(code)
+        return path
+
+    def test_check_reports_syntax_errors(self):
+        self.assertIsNone(self.zygote.check(self._script('print(1)\n')))
+        self.assertIn('SyntaxError', self.zygote.check(self._script('print(\n')))
+
+    def test_forked_runs_match_cold_runs(self):
+        code = 'import sys\na, b = map(int, input().split())\nprint(a + b)\nsys.exit(a)\n'
+        program = runner.compile_program('py', code)
+        self.assertIsNotNone(program.zygote)
+        warm = runner.execute(program, '0 3\n')
+        failed = runner.execute(program, '4 3\n')
+        program.zygote = None
+        cold = runner.execute(program, '0 3\n')
+        self.assertEqual((warm.verdict, warm.output), (cold.verdict, cold.output))
+        self.assertEqual(warm.output, '3\n')
+        self.assertEqual(failed.verdict, 'RTE')
+        self.assertGreater(warm.memory_kb, 0)
+
+    def test_syntax_errors_are_compile_errors(self):
+        with self.assertRaises(runner.CompileError):
+            runner.compile_program('py', 'print(\n')
+
+    def test_restarts_after_dying(self):
+        self.zygote.check(self._script('print(1)\n'))
+        self.zygote._proc.kill()
+        self.zygote._proc.wait()
+        self.assertIsNone(self.zygote.check(self._script('print(2)\n')))
+
+
+class PrecompiledHeaderTests(SimpleTestCase):
+    def setUp(self):
+        self.cache = Path(tempfile.mkdtemp())
+        self.addCleanup(shutil.rmtree, self.cache)
+        settings = self.settings(JUDGE_COMPILE_CACHE_DIR=self.cache)
+        settings.enable()
+        self.addCleanup(settings.disable)
+        patcher = mock.patch.dict(pch._include_dirs, clear=True)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.gxx = SimpleNamespace(command='g++', version='g++ (test) 1')
+        self.compiles = []
+
+    def _fake_gxx(self, returncode=0):
+        def run(argv, **kwargs):
+            self.compiles.append(argv)
+            if returncode == 0:
+                Path(argv[argv.index('-o') + 1]).write_bytes(b'gch')
+            return subprocess.CompletedProcess(argv, returncode, '', 'fatal error')
+        return mock.patch.object(pch.subprocess, 'run', side_effect=run)
+
+    def test_include_dir_is_built_once_and_pinned(self):
+        with self._fake_gxx():
+            include_dir = pch.include_dir(self.gxx, ['-O2'])
+            self.assertEqual((include_dir / 'bits' / 'stdc++.h').read_text(), '#include_next <bits/stdc++.h>\n')
+            self.assertTrue((include_dir / 'bits' / 'stdc++.h.gch').exists())
+            self.assertIn('-x', self.compiles[0])
+            compile_cache.evict(max_bytes=0)
+            self.assertTrue((include_dir / compile_cache.PINNED_MARKER).exists())
+            self.assertEqual(pch.include_dir(self.gxx, ['-O2']), include_dir)
+            self.assertEqual(len(self.compiles), 1)
+            # Other flags need their own header
+            self.assertNotEqual(pch.include_dir(self.gxx, ['-O0']), include_dir)
+
+    def test_rebuilt_when_cache_is_cleared(self):
+        with self._fake_gxx():
+            include_dir = pch.include_dir(self.gxx, ['-O2'])
+            shutil.rmtree(include_dir)
+            self.assertEqual(pch.include_dir(self.gxx, ['-O2']), include_dir)
+            self.assertTrue((include_dir / 'bits' / 'stdc++.h.gch').exists())
+        self.assertEqual(len(self.compiles), 2)
+
+    def test_failed_build_disables_pch(self):
+        with self._fake_gxx(returncode=1):
+            self.assertIsNone(pch.include_dir(self.gxx, ['-O2']))
+            self.assertIsNone(pch.include_dir(self.gxx, ['-O2']))
+        self.assertEqual(len(self.compiles), 1)
+
+
+def _hold_slot(pool, held, seconds):
+    with pool.acquire():
+        held.set()
+        time.sleep(seconds)
+
+
+def _die_holding_slot(pool, held):
+    with pool.acquire():
+        held.set()
+        os._exit(1)
+
+
+class SlotTests(SimpleTestCase):
+    def setUp(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        settings = self.settings(JUDGE_CACHE_DIR=directory, JUDGE_COMPILE_CPUS='', JUDGE_RUN_CPUS='')
+        settings.enable()
+        self.addCleanup(settings.disable)
+
+    def _usable(self, cpus):
+        return mock.patch.object(slots.os, 'sched_getaffinity', return_value=set(cpus))
+
+    def test_parse_cpus(self):
+        self.assertEqual(slots.parse_cpus('0,2,4-6'), [0, 2, 4, 5, 6])
+        with self._usable([1, 3]):
+            self.assertEqual(slots.parse_cpus(' '), [1, 3])
+
+    def test_compiles_get_their_own_cpus(self):
+        with self._usable(range(8)), self.settings(JUDGE_COMPILE_SLOTS=2):
+            self.assertEqual((slots.compile_cpus(), slots.run_cpus()), ([6, 7], [0, 1, 2, 3, 4, 5]))
+        with self._usable(range(8)), self.settings(JUDGE_COMPILE_SLOTS=6):
+            # At most half of the CPUs are reserved for compiles
+            self.assertEqual(slots.compile_cpus(), [4, 5, 6, 7])
+        with self._usable([0]), self.settings(JUDGE_COMPILE_SLOTS=2):
+            self.assertEqual((slots.compile_cpus(), slots.run_cpus()), ([0], [0]))
+        with self.settings(JUDGE_COMPILE_CPUS='3', JUDGE_RUN_CPUS='0-2'):
+            self.assertEqual((slots.compile_cpus(), slots.run_cpus()), ([3], [0, 1, 2]))
+
+    def test_pool_bounds_concurrency_and_assigns_cores(self):
+        pool = slots.SlotPool('test', 2, cores=[3, 5])
+        active, peak, cores = [], [], set()
+        lock = threading.Lock()
+
+        def job():
+            with pool.acquire() as slot:
+                with lock:
+                    active.append(slot)
+                    peak.append(len(active))
+                    cores.add(slot.core)
+                time.sleep(0.05)
+                with lock:
+                    active.remove(slot)
+
+        threads = [threading.Thread(target=job) for _ in range(5)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(max(peak), 2)
+        self.assertLessEqual(cores, {3, 5})
+        self.assertEqual(pool.status()['process']['acquired'], 5)
+        self.assertGreaterEqual(pool.status()['process']['waited'], 1)
+
+    def test_slots_are_shared_between_processes(self):
+        pool = slots.SlotPool('shared', 1)
+        context = multiprocessing.get_context('fork')
+        held = context.Event()
+        holder = context.Process(target=_hold_slot, args=(pool, held, 0.3))
+        holder.start()
+        self.assertTrue(held.wait(10))
+        self.assertEqual(pool.status()['slots'][0]['holder']['pid'], holder.pid)
+        started = time.monotonic()
+        with pool.acquire():
+            self.assertGreaterEqual(time.monotonic() - started, 0.1)
+        holder.join()
+
+    def test_crashed_holder_frees_its_slot(self):
+        pool = slots.SlotPool('crash', 1)
+        context = multiprocessing.get_context('fork')
+        held = context.Event()
+        holder = context.Process(target=_die_holding_slot, args=(pool, held))
+        holder.start()
+        self.assertTrue(held.wait(10))
+        holder.join()
+        with pool.acquire() as slot:
+            self.assertEqual(slot.index, 0)
+        self.assertFalse(pool.status()['slots'][0]['busy'])
+
+
+@override_settings(CACHES=LOCMEM_CACHES, JUDGE_PY_ZYGOTE=False)
+class RejudgeTests(TestCase):
+    def setUp(self):
+        self.dir = Path(tempfile.mkdtemp())
+        self.addCleanup(shutil.rmtree, self.dir)
+        settings = self.settings(JUDGE_COMPILE_CACHE_DIR=self.dir / 'cache')
+        settings.enable()
+        self.addCleanup(settings.disable)
+        self.problem = _problem_with_tests(self.dir, [(b'1 2\n', b'3\n'), (b'2 2\n', b'4\n'), (b'5 5\n', b'10\n')])
+        user = User.objects.create(username='contestant')
+        self.submission = Submission.objects.create(
+            user=user, problem=self.problem, language='Python3', verdict='WA',
+            code='a, b = map(int, input().split())\nprint(a + b)\n',
+        )
+        stats.record_verdict(user.id, self.problem.id, None, 'WA')
+        # Workers call it on entry; here it would close the test transaction's connection
+        patcher = mock.patch.object(rejudge, 'close_old_connections')
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def _accepted(self):
+        return ProblemStats.objects.get(problem=self.problem).accepted
+
+    def test_only_changed_tests_are_rerun(self):
+        _, old, new, ran, reused, _ = rejudge._rejudge(self.submission.id, full=True)
+        self.assertEqual((old, new, ran, reused), ('WA', 'AC', 3, 0))
+        self.assertEqual(self._accepted(), 1)
+
+        (self.dir / '2.out').write_bytes(b'5\n')
+        _, old, new, ran, reused, _ = rejudge._rejudge(self.submission.id, full=False)
+        self.assertEqual((old, new, ran, reused), ('AC', 'WA', 1, 1))
+        submission = Submission.objects.get(id=self.submission.id)
+        self.assertEqual([entry['verdict'] for entry in submission.test_results], ['AC', 'WA'])
+        self.assertEqual(self._accepted(), 0)
+
+    def test_selection_is_required(self):
+        with self.assertRaisesMessage(CommandError, 'Select submissions by id'):
+            call_command('rejudge', stdout=StringIO())
+        out = StringIO()
+        call_command('rejudge', '--since', '2000-01-01', '--until', '2000-01-02', stdout=out)
+        self.assertEqual(out.getvalue().strip(), 'No submissions match.')
+
+
+class TraceTests(TestCase):
+    def test_spans_nest_and_follow_copied_contexts(self):
+        recorded = trace.Trace()
+        with trace.activate(recorded):
+            with trace.span('judge'):
+                with trace.span('compile'):
+                    trace.spawn(['g++', '-O2'], pid=42)
+                thread = threading.Thread(target=contextvars.copy_context().run, args=(_traced_compare,))
+                thread.start()
+                thread.join()
+        with trace.span('untraced'):
+            trace.spawn(['python3'])
+        spans = recorded.as_dict()['spans']
+        self.assertEqual([(span['name'], span['parent']) for span in spans],
+                         [('judge', None), ('compile', 0), ('compare', 0)])
+        self.assertTrue(all(span['start'] <= span['end'] for span in spans))
+        self.assertEqual(recorded.as_dict()['spawns'], [{'command': 'g++', 'pid': 42, 'span': 1,
+                                                         'at': mock.ANY}])
+
+    def test_sample_rate(self):
+        with self.settings(JUDGE_TRACE_SAMPLE_RATE=0):
+            self.assertFalse(any(trace.sampled() for _ in range(20)))
+        with self.settings(JUDGE_TRACE_SAMPLE_RATE=1):
+            self.assertTrue(all(trace.sampled() for _ in range(20)))
+
+
+def _traced_compare():
+    with trace.span('compare'):
+        pass
+
+
+class TraceEndpointTests(TestCase):
+    def setUp(self):
+        self.dir = Path(tempfile.mkdtemp())
+        self.addCleanup(shutil.rmtree, self.dir)
+        self.problem = _problem_with_tests(self.dir, [(b'1 2\n', b'3\n')])
+        self.admin = User.objects.create(username='admin', is_staff=True)
+        self.contestant = User.objects.create(username='contestant')
+
+    def _submit_and_judge(self):
+        response = self.client.post(
+            reverse('submit:api_submit'),
+            json.dumps({'language': 'py', 'code': 'print(3)\n', 'problem_id': str(self.problem.id)}),
+            content_type='application/json',
+        )
+        judgement = judge.Judgement('AC', '', [], time_ms=10, memory_kb=512)
+        with mock.patch.object(judge, 'evaluate', return_value=judgement):
+            judge.judge_submission(judge.claim_next_submission())
+        return response.json()['submission_id']
+
+    def _get_trace(self, submission_id, caller=None):
+        headers = {'HTTP_AUTHORIZATION': f'Bearer {AccessToken.for_user(caller)}'} if caller else {}
+        return self.client.get(reverse('submit:api_trace', args=[submission_id]), **headers)
+
+    @override_settings(JUDGE_TRACE_SAMPLE_RATE=1)
+    def test_sampled_submission_trace_spans_submit_and_judge(self):
+        submission_id = self._submit_and_judge()
+        response = self._get_trace(submission_id, self.admin)
+        self.assertEqual(response.status_code, 200)
+        body = response.json()
+        self.assertEqual(body['verdict'], 'AC')
+        self.assertEqual([span['name'] for span in body['trace']['spans']], ['load_tests', 'db_create', 'judge', 'save'])
+
+    @override_settings(JUDGE_TRACE_SAMPLE_RATE=1)
+    def test_trace_is_admin_only(self):
+        submission_id = self._submit_and_judge()
+        self.assertEqual(self._get_trace(submission_id).status_code, 401)
+        self.assertEqual(self._get_trace(submission_id, self.contestant).status_code, 403)
+
+    @override_settings(JUDGE_TRACE_SAMPLE_RATE=0)
+    def test_unsampled_submission_has_no_trace(self):
+        submission_id = self._submit_and_judge()
+        self.assertIsNone(CodeSubmission.objects.get(id=submission_id).trace)
+        self.assertEqual(self._get_trace(submission_id, self.admin).status_code, 404)
@@ -0,0 +1,118 @@
+"""Registry of the compilers and interpreters the judge runs.
+
+Each tool is located and its version probed once per process (judge workers
+probe before forking, so children inherit the result). The judge hot path
+then only spawns the processes it actually needs, and the recorded versions
+feed the compile cache keys.
+"""
+import shutil
+import subprocess
+import threading
+
+from . import trace
+
+# Tool name -> (candidate commands in order of preference, version flag)
+TOOLS = {
+    'g++': (['g++'], '--version'),
+    # Several names so the same code works on Windows and Linux
+    'python': (['python', 'python3', 'py'], '--version'),
+    'javac': (['javac'], '-version'),
+    'java': (['java'], '-version'),
+}
+
+LANGUAGE_TOOLS = {
+    'cpp': ['g++'],
+    'py': ['python'],
+    'java': ['javac', 'java'],
+}
+
+MISSING_MESSAGES = {
+    'g++': "C++ compiler (g++) not found. Please install MinGW or another C++ compiler.",
+    'python': "Python interpreter not found. Please install Python and ensure it's in your PATH.",
+    'javac': "Java compiler or runtime not found. Please check your JDK installation.",
+    'java': "Java compiler or runtime not found. Please check your JDK installation.",
+}
+
+
+class ToolchainError(Exception):
+    """Raised when the compiler or interpreter for a language is not available."""
+
+
+class Toolchain:
+    """A located tool: absolute `command` and first line of its version output."""
+
+    def __init__(self, name, command=None, version='', error=''):
+        self.name = name
+        self.command = command
+        self.version = version
+        self.error = error
+
+    @property
+    def available(self):
+        return self.command is not None
+
+    def as_dict(self):
+        return {
+            'name': self.name,
+            'available': self.available,
+            'command': self.command,
+            'version': self.version,
+            'error': self.error,
+        }
+
+
+def _probe(name):
+    candidates, version_flag = TOOLS[name]
+    errors = []
+    for candidate in candidates:
+        command = shutil.which(candidate)
+        if command is None:
+            errors.append(f'{candidate}: not on PATH')
+            continue
+        try:
+            trace.spawn([command, version_flag])
+            result = subprocess.run([command, version_flag], capture_output=True, text=True, timeout=5)
+        except (subprocess.TimeoutExpired, OSError) as e:
+            errors.append(f'{candidate}: {e}')
+            continue
+        if result.returncode != 0:
+            errors.append(f'{candidate}: exited with {result.returncode}')
+            continue
+        # javac/java print their version on stderr
+        text = (result.stdout or result.stderr).strip()
+        return Toolchain(name, command, text.splitlines()[0] if text else '')
+    return Toolchain(name, error='; '.join(errors))
+
+
+_lock = threading.Lock()
+_registry = None
+
+
+def get_registry(refresh=False):
+    """Return ``{tool name: Toolchain}``, probing every tool on first use."""
+    global _registry
+    with _lock:
+        if _registry is None or refresh:
+            with trace.span('toolchain_probe'):
+                _registry = {name: _probe(name) for name in TOOLS}
+        return _registry
+
+
+def require(name):
+    """Return the `Toolchain` for `name` or raise `ToolchainError` if it is missing."""
+    toolchain = get_registry()[name]
+    if not toolchain.available:
+        raise ToolchainError(MISSING_MESSAGES[name])
+    return toolchain
+
+
+def registry_status():
+    """Registry contents for the health endpoint, grouped by language."""
+    registry = get_registry()
+    return {
+        'tools': {name: toolchain.as_dict() for name, toolchain in registry.items()},
+        'languages': {
+            language: all(registry[name].available for name in names)
+            for language, names in LANGUAGE_TOOLS.items()
+        },
+    }
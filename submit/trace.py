@@ -0,0 +1,94 @@
+"""Lightweight per-submission phase traces.
+
+A `Trace` records timed spans (toolchain probe, compile, each test's input
+write, run and comparison, database writes) and the subprocesses spawned
+while judging. Times are wall-clock epoch seconds, so the spans recorded by
+`api_submit` and by the judge worker line up in one trace.
+
+Code deep in the judge calls the module-level `span` and `spawn`, which
+record into the trace activated for the current context and do nothing when
+there is none. Only a ``JUDGE_TRACE_SAMPLE_RATE`` fraction of submissions is
+traced.
+"""
+import contextvars
+import random
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+
+from django.conf import settings
+
+_current = contextvars.ContextVar('judge_trace', default=None)
+_parent = contextvars.ContextVar('judge_trace_parent', default=None)
+
+
+def sampled():
+    """Whether a new submission should be traced."""
+    rate = settings.JUDGE_TRACE_SAMPLE_RATE
+    return rate >= 1 or (rate > 0 and random.random() < rate)
+
+
+class Trace:
+    """Spans and spawns of one submission; `data` continues a stored trace."""
+
+    def __init__(self, data=None):
+        data = data or {}
+        self.spans = list(data.get('spans', ()))
+        self.spawns = list(data.get('spawns', ()))
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def span(self, name, **attrs):
+        entry = {'id': None, 'name': name, 'parent': _parent.get(), 'start': round(time.time(), 6), 'end': None}
+        entry.update(attrs)
+        with self._lock:
+            entry['id'] = len(self.spans)
+            self.spans.append(entry)
+        token = _parent.set(entry['id'])
+        try:
+            yield entry
+        finally:
+            _parent.reset(token)
+            entry['end'] = round(time.time(), 6)
+
+    def spawn(self, argv, pid=None):
+        with self._lock:
+            self.spawns.append({
+                'command': str(argv[0]),
+                'pid': pid,
+                'span': _parent.get(),
+                'at': round(time.time(), 6),
+            })
+
+    def as_dict(self):
+        with self._lock:
+            return {'spans': [dict(entry) for entry in self.spans], 'spawns': list(self.spawns)}
+
+
+@contextmanager
+def activate(trace):
+    """Record `span` and `spawn` calls of this context (and contexts copied from it) into `trace`."""
+    token = _current.set(trace)
+    parent_token = _parent.set(None)
+    try:
+        yield trace
+    finally:
+        _parent.reset(parent_token)
+        _current.reset(token)
+
+
+def current():
+    return _current.get()
+
+
+def span(name, **attrs):
+    """Context manager timing `name` in the current trace, if any."""
+    trace = _current.get()
+    return nullcontext() if trace is None else trace.span(name, **attrs)
+
+
+def spawn(argv, pid=None):
+    """Note a subprocess started for the current trace, if any."""
+    trace = _current.get()
+    if trace is not None:
+        trace.spawn(argv, pid)
@@ -7,4 +7,7 @@ urlpatterns = [
     path('', views.submit, name='submit'),
     path('api/submit/', views.api_submit, name='api_submit'),
     path('api/run/', views.api_run, name='api_run'),
+    path('api/status/<int:submission_id>/', views.api_status, name='api_status'),
+    path('api/health/', views.api_health, name='api_health'),
+    path('api/trace/<int:submission_id>/', views.api_trace, name='api_trace'),
 ] 
\ No newline at end of file
@@ -0,0 +1,85 @@
+"""Memoized judge results for byte-identical code on identical test data.
+
+Many contestants submit the same code, and playground users re-run the same
+code on the same input. Results are stored in the ``judge`` cache (see
+``CACHES``; file-based, so shared by every process on the machine) under a
+key built from the language, a hash of the source, the content hashes of
+the test data, the judge limits, the toolchain versions and, for judged
+submissions, the checker and float tolerance. Changing any of them, e.g.
+fixing a testcase, simply leads to a different key.
+
+Only reproducible outcomes are stored (`CACHED_VERDICTS`): accepted, wrong
+or over-long output and compile errors. Time, memory and runtime failures can
+depend on machine load, so caching one would make a flaky verdict permanent
+for every identical submission; they are judged again each time, as are
+toolchain and judge errors. A run that took more than
+``JUDGE_VERDICT_CACHE_TIME_MARGIN`` of the time limit is not stored either:
+on a busier machine the same code could exceed the limit. Problems whose
+checker is not deterministic (`Problem.deterministic_checker`) are never
+cached.
+"""
+import hashlib
+import json
+
+from django.conf import settings
+from django.core.cache import caches
+
+from . import runner, toolchains
+from .testcases import content_hash, test_hash
+
+CACHE_ALIAS = 'judge'
+# Verdicts that the same code on the same data always reproduces
+CACHED_VERDICTS = frozenset({'AC', 'WA', 'OLE', 'CE'})
+
+
+def _sha256(text):
+    return hashlib.sha256((text or '').encode('utf-8')).hexdigest()
+
+
+def _key(kind, language, code, *parts):
+    registry = toolchains.get_registry()
+    versions = [registry[name].version for name in toolchains.LANGUAGE_TOOLS.get(language, ())]
+    limits = [runner.TIME_LIMIT_SECONDS, runner.MEMORY_LIMIT_MB, runner.OUTPUT_LIMIT_BYTES, runner.CPP_FLAGS]
+    material = json.dumps([kind, language, _sha256(code), versions, limits, *parts])
+    return f'verdict:{kind}:{hashlib.sha256(material.encode()).hexdigest()}'
+
+
+def judgement_key(language, code, tests, problem):
+    """Key for a full judgement of `code` on `tests`, or None if it must not be cached."""
+    if not settings.JUDGE_VERDICT_CACHE or language not in toolchains.LANGUAGE_TOOLS or not tests:
+        return None
+    checker = None
+    if problem is not None:
+        if not problem.deterministic_checker:
+            return None
+        checker = [problem.checker_language, _sha256(problem.checker_code), problem.float_tolerance]
+    return _key('judge', language, code, [test_hash(*test) for test in tests], checker)
+
+
+def run_key(language, code, input_data):
+    """Key for one `run_code` call, or None if it must not be cached."""
+    if not settings.JUDGE_VERDICT_CACHE or language not in toolchains.LANGUAGE_TOOLS:
+        return None
+    if isinstance(input_data, str):
+        input_hash = _sha256(input_data)
+    else:
+        input_hash = content_hash(input_data)
+    return _key('run', language, code, input_hash)
+
+
+def get(key):
+    if key is None:
+        return None
+    return caches[CACHE_ALIAS].get(key)
+
+
+def put(key, value, verdict, seconds=None):
+    """Cache `value` under `key` if `verdict` (None for a run that completed normally) is reproducible.
+
+    `seconds` is the slowest CPU time of the runs behind `value`, if any ran.
+    """
+    if key is None or (verdict is not None and verdict not in CACHED_VERDICTS):
+        return
+    if seconds is not None and seconds > runner.TIME_LIMIT_SECONDS * settings.JUDGE_VERDICT_CACHE_TIME_MARGIN:
+        return
+    caches[CACHE_ALIAS].set(key, value, settings.JUDGE_VERDICT_CACHE_SECONDS)
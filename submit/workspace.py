@@ -0,0 +1,39 @@
+"""Private, throw-away working directories for compiles and runs.
+
+Every compile and every run gets its own directory, so concurrent jobs never
+share file names (two Java submissions both compile ``Main.java``) and a
+program's scratch files cannot leak into another run. Directories are created
+on a RAM-backed filesystem when one is available, which keeps source, input
+and output writes off the disk.
+"""
+import os
+import shutil
+import tempfile
+from contextlib import contextmanager
+from pathlib import Path
+
+from django.conf import settings
+
+# Tried in order when JUDGE_WORKSPACE_DIR is not set
+RAM_FILESYSTEMS = ('/dev/shm',)
+
+
+def workspace_root():
+    configured = settings.JUDGE_WORKSPACE_DIR
+    if configured:
+        Path(configured).mkdir(parents=True, exist_ok=True)
+        return str(configured)
+    for candidate in RAM_FILESYSTEMS:
+        if os.path.isdir(candidate) and os.access(candidate, os.W_OK | os.X_OK):
+            return candidate
+    return tempfile.gettempdir()
+
+
+@contextmanager
+def workspace(prefix='judge-'):
+    """Create a private directory, yield its Path, and delete it with its contents."""
+    path = Path(tempfile.mkdtemp(prefix=prefix, dir=workspace_root()))
+    try:
+        yield path
+    finally:
+        shutil.rmtree(path, ignore_errors=True)